@@ -0,0 +1,151 @@
+"""
+    Partidas completas em avanço rápido, sem rede e sem esperas, para ajustar a IA do Pac-Man e medir o seu custo.
+
+    Cada partida é uma `server.simulation.Simulation` (sala real, relógio simulado, jogadores simulados
+    sorteados ou perseguindo o Pac-Man) executada até haver um vencedor, o mais rápido que a CPU permitir.
+    As partidas são distribuídas entre vários processos; a partida i usa a semente `--seed + i`, então
+    os resultados não dependem da quantidade de processos.
+
+    Relatório:
+        - ticks por segundo: no total (todos os processos) e por processo;
+        - distribuição dos resultados: vencedores, duração das partidas e vidas restantes do Pac-Man;
+        - tempo de cada parte do passo (IA do Pac-Man, GameState.update, captura do estado, jogadores
+          simulados e o restante: movimento dos fantasmas e acumuladores de velocidade).
+
+    Execute a partir da raiz do projeto:
+        python -m benchmarks.bench_matches --matches 64 --processes 8 --policy perseguicao
+        python -m benchmarks.bench_matches --matches 64 --json partidas.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from server.simulation import CHASE, COMPONENTS, POLICIES, Simulation
+
+from .bench_model import environment
+
+MAX_TICKS = 20 * 60 * 20    # Limite de uma partida: 20 minutos de jogo
+
+
+def play(seed: int, players: int, policy: str, max_ticks: int) -> dict:
+    """
+        Executa uma partida completa (em um processo do pool).
+
+        Returns:
+            dict: O resultado da partida (ver `Simulation.run_match`), com 'seed', 'elapsed' (segundos)
+            e 'timings' (segundos por parte do passo).
+    """
+    simulation = Simulation(seed, players, policy=policy, hashes=False, profile=True)
+
+    start = time.perf_counter()
+    result = simulation.run_match(max_ticks)
+    result['elapsed'] = time.perf_counter() - start
+
+    result['seed'] = seed
+    result['timings'] = simulation.timings
+    return result
+
+
+def summarize(matches: list[dict], wall: float, processes: int) -> dict:
+    """
+        Args:
+            matches (list[dict]): Os resultados das partidas (ver `play`).
+            wall (float): Duração total da execução, em segundos.
+            processes (int): Quantidade de processos.
+
+        Returns:
+            dict: Ticks por segundo, distribuição dos resultados e tempo de cada parte do passo.
+    """
+    ticks = sum(match['ticks'] for match in matches)
+    busy = sum(match['elapsed'] for match in matches)
+
+    timings = dict.fromkeys(COMPONENTS + ('passo',), 0.0)
+    for match in matches:
+        for component, seconds in match['timings'].items():
+            timings[component] += seconds
+
+    # O que não foi medido separadamente: movimento dos fantasmas, acumuladores e o laço do passo
+    timings['fantasmas e outros'] = timings['passo'] - sum(timings[component] for component in COMPONENTS)
+
+    durations = [match['ticks'] for match in matches]
+
+    return {
+        'matches': len(matches),
+        'processes': processes,
+        'ticks': ticks,
+        'wall': wall,
+        'ticks_per_second': ticks / wall if wall else 0.0,
+        'ticks_per_second_process': ticks / busy if busy else 0.0,
+        'outcomes': dict(Counter(match['winner'] or match['status'] for match in matches).most_common()),
+        'match_ticks': {
+            'min': min(durations),
+            'median': statistics.median(durations),
+            'max': max(durations),
+        },
+        'pacman_lives': dict(sorted(Counter(match['lives'] for match in matches).items())),
+        'components': {
+            component: {'seconds': seconds, 'us_per_tick': seconds / ticks * 1e6 if ticks else 0.0}
+            for component, seconds in timings.items() if component != 'passo'
+        },
+        'step_us_per_tick': timings['passo'] / ticks * 1e6 if ticks else 0.0,
+    }
+
+
+def report(summary: dict) -> str:
+    step = summary['step_us_per_tick']
+    lines = [
+        f"{summary['matches']} partidas, {summary['ticks']} ticks em {summary['wall']:.2f}s com "
+        f"{summary['processes']} processo(s): {summary['ticks_per_second']:.0f} ticks/s no total, "
+        f"{summary['ticks_per_second_process']:.0f} ticks/s por processo",
+        "Vencedores: " + ", ".join(f"{winner} {count}" for winner, count in summary['outcomes'].items()),
+        "Duração (ticks): mínima {min}, mediana {median:.0f}, máxima {max}".format(**summary['match_ticks']),
+        "Vidas restantes do Pac-Man: " + ", ".join(f"{lives}: {count}" for lives, count in summary['pacman_lives'].items()),
+        f"{'parte do passo':<22} {'µs/tick':>10} {'%':>7}",
+    ]
+
+    for component, timing in summary['components'].items():
+        share = timing['us_per_tick'] / step * 100 if step else 0.0
+        lines.append(f"{component:<22} {timing['us_per_tick']:>10.1f} {share:>6.1f}%")
+
+    lines.append(f"{'passo':<22} {step:>10.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partidas completas em avanço rápido, em vários processos.")
+    parser.add_argument("--matches", type=int, default=16, help="quantidade de partidas")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="processos em paralelo")
+    parser.add_argument("--seed", type=int, default=0, help="semente da primeira partida")
+    parser.add_argument("--players", type=int, default=4, help="fantasmas controlados (1 a 4)")
+    parser.add_argument("--policy", choices=POLICIES, default=CHASE, help="como os jogadores escolhem as direções")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="limite de ticks por partida")
+    parser.add_argument("--json", help="grava o resumo e os resultados das partidas neste arquivo")
+    options = parser.parse_args()
+
+    processes = max(1, min(options.processes, options.matches))
+    seeds = range(options.seed, options.seed + options.matches)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        matches = list(pool.map(play, seeds, [options.players] * len(seeds), [options.policy] * len(seeds),
+                                [options.max_ticks] * len(seeds)))
+    wall = time.perf_counter() - start
+
+    summary = summarize(matches, wall, processes)
+    print(report(summary))
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump({'suite': 'matches', 'environment': environment(), 'options': vars(options),
+                       'summary': summary, 'matches': matches}, f, indent=2)
+        print(f"Resultados gravados em {options.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+    Benchmark do modelo compartilhado (`common.matrix`, `common.game_state`) e da IA do Pac-Man.
+
+    Cenários:
+    - Matrix.move_entity: movimento válido de fantasma, movimento bloqueado por parede e movimento
+      do Pac-Man (com a verificação de itens);
+    - Matrix.has_remaining_pac_dots: labirinto cheio (retorno antecipado) e com um único dot no final;
+    - construção do Matrix e do GameState (tempo e memória alocada por sala) e reset do GameState;
+    - pickle do GameState: serialização, desserialização e tamanho;
+    - PacmanIA.update em modo normal (fantasmas por perto) e em modo frightened;
+    - PacmanIA.astar em pares de origem/destino representativos, com e sem o mapa de calor.
+
+    Os cenários usam estados fixos e sementes fixas, e cada medida é o melhor e a mediana de
+    REPEAT rodadas. Com --json, os resultados são gravados em um arquivo comparável entre commits
+    (com o commit, a versão do Python e a plataforma); com --compare, são comparados a um arquivo anterior.
+
+    Execute a partir da raiz do projeto:
+        python -m benchmarks.bench_model --json resultados.json
+        python -m benchmarks.bench_model --compare resultados.json
+"""
+
+import io
+import sys
+import json
+import time
+import pickle
+import timeit
+import tracemalloc
+import platform
+import argparse
+import statistics
+import subprocess
+import contextlib
+
+from common.enums import EntityType, ItemType
+from common.game_state import GameState
+from common.matrix import Matrix
+from server.pacman import PacmanIA
+
+REPEAT = 7
+NUMBER = 200
+
+# Posições dos fantasmas em jogo nos cenários da IA (fora das posições iniciais, perto do Pac-Man)
+GHOSTS_NEAR = {
+    EntityType.BLINKY: (12, 23),
+    EntityType.INKY: (17, 23),
+    EntityType.PINKY: (9, 20),
+    EntityType.CLYDE: (21, 26),
+}
+
+# Pares (origem, destino) do A*: curto, médio, atravessando o labirinto e entre os lados da casa dos fantasmas
+ASTAR_PAIRS = {
+    'curto': ((14, 23), (9, 23)),
+    'medio': ((14, 23), (6, 5)),
+    'diagonal': ((1, 1), (26, 29)),
+    'lados': ((6, 14), (21, 14)),
+}
+
+
+def measure(func, number: int = NUMBER, setup=None) -> dict:
+    """
+        Mede uma chamada de func.
+
+        Args:
+            func (callable): A função medida.
+            number (int, optional): Chamadas por rodada.
+            setup (callable, optional): Executada antes de cada rodada, fora da medida.
+
+        Returns:
+            dict: 'best' e 'median' (µs por chamada), 'repeat' e 'number'.
+    """
+    timer = timeit.Timer(func, setup=setup or (lambda: None))
+    times = [total / number * 1e6 for total in timer.repeat(repeat=REPEAT, number=number)]
+
+    return {
+        'best': min(times),
+        'median': statistics.median(times),
+        'repeat': REPEAT,
+        'number': number,
+    }
+
+
+def allocated(func) -> int:
+    """
+        Returns:
+            int: Bytes alocados pelo objeto criado por func (e ainda em uso enquanto ele existir).
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        obj = func()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    del obj
+    return size
+
+
+def ghosts_in_play(game_state: GameState) -> GameState:
+    """
+        Coloca os fantasmas em jogo, perto do Pac-Man.
+    """
+    game_state.matrix.entities.update(GHOSTS_NEAR)
+    return game_state
+
+
+def bench_matrix() -> dict:
+    results = {}
+    matrix = Matrix()
+
+    # Fantasma indo e voltando no corredor de baixo (não consome itens)
+    matrix.entities[EntityType.BLINKY] = (6, 23)
+
+    def ghost_move():
+        matrix.move_entity(EntityType.BLINKY, 1, 0)
+        matrix.move_entity(EntityType.BLINKY, -1, 0)
+
+    result = measure(ghost_move)
+    result['best'] /= 2
+    result['median'] /= 2
+    results['matrix.move_entity fantasma'] = result
+
+    # Movimento contra a parede (a posição acima de (1, 1) é parede)
+    matrix.entities[EntityType.CLYDE] = (1, 1)
+    results['matrix.move_entity bloqueado'] = measure(lambda: matrix.move_entity(EntityType.CLYDE, 0, -1))
+
+    # Pac-Man indo e voltando: após os primeiros passos os dots já foram consumidos
+    matrix.entities[EntityType.PACMAN] = (14, 23)
+
+    def pacman_move():
+        matrix.move_entity(EntityType.PACMAN, 1, 0)
+        matrix.move_entity(EntityType.PACMAN, -1, 0)
+
+    result = measure(pacman_move)
+    result['best'] /= 2
+    result['median'] /= 2
+    results['matrix.move_entity pacman'] = result
+
+    # Dots restantes: retorno no primeiro dot x varredura de quase toda a matriz
+    full = Matrix()
+    results['matrix.has_remaining_pac_dots cheio'] = measure(full.has_remaining_pac_dots)
+
+    last = Matrix()
+    dots = [i for i, item in enumerate(last.items) if item == ItemType.PAC_DOT]
+    for i in dots[:-1]:
+        last.set_item(i, None)
+    results['matrix.has_remaining_pac_dots ultimo'] = measure(last.has_remaining_pac_dots)
+
+    return results
+
+
+def bench_game_state() -> dict:
+    results = {}
+
+    for name, factory in (('Matrix()', Matrix), ('GameState()', GameState)):
+        result = measure(factory, number=20)
+        result['bytes'] = allocated(factory)
+        results[name] = result
+
+    game_state = GameState()
+    results['GameState.reset'] = measure(game_state.reset, number=20)
+
+    game_state = ghosts_in_play(GameState())
+    results['GameState.update'] = measure(game_state.update)
+
+    payload = pickle.dumps(game_state)
+    result = measure(lambda: pickle.dumps(game_state), number=50)
+    result['bytes'] = len(payload)
+    results['pickle.dumps GameState'] = result
+    results['pickle.loads GameState'] = measure(lambda: pickle.loads(payload), number=50)
+
+    return results
+
+
+def bench_pacman() -> dict:
+    results = {}
+
+    for name, frightened in (('normal', False), ('frightened', True)):
+        state = {}
+
+        def setup():
+            # Estado de partida fixo a cada rodada: as chamadas seguintes seguem a partida a partir dele
+            state['game_state'] = ghosts_in_play(GameState())
+            state['ai'] = PacmanIA()
+
+        def update():
+            game_state = state['game_state']
+            if frightened:
+                game_state.frightened_timer = GameState.FRIGHTENED_MODE_DURATION
+            state['ai'].update(game_state)
+
+        results[f'PacmanIA.update {name}'] = measure(update, number=50, setup=setup)
+
+    game_state = ghosts_in_play(GameState())
+    matrix = game_state.matrix
+    ai = PacmanIA()
+    ai.atualizar_heatmap(matrix)
+
+    results['PacmanIA.atualizar_heatmap'] = measure(lambda: ai.atualizar_heatmap(matrix), number=20)
+
+    for name, (start, goal) in ASTAR_PAIRS.items():
+        results[f'PacmanIA.astar {name}'] = measure(lambda: ai.astar(matrix, start, goal), number=50)
+        results[f'PacmanIA.astar {name} caca'] = measure(lambda: ai.astar(matrix, start, goal, True), number=50)
+
+    return results
+
+
+def run() -> dict:
+    """
+        Executa todos os cenários, sem a saída de texto do jogo (colisões, modo frightened).
+
+        Returns:
+            dict: Cenário -> medidas (ver `measure`).
+    """
+    results = {}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for bench in (bench_matrix, bench_game_state, bench_pacman):
+            results.update(bench())
+
+    return results
+
+
+def environment() -> dict:
+    """
+        Returns:
+            dict: O commit atual (se disponível), a versão do Python, a plataforma e a data da execução.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'date': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do modelo do jogo e da IA do Pac-Man.")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--compare", help="compara com os resultados gravados neste arquivo")
+    options = parser.parse_args()
+
+    results = run()
+
+    baseline = {}
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)['results']
+
+    print(f"{'cenário':<40} {'melhor (µs)':>12} {'mediana (µs)':>13} {'extra':>10}" + ("  vs. base" if baseline else ""))
+    for name, result in results.items():
+        extra = f"{result['bytes']} B" if 'bytes' in result else ""
+        line = f"{name:<40} {result['best']:>12.2f} {result['median']:>13.2f} {extra:>10}"
+
+        if name in baseline:
+            line += f"  {result['best'] / baseline[name]['best']:>7.2f}x"
+
+        print(line)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump({'suite': 'model', 'environment': environment(), 'results': results}, f, indent=2)
+        print(f"Resultados gravados em {options.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
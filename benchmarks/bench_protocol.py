@@ -0,0 +1,109 @@
+"""
+    Benchmark do formato de rede: pickle (caminho antigo) x formato binário (`common.protocol`).
+
+    Mede tempo de codificação, tempo de decodificação e tamanho do payload para:
+    - o GameState completo serializado com pickle (como era enviado a cada tick);
+    - keyframes e deltas típicos, em pickle, no formato binário e no formato binário comprimido
+      com o dicionário pré-compartilhado (`common.compression`).
+
+    Execute a partir da raiz do projeto:
+        python -m benchmarks.bench_protocol
+"""
+
+import pickle
+import timeit
+
+from common import protocol, compression
+from common.enums import EntityType
+from common.game_state import GameState
+from common.snapshot import Snapshot
+
+REPEAT = 5
+NUMBER = 200
+
+
+def measure(func) -> float:
+    """
+        Retorna o melhor tempo médio (em microssegundos) de uma chamada de func.
+    """
+    return min(timeit.repeat(func, repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+
+def build_states() -> tuple[GameState, Snapshot, Snapshot]:
+    """
+        Monta um estado de jogo em andamento e duas fotografias consecutivas (um passo do Pac-Man).
+    """
+    game_state = GameState()
+    matrix = game_state.matrix
+
+    # Alguns passos para tirar as entidades da posição inicial e consumir dots
+    for _ in range(5):
+        matrix.move_entity(EntityType.PACMAN, -1, 0)
+    matrix.move_entity(EntityType.BLINKY, 0, -1)
+
+    base = Snapshot.capture(game_state, 1)
+    matrix.move_entity(EntityType.PACMAN, -1, 0)
+    current = Snapshot.capture(game_state, 2)
+
+    return game_state, base, current
+
+
+def run() -> list[tuple[str, float, float, int]]:
+    """
+        Executa os cenários do benchmark.
+
+        Returns:
+            list[tuple[str, float, float, int]]: (cenário, codificação em µs, decodificação em µs, tamanho em bytes)
+    """
+    game_state, base, current = build_states()
+    keyframe = current.keyframe()
+    delta = current.delta_from(base)
+
+    results = []
+
+    payload = pickle.dumps(game_state)
+    results.append((
+        "pickle GameState",
+        measure(lambda: pickle.dumps(game_state)),
+        measure(lambda: pickle.loads(payload)),
+        len(payload),
+    ))
+
+    for name, message in (("keyframe", keyframe), ("delta", delta)):
+        payload = pickle.dumps(message)
+        results.append((
+            f"pickle {name}",
+            measure(lambda: pickle.dumps(message)),
+            measure(lambda: pickle.loads(payload)),
+            len(payload),
+        ))
+
+        payload = protocol.encode_snapshot(message)
+        results.append((
+            f"binário {name}",
+            measure(lambda: protocol.encode_snapshot(message)),
+            measure(lambda: protocol.decode(payload)),
+            len(payload),
+        ))
+
+        if compression.available():
+            raw = payload
+            payload = protocol.encode_compressed(raw)
+            results.append((
+                f"comprimido {name}",
+                measure(lambda: protocol.encode_compressed(raw)),
+                measure(lambda: protocol.decode(protocol.decode(payload)[1])),
+                len(payload),
+            ))
+
+    return results
+
+
+def main():
+    print(f"{'cenário':<20} {'encode (µs)':>12} {'decode (µs)':>12} {'bytes':>8}")
+    for name, encode, decode, size in run():
+        print(f"{name:<20} {encode:>12.1f} {decode:>12.1f} {size:>8}")
+
+
+if __name__ == "__main__":
+    main()
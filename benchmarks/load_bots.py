@@ -0,0 +1,395 @@
+"""
+    Gerador de carga: clientes simulados (bots), sem interface gráfica, falando o protocolo real.
+
+    Cada bot abre uma conexão TCP, envia o HELLO, recebe o WELCOME e a atribuição (fantasma ou
+    espectador), decodifica todas as mensagens de estado e, se controlar um fantasma, envia ações
+    (PlayerAction) no padrão escolhido. Todos os bots rodam em um único event loop, o que permite
+    milhares de conexões a partir de uma só máquina.
+
+    Mede, por janela de relatório e no total:
+        - taxa de recebimento (mensagens e bytes por segundo);
+        - atraso dos snapshots: quanto cada estado chega depois do esperado pelo relógio da sala
+          (tick / tick_rate), em relação ao menor atraso já observado pelo mesmo bot;
+        - latência entre o envio de uma ação e a chegada do estado com o seu efeito (ACK);
+        - desconexões e recusas.
+
+    Execute a partir da raiz do projeto, com o servidor no ar:
+        python -m benchmarks.load_bots --clients 1000 --ramp 10 --duration 60
+
+    Com muitos bots, o limite de arquivos abertos do processo é elevado ao máximo permitido.
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import itertools
+
+from common import protocol, compression
+from common.enums import PlayerAction
+from common.protocol import ProtocolError
+from common.snapshot import apply_message
+
+# Padrões de envio das ações: gerador infinito de PlayerAction (None não envia nada)
+PATTERNS = {
+    'random': lambda: iter(lambda: random.choice(list(PlayerAction)), None),
+    'cycle': lambda: itertools.cycle((PlayerAction.UP, PlayerAction.LEFT, PlayerAction.DOWN, PlayerAction.RIGHT)),
+    'idle': lambda: itertools.repeat(None),
+}
+
+MAX_SERVER_PAYLOAD = 1 << 20    # Limite de sanidade para mensagens vindas do servidor
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+        Args:
+            values (list[float]): As amostras.
+            q (float): O percentil, entre 0 e 100.
+
+        Returns:
+            float: O percentil pelo método do vizinho mais próximo (0 sem amostras).
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class LoadStats:
+    """
+        Contadores compartilhados por todos os bots (um único event loop, sem lock).
+
+        Os contadores com prefixo `window_` e as listas de amostras da janela são zerados a cada relatório.
+    """
+
+    def __init__(self):
+        self.connected = 0
+        self.ghosts = 0
+        self.spectators = 0
+        self.rejected = 0
+        self.failed = 0
+        self.disconnects = 0
+
+        self.messages = 0
+        self.bytes = 0
+        self.inputs = 0
+        self.latencies = []     # ms, todas as amostras
+        self.staleness = []     # ms, todas as amostras
+
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_messages = 0
+        self.window_bytes = 0
+        self.window_latencies = []
+        self.window_staleness = []
+
+    def record_state(self, size: int, staleness: float | None):
+        self.messages += 1
+        self.bytes += size
+        self.window_messages += 1
+        self.window_bytes += size
+
+        if staleness is not None:
+            self.staleness.append(staleness)
+            self.window_staleness.append(staleness)
+
+    def record_ack(self, size: int, latency: float):
+        self.messages += 1
+        self.bytes += size
+        self.window_messages += 1
+        self.window_bytes += size
+        self.latencies.append(latency)
+        self.window_latencies.append(latency)
+
+    def report(self, elapsed: float, window: float) -> str:
+        """
+            Returns:
+                str: Uma linha com as medidas da janela atual.
+        """
+        return (
+            f"[{elapsed:6.1f}s] {self.connected} conectados ({self.ghosts} fantasmas, {self.spectators} espectadores), "
+            f"{self.window_messages / window:.0f} msg/s, {self.window_bytes / window / 1024:.1f} KiB/s, "
+            f"atraso p50/p99 {percentile(self.window_staleness, 50):.1f}/{percentile(self.window_staleness, 99):.1f} ms, "
+            f"latência p50/p99 {percentile(self.window_latencies, 50):.1f}/{percentile(self.window_latencies, 99):.1f} ms, "
+            f"{self.disconnects} desconexões"
+        )
+
+    def summary(self, elapsed: float) -> str:
+        """
+            Returns:
+                str: O resumo de toda a execução.
+        """
+        lines = [
+            f"Duração: {elapsed:.1f}s",
+            f"Conexões: {self.ghosts} fantasmas, {self.spectators} espectadores, {self.rejected} recusadas, "
+            f"{self.failed} falhas, {self.disconnects} desconexões",
+            f"Recebido: {self.messages} mensagens ({self.messages / elapsed:.0f}/s), "
+            f"{self.bytes / 2**20:.1f} MiB ({self.bytes / elapsed / 1024:.1f} KiB/s)",
+            f"Ações enviadas: {self.inputs}",
+        ]
+
+        for name, values in (("Atraso dos snapshots", self.staleness), ("Latência ação-efeito", self.latencies)):
+            lines.append(
+                f"{name} (ms): p50 {percentile(values, 50):.1f}, p90 {percentile(values, 90):.1f}, "
+                f"p99 {percentile(values, 99):.1f}, máx. {max(values, default=0.0):.1f} ({len(values)} amostras)"
+            )
+
+        return "\n".join(lines)
+
+
+class Bot:
+    """
+        Um cliente simulado.
+    """
+
+    def __init__(self, index: int, options: argparse.Namespace, stats: LoadStats):
+        self.index = index
+        self.options = options
+        self.stats = stats
+
+        self.ghost = None
+        self.tick_rate = None
+        self.interval = 1
+        self.seq = 0
+
+        self.game_state = None
+        self.tick = 0
+        self.min_offset = None  # Menor diferença entre o relógio local e o relógio da sala, em segundos
+
+    async def run(self, stop: asyncio.Event):
+        """
+            Conecta, recebe o estado e envia as ações até `stop` ou a desconexão pelo servidor.
+        """
+        try:
+            reader, writer = await asyncio.open_connection(self.options.host, self.options.port)
+        except OSError:
+            self.stats.failed += 1
+            return
+
+        try:
+            if not await self.__handshake(reader, writer):
+                return
+
+            self.stats.connected += 1
+            tasks = [asyncio.create_task(self.__receive_loop(reader))]
+
+            if self.ghost is not None:
+                tasks.append(asyncio.create_task(self.__input_loop(writer)))
+
+            stopped = asyncio.create_task(stop.wait())
+
+            try:
+                done, _ = await asyncio.wait([*tasks, stopped], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.stats.connected -= 1
+
+                for task in [*tasks, stopped]:
+                    task.cancel()
+
+            if stopped not in done:
+                # Conexão encerrada pelo servidor, ou erro de rede/protocolo
+                self.stats.disconnects += 1
+
+                for task in done:
+                    if task.exception() is not None:
+                        self.stats.failed += 1
+
+        except (OSError, asyncio.IncompleteReadError, ProtocolError):
+            self.stats.failed += 1
+
+        finally:
+            writer.close()
+
+    async def __handshake(self, reader, writer) -> bool:
+        """
+            Envia o HELLO e recebe o WELCOME e a atribuição.
+
+            Returns:
+                bool: False se o servidor recusou a conexão.
+        """
+        encodings = protocol.ENCODING_DELTA
+        if self.options.compression:
+            encodings |= protocol.ENCODING_COMPRESSED
+
+        hello = protocol.encode_hello(self.options.room, 0, encodings, self.options.update_rate, f"bot-{self.index}")
+        writer.write(protocol.frame(hello))
+        await writer.drain()
+
+        msg_type, message = protocol.decode(await self.__read(reader))
+
+        if msg_type == protocol.MSG_REJECT:
+            self.stats.rejected += 1
+            return False
+
+        if msg_type != protocol.MSG_WELCOME:
+            raise ProtocolError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        _, self.tick_rate, self.interval = message
+
+        msg_type, message = protocol.decode(await self.__read(reader))
+
+        if msg_type != protocol.MSG_ASSIGN:
+            raise ProtocolError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        self.ghost = message[0] if not self.options.spectate else None
+
+        if self.ghost is None:
+            self.stats.spectators += 1
+        else:
+            self.stats.ghosts += 1
+
+        return True
+
+    async def __read(self, reader) -> bytes:
+        (size,) = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+
+        if size > MAX_SERVER_PAYLOAD:
+            raise ProtocolError(f"Payload muito grande: {size} bytes")
+
+        return await reader.readexactly(size)
+
+    async def __receive_loop(self, reader):
+        """
+            Decodifica todas as mensagens recebidas até o fim da conexão.
+        """
+        while True:
+            try:
+                payload = await self.__read(reader)
+            except asyncio.IncompleteReadError:
+                return
+
+            msg_type, message = protocol.decode(payload)
+
+            if msg_type == protocol.MSG_COMPRESSED:
+                msg_type, message = protocol.decode(message)
+
+            now = time.monotonic()
+
+            if msg_type == protocol.MSG_ACK:
+                _, timestamp, _ = message
+                latency = (int(now * 1000) - timestamp) & 0xFFFFFFFF
+                self.stats.record_ack(len(payload), latency)
+                continue
+
+            if msg_type not in (protocol.MSG_KEYFRAME, protocol.MSG_DELTA):
+                raise ProtocolError(f"Mensagem inesperada do servidor: {msg_type}")
+
+            tick = message[1]
+
+            if self.options.apply:
+                self.game_state, self.tick = apply_message(self.game_state, self.tick, message)
+
+            # Atraso em relação ao melhor caso já observado por este bot
+            offset = now - tick / self.tick_rate
+            if self.min_offset is None or offset < self.min_offset:
+                self.min_offset = offset
+
+            self.stats.record_state(len(payload), (offset - self.min_offset) * 1000)
+
+    async def __input_loop(self, writer):
+        """
+            Envia as ações do padrão escolhido, `input_rate` vezes por segundo.
+        """
+        pattern = PATTERNS[self.options.pattern]()
+        period = 1.0 / self.options.input_rate
+
+        # Espalha os envios dos bots ao longo do período
+        await asyncio.sleep(random.uniform(0, period))
+
+        for action in pattern:
+            if action is not None:
+                self.seq += 1
+                timestamp = int(time.monotonic() * 1000) & 0xFFFFFFFF
+                writer.write(protocol.frame(protocol.encode_input(action, self.seq, timestamp)))
+                self.stats.inputs += 1
+                await writer.drain()
+
+            await asyncio.sleep(period)
+
+
+def raise_file_limit(connections: int):
+    """
+        Eleva o limite de arquivos abertos, se necessário e possível (apenas Unix).
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 64
+
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+
+        if new_soft < wanted:
+            print(f"Aviso: limite de arquivos abertos ({new_soft}) menor que o número de conexões")
+
+
+async def run(options: argparse.Namespace) -> LoadStats:
+    """
+        Inicia os bots ao longo de `ramp` segundos e exibe um relatório a cada `report_interval`.
+    """
+    stats = LoadStats()
+    stop = asyncio.Event()
+    start = time.monotonic()
+    bots = []
+
+    async def ramp():
+        for index in range(options.clients):
+            bots.append(asyncio.create_task(Bot(index, options, stats).run(stop)))
+
+            if options.ramp:
+                await asyncio.sleep(options.ramp / options.clients)
+
+    ramp_task = asyncio.create_task(ramp())
+    last_report = start
+
+    while time.monotonic() - start < options.duration:
+        await asyncio.sleep(min(options.report_interval, options.duration - (time.monotonic() - start)))
+
+        now = time.monotonic()
+        print(stats.report(now - start, now - last_report))
+        stats.reset_window()
+        last_report = now
+
+    ramp_task.cancel()
+    stop.set()
+    await asyncio.gather(*bots, return_exceptions=True)
+
+    print(stats.summary(time.monotonic() - start))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga com clientes simulados.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--clients", type=int, default=100, help="quantidade de bots")
+    parser.add_argument("--room", type=int, default=0, help="sala pedida (0: escolha automática)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="segundos para conectar todos os bots")
+    parser.add_argument("--duration", type=float, default=30.0, help="duração total, em segundos")
+    parser.add_argument("--pattern", choices=sorted(PATTERNS), default="random", help="padrão das ações")
+    parser.add_argument("--input-rate", type=float, default=4.0, help="ações por segundo de cada fantasma")
+    parser.add_argument("--update-rate", type=int, default=None, help="estados por segundo pedidos no HELLO")
+    parser.add_argument("--spectate", action="store_true", help="não envia ações, mesmo com fantasma atribuído")
+    parser.add_argument("--no-compression", dest="compression", action="store_false",
+                        help="não pede snapshots comprimidos")
+    parser.add_argument("--apply", action="store_true", help="reconstrói o GameState de cada bot (mais custoso)")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    options = parser.parse_args()
+
+    options.compression = options.compression and compression.available()
+    raise_file_limit(options.clients)
+
+    try:
+        asyncio.run(run(options))
+    except KeyboardInterrupt:
+        print("\nInterrompido pelo usuário (Ctrl+C).")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ class GameNetworkError(Exception):
         super().__init__(*args)
 
 class SerializationError(Exception):
-    """ Ocorre quando falha a serialização (pickle) ou empacotamento (struct).
+    """ Ocorre quando falha a codificação ou decodificação das mensagens (`common.protocol`).
     """
     def __init__(self, *args):
         super().__init__(*args)
\ No newline at end of file
@@ -79,9 +79,9 @@ class GameRenderer:
         """
         Desenha o labirinto completo.
         """
-        for y, row in enumerate(matrix.matrix):
-            for x, cell in enumerate(row):
-                self.draw_tile(cell, x, y, tile_size, offset_x, offset_y)
+        for y in range(matrix.height()):
+            for x in range(matrix.width()):
+                self.draw_tile(matrix.get_cell(x, y), x, y, tile_size, offset_x, offset_y)
 
     def draw_entities(
         self,
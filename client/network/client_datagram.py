@@ -0,0 +1,91 @@
+import socket
+
+class ClientDatagramSocket:
+    """
+    Define um cliente UDP para o recebimento do estado do jogo.
+
+    Usado quando o servidor envia o estado por datagramas (ver `server.network.udp_state`):
+    os datagramas podem ser perdidos ou chegar fora de ordem, e cada um é tratado isoladamente.
+
+    Attributes:
+        ip (str): O endereço IP do servidor de destino.
+        port (int): A porta UDP do servidor de destino.
+        timeout (float): Limite de tempo para o recebimento de um datagrama.
+    """
+    MAX_DATAGRAM = 65535
+
+    def __init__(self, server_ip:str, server_port:int, timeout: float = None):
+        self.ip = server_ip
+        self.port = server_port
+        self.timeout = timeout
+        self.sock = None
+
+    def open(self):
+        """Cria o socket UDP.
+
+        Raises:
+            RuntimeError: Se o socket já estiver aberto.
+            ConnectionError: Se ocorrer um erro de rede ao criar o socket.
+        """
+
+        if self.sock:
+            raise RuntimeError("Already open.")
+
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.settimeout(self.timeout)
+        except socket.error as e:
+            raise ConnectionError(f"Error while opening datagram socket: {e}")
+
+    def send(self, data:bytes):
+        """ Envia um datagrama para o servidor.
+
+        Args:
+            data (bytes): Os dados a serem enviados.
+
+        Raises:
+            ConnectionError: Se o socket não estiver aberto.
+            RuntimeError: Se ocorrer um erro durante o envio.
+        """
+
+        if not self.sock:
+            raise ConnectionError("Not open.")
+
+        try:
+            self.sock.sendto(data, (self.ip, self.port))
+        except Exception as e:
+            raise RuntimeError(f"Error while sending datagram: {e}")
+
+    def receive(self) -> bytes | None:
+        """ Recebe um datagrama do servidor.
+
+        Returns:
+            bytes | None: O conteúdo do datagrama, ou None se nenhum chegar dentro do timeout.
+
+        Raises:
+            ConnectionError: Se o socket não estiver aberto.
+            RuntimeError: Se ocorrer um erro durante o recebimento.
+        """
+
+        if not self.sock:
+            raise ConnectionError("Not open.")
+
+        try:
+            data, addr = self.sock.recvfrom(self.MAX_DATAGRAM)
+        except socket.timeout:
+            return None
+        except Exception as e:
+            raise RuntimeError(f"Error while receiving datagram: {e}")
+
+        # Ignora datagramas de outras origens
+        return data if addr[1] == self.port else None
+
+    def close(self):
+        """ Fecha o socket.
+        """
+
+        if self.sock:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
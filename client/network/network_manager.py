@@ -1,16 +1,21 @@
 import os
 import json
-import pickle
-import struct
+import time
+import socket
 
 from .client_connection import ClientSocket
+from .client_datagram import ClientDatagramSocket
 from ..exceptions import GameNetworkError, SerializationError
 from common.enums import PlayerAction, EntityType
 from common.game_state import GameState
+from common.snapshot import apply_message
+from common import protocol, compression
+from common.protocol import ProtocolError
 
 class NetworkManager:
 
     __SETTINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'settings.json')
+    HELLO_INTERVAL = 0.5    # Intervalo de reenvio do UDP_HELLO enquanto nenhum estado chega por UDP
 
     def __init__(self):
         """ Lê o arquivo de configurações e instancia um objeto ClientSocket para comunicação
@@ -25,9 +30,33 @@ class NetworkManager:
             self.ip = settings["network"]["ip"]
             self.port = settings["network"]["port"]
             self.timeout = settings["network"]["timeout"]
+            self.room = settings["network"].get("room")
+            self.transport = settings["network"].get("transport", "tcp")
+            self.compression = settings["network"].get("compression", True) and compression.available()
+            self.update_rate = settings["network"].get("update_rate")
+            self.name = settings["network"].get("name") or socket.gethostname()
+            self.spectator = settings["network"].get("spectator", False)
 
             self.conn = ClientSocket(self.ip, self.port, self.timeout)
 
+            # Socket UDP do estado do jogo, aberto se o servidor aceitar o transporte UDP
+            self.datagrams = None
+            self.udp_token = None
+
+            # Formato negociado no handshake (WELCOME)
+            self.encodings = 0
+            self.tick_rate = None
+            self.interval = 1
+
+            # Estado local, reconstruído a partir dos keyframes e deltas recebidos
+            self.game_state = None
+            self.tick = 0
+
+            # Sequência das entradas enviadas e confirmação da última aplicada pelo servidor
+            self.input_seq = 0
+            self.acked_seq = 0
+            self.input_latency = None   # Tempo (ms) entre o envio da entrada e o estado com o seu efeito
+
         except Exception as e:
             raise GameNetworkError(f"Erro de conexão: {e}");
 
@@ -45,13 +74,25 @@ class NetworkManager:
             raise RuntimeError(f"Não foi possível ler o arquivo de configurações: {e}")
 
     def connect_to_server(self):
-        """ Conecta-se ao servidor.
+        """ Conecta-se ao servidor e envia o HELLO: a sala configurada (ou qualquer sala,
+        se nenhuma for definida), o nome do cliente, a taxa de atualização preferida e as
+        capacidades suportadas. Pede o estado por UDP se o transporte configurado for "udp"
+        e os snapshots comprimidos se a compressão estiver ativa (ver `common.compression`).
+        Com "spectator", entra na sala apenas para assistir, sem ocupar um fantasma.
         
         Raises:
             GameNetworkError: Se houver algum erro na conexão.  
         """
         try:
+            flags = protocol.HELLO_UDP if self.transport == "udp" else 0
+            if self.spectator:
+                flags |= protocol.HELLO_SPECTATOR
+            encodings = protocol.ENCODING_DELTA
+            if self.compression:
+                encodings |= protocol.ENCODING_COMPRESSED
+
             self.conn.connect()
+            self.conn.send(protocol.frame(protocol.encode_hello(self.room, flags, encodings, self.update_rate, self.name)))
         except (ConnectionError, RuntimeError) as e:
             raise GameNetworkError(f"Erro de conexão: {e}")
        
@@ -60,11 +101,15 @@ class NetworkManager:
         """
         self.conn.close()
 
+        if self.datagrams:
+            self.datagrams.close()
+            self.datagrams = None
+
     def send_input(self, input: PlayerAction):
         """ Envia a entrada do jogador para o servidor.
 
-        Serializa a entrada e adiciona um cabeçalho com o tamanho total 
-        e envia através do socket.
+        Codifica a entrada no formato binário (`common.protocol`), numerada e com o instante
+        do envio, adiciona um cabeçalho com o tamanho total e envia através do socket.
 
         Args:
             input (PlayerAction): Enum que representa a ação do jogador
@@ -75,33 +120,107 @@ class NetworkManager:
         """
 
         try:
-            serialized_input = pickle.dumps(input) # Serializa o objeto
-            header = struct.pack(">I", len(serialized_input)); # Monta um cabeçalho com o tamanho dos dados
-            data = header + serialized_input
+            self.input_seq += 1
+            timestamp = int(time.monotonic() * 1000)
+
+            data = protocol.frame(protocol.encode_input(input, self.input_seq, timestamp)) # Codifica a ação e monta o cabeçalho com o tamanho
             self.conn.send(data)
 
         except (ConnectionError, RuntimeError) as e:
             raise GameNetworkError(f"Erro de conexão: {e}")
         
-        except (pickle.PicklingError, struct.error) as e:
+        except (AttributeError, ValueError) as e:
             raise SerializationError(f"Falha ao serializar input: {e}")
 
     def get_my_ghost(self) -> EntityType | None:
-        """ Obtém do servidor o fantasma que foi atribuido para o cliente.
+        """ Obtém do servidor o formato negociado (WELCOME) e o fantasma que foi atribuido
+        para o cliente. A sala em que o cliente foi colocado fica disponível em `self.room`,
+        e o formato em `self.encodings`, `self.tick_rate` e `self.interval`.
+
+        Se o estado foi pedido por UDP, recebe também o token da sessão e abre o socket UDP.
+        Se o servidor não oferecer UDP (porta 0), o estado continua chegando pelo TCP.
 
         Returns:
             EntityType: O tipo de entidade, None caso contrário.
 
         Raises:
-            GameNetworkError: Se houver algum erro na conexão. 
+            GameNetworkError: Se houver algum erro na conexão ou o servidor recusar a conexão (REJECT).
             SerializationError: Se os dados recebidos estiverem incompletos ou corrompidos.
         """
-        ghost = self.__get_response()
+        response = self.__get_response()
+
+        if not response:
+            return None
+
+        msg_type, message = response
+
+        if msg_type == protocol.MSG_REJECT:
+            reason, version = message
+            raise GameNetworkError(f"Conexão recusada pelo servidor (motivo {reason}, protocolo v{version}, "
+                                   f"cliente v{protocol.PROTOCOL_VERSION})")
+
+        if msg_type != protocol.MSG_WELCOME:
+            raise SerializationError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        self.encodings, self.tick_rate, self.interval = message
+
+        response = self.__get_response()
+
+        if not response:
+            return None
+
+        msg_type, assignment = response
+
+        if msg_type != protocol.MSG_ASSIGN:
+            raise SerializationError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        ghost, self.room = assignment
+
+        if self.transport == "udp":
+            self.__open_datagrams()
+
         return ghost
+
+    def __open_datagrams(self):
+        """ Recebe o token UDP do servidor, abre o socket UDP e se registra com o UDP_HELLO.
+
+        Raises:
+            GameNetworkError: Se houver algum erro na conexão.
+            SerializationError: Se a resposta do servidor não for o token UDP.
+        """
+        response = self.__get_response()
+
+        if not response:
+            raise GameNetworkError("Erro de conexão: token UDP ausente")
+
+        msg_type, message = response
+
+        if msg_type != protocol.MSG_UDP_TOKEN:
+            raise SerializationError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        token, port = message
+
+        if not port:
+            return
+
+        try:
+            self.datagrams = ClientDatagramSocket(self.ip, port, self.HELLO_INTERVAL)
+            self.datagrams.open()
+            self.udp_token = token
+            self.datagrams.send(protocol.encode_udp_hello(token))
+        except (ConnectionError, RuntimeError) as e:
+            raise GameNetworkError(f"Erro de conexão: {e}")
        
     def get_game_state(self) -> GameState | None:
         """ Obtém o estado atual do jogo, recebido pelo servidor.
 
+        O servidor envia keyframes (estado completo) e deltas (apenas mudanças), que são
+        aplicados ao estado local de forma transparente. Confirmações de entrada (ACK) atualizam
+        `acked_seq` e `input_latency`, e o estado atual é retornado sem alterações.
+
+        Por UDP, apenas keyframes são recebidos; os que chegam atrasados (tick menor ou igual
+        ao local) são descartados. Snapshots comprimidos são descomprimidos antes de aplicados.
+
         Returns:
             GameState: Objeto que representa estado do jogo, se recebido com sucesso, None caso contrário.
 
@@ -109,21 +228,96 @@ class NetworkManager:
             GameNetworkError: Se houver algum erro na conexão. 
             SerializationError: Se os dados recebidos estiverem incompletos ou corrompidos.
         """
-        game_state = self.__get_response()
-        return game_state
+        if self.datagrams:
+            response = self.__get_datagram()
+        else:
+            response = self.__get_response()
+
+        if not response:
+            # Por UDP, a falta de datagramas não indica o fim da conexão
+            return self.game_state if self.datagrams else None
+
+        msg_type, message = response
+
+        if msg_type == protocol.MSG_COMPRESSED:
+            msg_type, message = self.__decompress(message)
+
+        if msg_type == protocol.MSG_ACK:
+            seq, timestamp, _ = message
+            self.acked_seq = seq
+            self.input_latency = (int(time.monotonic() * 1000) - timestamp) & 0xFFFFFFFF
+            return self.game_state
+
+        if msg_type not in (protocol.MSG_KEYFRAME, protocol.MSG_DELTA):
+            raise SerializationError(f"Mensagem inesperada do servidor: {msg_type}")
+
+        if self.datagrams and message[1] <= self.tick:
+            return self.game_state
+
+        try:
+            self.game_state, self.tick = apply_message(self.game_state, self.tick, message)
+        except (ValueError, TypeError, IndexError, KeyError) as e:
+            raise SerializationError(f"Erro, snapshot inválido recebido: {e}")
+
+        return self.game_state
         
         
+    def __decompress(self, payload: bytes) -> tuple:
+        """ Decodifica o payload de um snapshot comprimido, já descomprimido por `protocol.decode`.
+
+        Returns:
+            tuple[int, Any]: O tipo do snapshot (keyframe ou delta) e seu conteúdo.
+
+        Raises:
+            SerializationError: Se o conteúdo não for um snapshot válido.
+        """
+        try:
+            msg_type, message = protocol.decode(payload)
+        except ProtocolError as e:
+            raise SerializationError(f"Erro, dados corrompidos foram recebidos: {e}")
+
+        if msg_type not in (protocol.MSG_KEYFRAME, protocol.MSG_DELTA):
+            raise SerializationError(f"Mensagem comprimida inesperada do servidor: {msg_type}")
+
+        return msg_type, message
+
+    def __get_datagram(self):
+        """ Obtém e decodifica um datagrama de estado enviado pelo servidor. Se nenhum chegar
+        dentro de HELLO_INTERVAL, reenvia o UDP_HELLO (o primeiro pode ter sido perdido).
+
+        Returns:
+            tuple[int, Any]: O tipo da mensagem e seu conteúdo, se recebida com sucesso, None caso contrário.
+
+        Raises:
+            GameNetworkError: Se houver algum erro na conexão.
+            SerializationError: Se os dados recebidos estiverem corrompidos.
+        """
+        try:
+            data = self.datagrams.receive()
+
+            if data is None:
+                self.datagrams.send(protocol.encode_udp_hello(self.udp_token))
+                return None
+
+            return protocol.decode(data)
+
+        except (ConnectionError, RuntimeError) as e:
+            raise GameNetworkError(f"Erro de conexão: {e}")
+
+        except ProtocolError as e:
+            raise SerializationError(f"Erro, dados corrompidos foram recebidos: {e}")
+
     def __get_response(self):
-        """ Obtém um objeto serializado enviado pelo servidor.
+        """ Obtém e decodifica uma mensagem enviada pelo servidor.
 
         Returns:
-            Any: Um objeto, se recebido com sucesso, None caso contrário.
+            tuple[int, Any]: O tipo da mensagem e seu conteúdo (ver `common.protocol.decode`), se recebida com sucesso, None caso contrário.
 
         Raises:
             GameNetworkError: Se houver algum erro na conexão. 
             SerializationError: Se os dados recebidos estiverem incompletos ou corrompidos.
         """
-        HEADER_SIZE = 4
+        HEADER_SIZE = protocol.HEADER.size
 
         try:
             header = self.conn.receive(HEADER_SIZE) # Tamanho em bytes do objeto a ser recebido
@@ -131,18 +325,16 @@ class NetworkManager:
             if not header:
                 return None
 
-            size = struct.unpack(">I", header)[0]
+            size = protocol.HEADER.unpack(header)[0]
             serialized_data = self.conn.receive(size)
 
             if not serialized_data:
                 raise RuntimeError("Conteúdo do pacote ausente")
             
-            data = pickle.loads(serialized_data)
-
-            return data
+            return protocol.decode(serialized_data)
             
         except (ConnectionError, RuntimeError) as e:
             raise GameNetworkError(f"Erro de conexão: {e}")
         
-        except (pickle.UnpicklingError, struct.error) as e:
+        except ProtocolError as e:
             raise SerializationError(f"Erro, dados corrompidos foram recebidos: {e}")
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+    Compressão opcional dos snapshots com dicionário pré-compartilhado.
+
+    Os keyframes repetem a cada envio a estrutura do labirinto (bitsets de pac-dots e power-pellets)
+    e os campos da partida, que mudam pouco entre os ticks. Comprimidos com um dicionário montado a
+    partir do labirinto padrão (`common.maze`), conhecido pelos dois lados, até um keyframe completo
+    cabe em poucas dezenas de bytes.
+
+    Formato: deflate bruto (zlib, sem cabeçalho nem checksum) com o dicionário SNAPSHOT_DICTIONARY,
+    que é versionado junto com o código. O identificador do dicionário (adler32) é enviado pelo
+    cliente no HELLO, e o servidor só comprime para clientes com o mesmo dicionário.
+
+    Para gerar o dicionário novamente (após mudanças no labirinto ou no protocolo), execute a partir
+    da raiz do projeto:
+
+        python3 -m common.compression
+"""
+
+import os
+import zlib
+
+DICTIONARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot.zdict')
+
+LEVEL = 9               # Comprimido uma única vez por tick, compartilhado entre os clientes
+WBITS = -12             # Deflate bruto (sem cabeçalho e checksum) com janela de 4 KiB, maior que dicionário + payload
+MEM_LEVEL = 1           # Payloads pequenos: estado interno mínimo torna o compressor ~10x mais rápido de criar
+MAX_PAYLOAD = 1 << 16   # Tamanho máximo de um payload descomprimido
+
+
+def _load_dictionary() -> bytes | None:
+    try:
+        with open(DICTIONARY_FILE, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+DICTIONARY = _load_dictionary()
+
+# Identificador do dicionário (0 se a compressão não estiver disponível)
+DICTIONARY_ID = zlib.adler32(DICTIONARY) if DICTIONARY else 0
+
+
+def available() -> bool:
+    """
+        Returns:
+            bool: True se o dicionário foi carregado e a compressão pode ser usada.
+    """
+    return DICTIONARY is not None
+
+
+def compress(payload: bytes) -> bytes:
+    """
+        Comprime um payload com o dicionário pré-compartilhado.
+
+        Args:
+            payload (bytes): O payload a comprimir.
+
+        Returns:
+            bytes: O payload comprimido.
+    """
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, MEM_LEVEL, zdict=DICTIONARY)
+    return compressor.compress(payload) + compressor.flush()
+
+
+def decompress(data: bytes) -> bytes:
+    """
+        Descomprime um payload comprimido com `compress`.
+
+        Args:
+            data (bytes): O payload comprimido.
+
+        Returns:
+            bytes: O payload original.
+
+        Raises:
+            ValueError: Se os dados forem inválidos, estiverem incompletos ou excederem MAX_PAYLOAD.
+    """
+    decompressor = zlib.decompressobj(WBITS, zdict=DICTIONARY)
+
+    try:
+        payload = decompressor.decompress(data, MAX_PAYLOAD)
+    except zlib.error as e:
+        raise ValueError(f"Dados comprimidos inválidos: {e}")
+
+    if decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError("Dados comprimidos incompletos ou grandes demais")
+
+    return payload
+
+
+def build_dictionary() -> bytes:
+    """
+        Monta o dicionário a partir dos keyframes do labirinto padrão: sem itens (fim da partida)
+        e no início da partida. O zlib favorece o final do dicionário, por isso o estado inicial,
+        o mais parecido com os keyframes enviados, fica por último.
+
+        Returns:
+            bytes: O dicionário.
+    """
+    from .game_state import GameState
+    from .snapshot import Snapshot
+    from .protocol import encode_snapshot
+
+    empty = GameState()
+    empty.matrix.set_items(bytes(len(empty.matrix.items)))
+
+    samples = [Snapshot.capture(empty, 0), Snapshot.capture(GameState(), 0)]
+    return b"".join(encode_snapshot(sample.keyframe()) for sample in samples)
+
+
+if __name__ == "__main__":
+    dictionary = build_dictionary()
+
+    with open(DICTIONARY_FILE, 'wb') as f:
+        f.write(dictionary)
+
+    print(f"Dicionário gravado em {DICTIONARY_FILE} ({len(dictionary)} bytes, id {zlib.adler32(dictionary):#010x})")
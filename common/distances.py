@@ -0,0 +1,268 @@
+"""
+    Tabela de distâncias entre todas as posições acessíveis de um labirinto.
+
+    Para cada par de posições acessíveis (a, b), a tabela guarda a distância em casas pelo menor
+    caminho (busca em largura, respeitando as paredes) e o primeiro passo de a em direção a b.
+    As consultas são O(1); a tabela de um labirinto com ~300 posições ocupa ~360 KB.
+
+    As tabelas dependem apenas das paredes: cada disposição do labirinto (inclusive cada estado
+    da porta da área dos fantasmas) tem a sua, identificada por um resumo das células (`layout_key`).
+    Elas são calculadas uma única vez por processo e gravadas em CACHE_DIR, de onde os próximos
+    processos apenas as carregam. Se a pasta não puder ser usada, a tabela é apenas calculada.
+
+    Para calcular antecipadamente a tabela do labirinto padrão (nos dois estados da porta):
+        python3 -m common.distances
+"""
+
+import os
+import sys
+import array
+import struct
+import hashlib
+from collections import deque
+
+from .enums import TileType
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pacman-hunt")
+FORMAT_VERSION = 1
+
+MAGIC = b"PMDT"
+HEADER = struct.Struct("!4sBHHH")   # magic, versão, largura, altura, posições acessíveis
+
+UNREACHABLE = 0xFFFF
+
+# Ordem dos vizinhos na busca: cima, baixo, esquerda, direita (define o passo escolhido entre caminhos empatados)
+NEIGHBORS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+# Tabelas já carregadas neste processo, por disposição
+_tables = {}
+
+
+def layout_key(tiles: bytes, width: int) -> str:
+    """
+        Args:
+            tiles (bytes): O tipo de cada célula, indexado por y * largura + x.
+            width (int): A largura do labirinto.
+
+        Returns:
+            str: O resumo da disposição das paredes (usado no nome do arquivo da tabela).
+    """
+    walls = bytes(tile == TileType.WALL for tile in tiles)
+    return hashlib.blake2b(struct.pack("!BH", FORMAT_VERSION, width) + walls, digest_size=12).hexdigest()
+
+
+class DistanceTable:
+    """
+        Distâncias e primeiros passos entre todas as posições acessíveis de uma disposição do labirinto.
+
+        Attributes:
+            key (str): O resumo da disposição (ver `layout_key`).
+            width (int): Largura do labirinto.
+            height (int): Altura do labirinto.
+            positions (list[tuple[int, int]]): As posições acessíveis, na ordem da tabela.
+    """
+
+    def __init__(self, tiles: bytes, width: int, key: str | None = None):
+        """
+            Prepara a tabela, sem calcular as distâncias (ver `compute` e `load`).
+
+            Args:
+                tiles (bytes): O tipo de cada célula, indexado por y * largura + x.
+                width (int): A largura do labirinto.
+                key (str, optional): O resumo da disposição, se já calculado.
+        """
+        self.key = key or layout_key(tiles, width)
+        self.width = width
+        self.height = len(tiles) // width
+
+        # Posição acessível -> índice na tabela (-1 para paredes)
+        self.__index = array.array('h', [-1]) * len(tiles)
+        self.positions = []
+
+        for i, tile in enumerate(tiles):
+            if tile != TileType.WALL:
+                self.__index[i] = len(self.positions)
+                self.positions.append((i % width, i // width))
+
+        count = len(self.positions)
+        self.__count = count
+        self.__distances = None     # [b * count + a]: distância entre a e b
+        self.__next = None          # [b * count + a]: índice do primeiro passo de a em direção a b
+
+    def __find(self, position: tuple[int, int]) -> int:
+        x, y = position
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.__index[y * self.width + x]
+        return -1
+
+    def distance(self, a: tuple[int, int], b: tuple[int, int]) -> int | None:
+        """
+            Returns:
+                int | None: A distância, em casas, pelo menor caminho entre a e b, ou None se uma das
+                posições não for acessível ou não houver caminho.
+        """
+        i, j = self.__find(a), self.__find(b)
+
+        if i < 0 or j < 0:
+            return None
+
+        distance = self.__distances[j * self.__count + i]
+        return None if distance == UNREACHABLE else distance
+
+    def next_step(self, a: tuple[int, int], b: tuple[int, int]) -> tuple[int, int] | None:
+        """
+            Returns:
+                tuple[int, int] | None: A posição vizinha de a pela qual passa um menor caminho até b
+                (a própria posição se a == b), ou None se não houver caminho.
+        """
+        i, j = self.__find(a), self.__find(b)
+
+        if i < 0 or j < 0:
+            return None
+
+        step = self.__next[j * self.__count + i]
+        return None if step == UNREACHABLE else self.positions[step]
+
+    def compute(self):
+        """
+            Calcula as distâncias com uma busca em largura a partir de cada posição.
+        """
+        count, width = self.__count, self.width
+
+        neighbors = []
+        for x, y in self.positions:
+            neighbors.append([k for k in (self.__find((x + dx, y + dy)) for dx, dy in NEIGHBORS) if k >= 0])
+
+        distances = array.array('H', [UNREACHABLE]) * (count * count)
+        steps = array.array('H', [UNREACHABLE]) * (count * count)
+
+        for target in range(count):
+            row = target * count
+            distances[row + target] = 0
+            steps[row + target] = target
+            queue = deque([target])
+
+            # Quem é descoberto a partir de `current` tem `current` como primeiro passo em direção ao alvo
+            while queue:
+                current = queue.popleft()
+                distance = distances[row + current] + 1
+
+                for neighbor in neighbors[current]:
+                    if distances[row + neighbor] == UNREACHABLE:
+                        distances[row + neighbor] = distance
+                        steps[row + neighbor] = current
+                        queue.append(neighbor)
+
+        self.__distances = distances
+        self.__next = steps
+
+    def path(self, cache_dir: str = CACHE_DIR) -> str:
+        """
+            Returns:
+                str: O arquivo da tabela na pasta de cache.
+        """
+        return os.path.join(cache_dir, f"{self.key}.dist")
+
+    def load(self, cache_dir: str = CACHE_DIR) -> bool:
+        """
+            Carrega a tabela do cache em disco.
+
+            Returns:
+                bool: False se o arquivo não existir ou não corresponder a esta disposição.
+        """
+        try:
+            with open(self.path(cache_dir), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return False
+
+        count = self.__count
+        size = count * count * 2
+
+        if len(data) != HEADER.size + 2 * size:
+            return False
+
+        if HEADER.unpack_from(data) != (MAGIC, FORMAT_VERSION, self.width, self.height, count):
+            return False
+
+        distances, steps = array.array('H'), array.array('H')
+        distances.frombytes(data[HEADER.size:HEADER.size + size])
+        steps.frombytes(data[HEADER.size + size:])
+
+        # O arquivo é gravado em little-endian
+        if sys.byteorder != 'little':
+            distances.byteswap()
+            steps.byteswap()
+
+        self.__distances, self.__next = distances, steps
+        return True
+
+    def save(self, cache_dir: str = CACHE_DIR):
+        """
+            Grava a tabela no cache em disco (de forma atômica: processos concorrentes não leem arquivos parciais).
+
+            Raises:
+                OSError: Se a pasta ou o arquivo não puderem ser gravados.
+        """
+        distances, steps = self.__distances, self.__next
+
+        if sys.byteorder != 'little':
+            distances, steps = array.array('H', distances), array.array('H', steps)
+            distances.byteswap()
+            steps.byteswap()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        path = self.path(cache_dir)
+        temporary = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.width, self.height, self.__count))
+            f.write(distances.tobytes())
+            f.write(steps.tobytes())
+
+        os.replace(temporary, path)
+
+
+def distance_table(tiles: bytes, width: int, cache_dir: str = CACHE_DIR) -> DistanceTable:
+    """
+        Retorna a tabela de distâncias de uma disposição do labirinto: já carregada neste processo,
+        lida do cache em disco ou calculada (e gravada no cache).
+
+        Args:
+            tiles (bytes): O tipo de cada célula, indexado por y * largura + x.
+            width (int): A largura do labirinto.
+            cache_dir (str, optional): A pasta do cache em disco.
+
+        Returns:
+            DistanceTable: A tabela, compartilhada por todos os labirintos com a mesma disposição.
+    """
+    key = layout_key(tiles, width)
+    table = _tables.get(key)
+
+    if table is not None:
+        return table
+
+    table = DistanceTable(tiles, width, key)
+
+    if not table.load(cache_dir):
+        table.compute()
+
+        try:
+            table.save(cache_dir)
+        except OSError as e:
+            print(f"Tabela de distâncias não gravada em {cache_dir}: {e}")
+
+    _tables[key] = table
+    return table
+
+
+if __name__ == "__main__":
+    import time
+    from .matrix import DEFAULT_TEMPLATE
+
+    for name, tiles in (("porta aberta", DEFAULT_TEMPLATE.tiles_open), ("porta fechada", DEFAULT_TEMPLATE.tiles_closed)):
+        start = time.perf_counter()
+        table = DistanceTable(tiles, DEFAULT_TEMPLATE.width)
+        table.compute()
+        table.save()
+        print(f"{name}: {len(table.positions)} posições, {time.perf_counter() - start:.2f}s -> {table.path()}")
@@ -0,0 +1,116 @@
+"""
+    Grafo de junções de um labirinto, para buscas de caminho sem percorrer os corredores casa a casa.
+
+    A maior parte das posições acessíveis do labirinto são corredores: têm exatamente duas vizinhas,
+    e quem entra por um lado só pode sair pelo outro. O grafo guarda apenas as junções (três ou mais
+    vizinhas) e os becos sem saída (uma vizinha); cada corredor entre dois desses nós vira uma aresta
+    com as casas percorridas. Um corredor fechado em círculo, sem junções, ganha um nó em uma de suas casas.
+
+    Para cada posição acessível, `edges` retorna as saídas: de um nó, as arestas dos seus corredores;
+    de uma casa de corredor, os dois trechos até as pontas do corredor. Assim, uma busca pode partir de
+    qualquer posição e expandir apenas nós.
+
+    Como as distâncias (ver `common.distances`), o grafo depende apenas das paredes: é montado uma
+    única vez por processo para cada disposição do labirinto (inclusive cada estado da porta).
+"""
+
+from .enums import TileType
+from .distances import NEIGHBORS, layout_key
+
+# Grafos já montados neste processo, por disposição
+_graphs = {}
+
+
+class JunctionGraph:
+    """
+        Junções e becos sem saída de uma disposição do labirinto, ligados pelos corredores.
+
+        Attributes:
+            key (str): O resumo da disposição (ver `common.distances.layout_key`).
+            nodes (set[tuple[int, int]]): As posições (x, y) dos nós.
+    """
+
+    def __init__(self, tiles: bytes, width: int, key: str | None = None):
+        """
+            Args:
+                tiles (bytes): O tipo de cada célula, indexado por y * largura + x.
+                width (int): A largura do labirinto.
+                key (str, optional): O resumo da disposição, se já calculado.
+        """
+        self.key = key or layout_key(tiles, width)
+        height = len(tiles) // width
+
+        # Vizinhas acessíveis de cada posição acessível, na ordem de NEIGHBORS
+        neighbors = {}
+        for i, tile in enumerate(tiles):
+            if tile != TileType.WALL:
+                x, y = i % width, i // width
+                neighbors[(x, y)] = [
+                    (x + dx, y + dy) for dx, dy in NEIGHBORS
+                    if 0 <= x + dx < width and 0 <= y + dy < height and tiles[(y + dy) * width + x + dx] != TileType.WALL
+                ]
+
+        self.nodes = {position for position, adjacent in neighbors.items() if len(adjacent) != 2}
+
+        # Posição -> saídas: (nó de chegada, casas percorridas até ele, sem a de partida e com a de chegada)
+        self.__edges = {}
+
+        for node in sorted(self.nodes, key=lambda position: (position[1], position[0])):
+            self.__walk(node, neighbors)
+
+        # Corredores em círculo, sem nenhum nó: uma das casas passa a ser nó
+        for position in neighbors:
+            if position not in self.__edges:
+                self.nodes.add(position)
+                self.__walk(position, neighbors)
+
+    def __walk(self, node: tuple[int, int], neighbors: dict):
+        """
+            Percorre cada corredor que sai do nó até o próximo nó, registrando a aresta do nó e,
+            para cada casa do corredor, a saída na direção do nó de chegada (a saída na direção do
+            nó de partida é registrada quando o corredor é percorrido a partir do outro nó).
+        """
+        edges = self.__edges.setdefault(node, [])
+
+        for first in neighbors[node]:
+            previous, current = node, first
+            cells = [current]
+
+            while current not in self.nodes:
+                previous, current = current, next(n for n in neighbors[current] if n != previous)
+                cells.append(current)
+
+            edges.append((current, tuple(cells)))
+
+            for i, cell in enumerate(cells[:-1]):
+                self.__edges.setdefault(cell, []).append((current, tuple(cells[i + 1:])))
+
+    def edges(self, position: tuple[int, int]) -> list[tuple[tuple[int, int], tuple[tuple[int, int], ...]]]:
+        """
+            Args:
+                position (tuple[int, int]): Uma posição (x, y) acessível.
+
+            Returns:
+                list[tuple[tuple[int, int], tuple[tuple[int, int], ...]]]: As saídas da posição até os
+                nós vizinhos: (nó de chegada, casas percorridas sem a posição e com o nó de chegada).
+                Vazia se a posição não for acessível.
+        """
+        return self.__edges.get(position, [])
+
+
+def junction_graph(tiles: bytes, width: int) -> JunctionGraph:
+    """
+        Args:
+            tiles (bytes): O tipo de cada célula, indexado por y * largura + x.
+            width (int): A largura do labirinto.
+
+        Returns:
+            JunctionGraph: O grafo da disposição, compartilhado por todos os labirintos com a mesma disposição.
+    """
+    key = layout_key(tiles, width)
+    graph = _graphs.get(key)
+
+    if graph is None:
+        graph = _graphs[key] = JunctionGraph(tiles, width, key)
+
+    return graph
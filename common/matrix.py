@@ -1,71 +1,231 @@
-import copy
 from .enums import TileType, ItemType, EntityType
 from .cell import Cell
-from .maze import maze_matrix, W, E
+from .maze import maze_matrix
+from .distances import DistanceTable, distance_table
+from .junctions import JunctionGraph, junction_graph
+
+
+def _positions_of(items: bytes, item: ItemType, width: int) -> set[tuple[int, int]]:
+    """
+        Returns:
+            set[tuple[int, int]]: As posições (x, y) das células com o item.
+    """
+    positions = set()
+    index = items.find(item)
+
+    while index != -1:
+        positions.add((index % width, index // width))
+        index = items.find(item, index + 1)
+
+    return positions
+
+
+class MazeTemplate:
+    """
+        Modelo imutável de um labirinto, compartilhado por todas as partidas que o usam.
+
+        Guarda tudo o que não muda durante a partida (paredes, porta da área dos fantasmas e posições
+        iniciais) e o estado inicial dos itens. Os vetores de células já vêm prontos para os dois
+        estados da porta, então abrir ou fechar a área dos fantasmas apenas troca a referência.
+
+        Attributes:
+            width (int): Número de colunas.
+            height (int): Número de linhas.
+            tiles (bytes): Tipo de cada célula (TileType) no labirinto original, indexado por y * largura + x.
+            tiles_open (bytes): As células com a porta da área dos fantasmas aberta.
+            tiles_closed (bytes): As células com a porta fechada.
+            items (bytes): Item inicial de cada célula (0 quando vazia).
+            pac_dots (frozenset[tuple[int, int]]): Posições (x, y) iniciais dos pac-dots.
+            power_pellets (frozenset[tuple[int, int]]): Posições (x, y) iniciais das power pellets.
+            door (tuple[tuple[int, int], ...]): Células (x, y) da porta da área dos fantasmas.
+            spawn (dict[EntityType, tuple[int, int]]): Posições iniciais das entidades (não deve ser alterado).
+    """
+
+    def __init__(self, cells: list[list[Cell]], door: tuple, spawn: dict):
+        """
+            Args:
+                cells (list[list[Cell]]): A grade do labirinto (ver `common.maze`).
+                door (tuple): Células (x, y) da porta da área dos fantasmas.
+                spawn (dict): Entidade -> posição (x, y) inicial.
+        """
+        self.width = len(cells[0])
+        self.height = len(cells)
+        self.tiles = bytes(cell.tile for row in cells for cell in row)
+        self.items = bytes(cell.item or 0 for row in cells for cell in row)
+        self.door = door
+        self.spawn = spawn
+
+        self.tiles_open = self.__with_door(TileType.EMPTY)
+        self.tiles_closed = self.__with_door(TileType.WALL)
+
+        self.pac_dots = frozenset(_positions_of(self.items, ItemType.PAC_DOT, self.width))
+        self.power_pellets = frozenset(_positions_of(self.items, ItemType.POWER_PELLET, self.width))
+
+    def __with_door(self, tile: TileType) -> bytes:
+        tiles = bytearray(self.tiles)
+        for x, y in self.door:
+            tiles[y * self.width + x] = tile
+        return bytes(tiles)
+
+    def door_tiles(self, tiles: bytes) -> bytes | None:
+        """
+            Returns:
+                bytes | None: O vetor compartilhado igual a `tiles` (porta aberta ou fechada), ou None se
+                as células não correspondem a nenhum dos dois.
+        """
+        for shared in (self.tiles_open, self.tiles_closed):
+            if tiles == shared:
+                return shared
+        return None
+
+
+# Labirinto padrão do jogo
+DEFAULT_TEMPLATE = MazeTemplate(
+    maze_matrix,
+    door=((13, 12), (14, 12)),
+    spawn={
+        EntityType.PACMAN: (14,23),
+        EntityType.BLINKY: (12,14),
+        EntityType.INKY: (13,14),
+        EntityType.PINKY: (14,14),
+        EntityType.CLYDE: (15,14)
+    },
+)
+
+
+class CellView(Cell):
+    """
+        Célula de um `Matrix`: tem a interface de `Cell`, mas lê e altera diretamente os vetores do labirinto.
+        Alterar `tile` ou `item` altera o labirinto.
+    """
+    __slots__ = ('__matrix', '__index')
+
+    def __init__(self, matrix: 'Matrix', index: int):
+        self.__matrix = matrix
+        self.__index = index
+
+    @property
+    def tile(self) -> TileType:
+        return TileType(self.__matrix.tiles[self.__index])
+
+    @tile.setter
+    def tile(self, tile: TileType):
+        self.__matrix.set_tile(self.__index, tile)
+
+    @property
+    def item(self) -> ItemType | None:
+        item = self.__matrix.items[self.__index]
+        return ItemType(item) if item else None
+
+    @item.setter
+    def item(self, item: ItemType | None):
+        self.__matrix.set_item(self.__index, item)
 
 
 class Matrix:
     """
         Representa o labirinto do jogo.
 
-        A matriz é composta por objetos `Cell`, podendo ser:
-        - Parede (TileType.WALL) impede movimentação.
-        - Espaço vazio (TileType.EMPTY), podendo conter itens coletáveis.
+        O labirinto é guardado em dois vetores planos de bytes, indexados por `y * largura + x`:
+        - `tiles`: o tipo de cada célula (TileType). Parede (TileType.WALL) impede movimentação;
+          espaço vazio (TileType.EMPTY) pode conter itens coletáveis.
+        - `items`: o item de cada célula (ItemType), ou 0 quando vazia.
+
+        `get_cell` continua retornando uma célula com a interface de `Cell` (ver `CellView`).
+
+        As partes imutáveis vêm de um `MazeTemplate` compartilhado. Os vetores e os conjuntos de itens
+        também começam compartilhados com o modelo e só são copiados na primeira alteração (cópia na
+        escrita); a porta da área dos fantasmas alterna entre os vetores prontos do modelo. Criar ou
+        reiniciar uma partida, portanto, não copia o labirinto.
+
+        As posições dos pac-dots e das power pellets restantes são mantidas em conjuntos, atualizados
+        a cada item consumido: a condição de vitória e as buscas da IA não percorrem o labirinto.
+        Por isso, os itens e as células só devem ser alterados pelos métodos da classe
+        (`move_entity`, `set_item`, `set_items`, `set_tile`, abertura e fechamento da porta).
 
         A classe também armazena a posição de todas as entidades no jogo (Pac-Man e Fantasmas) e permite interagir com o labirinto
 
+        As distâncias pelo menor caminho entre duas posições (`distance`, `next_step`) vêm da tabela da
+        disposição atual das paredes (ver `common.distances`), carregada apenas na primeira consulta.
+        Da mesma forma, `junctions` retorna o grafo de junções e corredores da disposição atual (ver
+        `common.junctions`), usado nas buscas de caminho.
+
         Atributes:
-            matrix (list[list[Cell]]): Grid 28x31 contendo as células do labirinto.
+            template (MazeTemplate): O modelo do labirinto.
+            tiles (bytes | bytearray): Tipo de cada célula do grid 28x31.
+            items (bytes | bytearray): Item de cada célula do grid 28x31 (0 quando vazia).
+            pac_dots (set[tuple[int, int]]): Posições (x, y) dos pac-dots restantes.
+            power_pellets (set[tuple[int, int]]): Posições (x, y) das power pellets restantes.
             entities (dict[EntityType, tuple[int, int]]): Dicionário contendo as posições iniciais das entidades.
-            self.initial_positions: dict[EntityType, tuple[int, int]]: Posições iniciais das entidades para respawn. 
+            self.initial_positions: dict[EntityType, tuple[int, int]]: Posições iniciais das entidades para respawn
+                (compartilhado com o modelo, não deve ser alterado).
     """
 
-    def __init__(self):
-        self.matrix = self.get_matrix()
+    def __init__(self, template: MazeTemplate = DEFAULT_TEMPLATE):
+        """
+            Args:
+                template (MazeTemplate, optional): O modelo do labirinto. Padrão é o labirinto do jogo.
+        """
+        self.template = template
+        self.__width = template.width
+        self.__height = template.height
+
+        # Compartilhados com o modelo até a primeira alteração
+        self.tiles = template.tiles
+        self.items = template.items
+        self.pac_dots = template.pac_dots
+        self.power_pellets = template.power_pellets
+        self.__own_tiles = False
+        self.__own_items = False
+        self.__distances = None
+        self.__junctions = None
 
         # Posições atuais das entidades
-        self.entities = {
-            EntityType.PACMAN: (14,23),
-            EntityType.BLINKY: (12,14),
-            EntityType.INKY: (13,14),
-            EntityType.PINKY: (14,14),
-            EntityType.CLYDE: (15,14)
-        } 
+        self.entities = dict(template.spawn)
 
         # Posições iniciais das entidades
-        self.initial_positions = self.entities.copy()
+        self.initial_positions = template.spawn
 
     def get_matrix(self) -> list[list[Cell]]:
         """
-            Retorna a matriz do mapa predefinida.
-            
+            Monta uma grade de objetos `Cell` com o conteúdo atual do labirinto. Como em `common.maze`,
+            todas as paredes são o mesmo objeto; as demais células são independentes.
+
             Returns:
                 list[list[Cell]]: Grade contendo todas as células do labirinto.
         """
-        return copy.deepcopy(maze_matrix)
+        wall = Cell(TileType.WALL)
+        width = self.__width
+        tiles, items = self.tiles, self.items
+
+        return [
+            [wall if tiles[i] == TileType.WALL else Cell(TileType(tiles[i]), ItemType(items[i]) if items[i] else None)
+             for i in range(y * width, (y + 1) * width)]
+            for y in range(self.__height)
+        ]
 
     def width(self) -> int:
         """
-            Calcula e retorna a largura da matriz.
-            
+            Retorna a largura da matriz.
+
             Returns:
                 int: Número de colunas na matriz.
         """
-        return len(self.matrix[0])
+        return self.__width
 
     def height(self) -> int:
         """
-            Calcula a altura da matriz.
-            
+            Retorna a altura da matriz.
+
             Returns:
                 int: Número de linhas na matriz.
         """
-        return len(self.matrix)
-    
+        return self.__height
+
     def get_cell(self, x: int, y: int) -> Cell | None:
         """
             Retorna a célula na posição informada, caso a mesma exista.
-            
+
             Args:
                 x (int): Coordenada horizontal da célula.
                 y (int): Coordenada vertical da célula.
@@ -73,32 +233,25 @@ class Matrix:
             Returns:
                 Cell | None: A célula na posição (x, y), ou None se a posição estiver fora dos limites da matriz.
         """
-        if 0 <= y < len(self.matrix) and 0 <= x < len(self.matrix[0]):
-            return self.matrix[y][x]
+        if 0 <= y < self.__height and 0 <= x < self.__width:
+            return CellView(self, y * self.__width + x)
         return None
-    
+
     def is_valid_position(self, x: int, y: int) -> bool:
         """
             Verifica se a posição é acessível para movimento.
             Regras:
                 - Deve estar dentro dos limites do mapa.
                 - Não pode ser uma parede (WALL).
-            
+
             Args:
                 x (int): Coordenada horizontal da célula.
                 y (int): Coordenada vertical da célula.
-            
+
             Returns:
                 bool: True se a posição é válida para movimento, False caso contrário.
         """
-        cell = self.get_cell(x, y)
-
-        # Verifica limites da matriz
-        if not (0 <= x < self.width() and 0 <= y < self.height()):
-            return False  
-        
-        # Verifica se a célula é caminhável
-        return cell is not None and cell.is_walkable()
+        return 0 <= x < self.__width and 0 <= y < self.__height and self.tiles[y * self.__width + x] != TileType.WALL
 
     def get_entity_position(self, entity: EntityType) -> tuple[int, int] | None:
         """
@@ -115,16 +268,16 @@ class Matrix:
     def move_entity(self, entity: EntityType, dx: int, dy: int) -> ItemType | None:
         """
             Move uma entidade no labirinto e processa possíveis interações.
-            O movimento só é realizado se a posição de destino for válida. 
-            Apenas o Pac-Man pode coletar itens (PAC_DOT ou POWER_PELLET). 
-            
+            O movimento só é realizado se a posição de destino for válida.
+            Apenas o Pac-Man pode coletar itens (PAC_DOT ou POWER_PELLET).
+
             Args:
                 entity (EntityType): A entidade a ser movida (PACMAN ou fantasma).
                 dx (int): Deslocamento no eixo X (-1: esquerda, 0: nenhum, 1: direita).
                 dy (int): Deslocamento no eixo Y (-1: cima, 0: nenhum, 1: baixo).
-                
+
             Returns:
-                ItemType | None: 
+                ItemType | None:
                     - ItemType.PAC_DOT se o Pac-Man coletou um pac-dot.
                     - ItemType.POWER_PELLET se o Pac-Man coletou uma power pellet.
                     - None se nenhum item foi coletado ou se a entidade não é o Pac-Man.
@@ -136,49 +289,266 @@ class Matrix:
         # Posição atual
         x, y = position
 
-        # nx novo X (posição futura)	
-        # ny novo Y (posição futura)	
+        # nx novo X (posição futura)
+        # ny novo Y (posição futura)
         nx, ny = x + dx, y + dy
-        
-        # Valida o movimento
-        if not self.is_valid_position(nx, ny):  
-            return None 
 
-        cell = self.matrix[ny][nx]
+        # Valida o movimento
+        if not self.is_valid_position(nx, ny):
+            return None
 
         # Se for Pac-Man, permite consumir itens
         collected = None
-        if entity == EntityType.PACMAN and cell.item is not None:
-            collected = cell.consume_item()
+        if entity == EntityType.PACMAN:
+            index = ny * self.__width + nx
+            item = self.items[index]
+
+            if item:
+                collected = ItemType(item)
+                self.__take_items()
+                self.items[index] = 0
+                self.__positions(item).discard((nx, ny))
 
         # Atualiza posição da entidade
         self.entities[entity] = (nx, ny)
         return collected  # Retorna item coletado ou None
-    
+
     def has_remaining_pac_dots(self) -> bool:
         """
             Verifica se ainda existem PAC-DOTS coletáveis no mapa.
-            Percorre toda a matriz em busca de células que contenham PAC_DOT. 
-        
+
             Returns:
                 bool: True se houver pelo menos um PAC_DOT no mapa, False caso contrário.
         """
-        for row in self.matrix:
-            for cell in row:
-                if cell.has_pac_dot():
-                    return True
-        return False
-    
+        return bool(self.pac_dots)
+
+    def __take_items(self):
+        """
+            Copia os itens compartilhados com o modelo antes da primeira alteração.
+        """
+        if not self.__own_items:
+            self.items = bytearray(self.items)
+            self.pac_dots = set(self.pac_dots)
+            self.power_pellets = set(self.power_pellets)
+            self.__own_items = True
+
+    def __positions(self, item: int) -> set[tuple[int, int]]:
+        """
+            Returns:
+                set[tuple[int, int]]: O conjunto das posições do item.
+        """
+        return self.pac_dots if item == ItemType.PAC_DOT else self.power_pellets
+
+    def set_item(self, index: int, item: ItemType | None):
+        """
+            Altera o item de uma célula.
+
+            Args:
+                index (int): A célula, como y * largura + x.
+                item (ItemType | None): O novo item, ou None para esvaziar a célula.
+        """
+        position = (index % self.__width, index // self.__width)
+        previous = self.items[index]
+
+        if previous == (item or 0):
+            return
+
+        self.__take_items()
+
+        if previous:
+            self.__positions(previous).discard(position)
+
+        self.items[index] = item or 0
+
+        if item:
+            self.__positions(item).add(position)
+
+    def set_items(self, items: bytes):
+        """
+            Substitui os itens de todas as células (por exemplo, pelos itens de um keyframe).
+
+            Args:
+                items (bytes): O item de cada célula, indexado por y * largura + x (0 quando vazia).
+
+            Raises:
+                ValueError: Se a quantidade de itens não corresponder ao tamanho do labirinto.
+        """
+        if len(items) != len(self.items):
+            raise ValueError(f"Esperados {len(self.items)} itens, recebidos {len(items)}")
+
+        if items == self.items:
+            return
+
+        self.__load_items(items)
+
+    def __load_items(self, items: bytes):
+        """
+            Passa a usar os itens informados, compartilhando os do modelo quando forem iguais, e
+            reconstrói os conjuntos de posições.
+        """
+        template = self.template
+
+        if items == template.items:
+            self.items = template.items
+            self.pac_dots = template.pac_dots
+            self.power_pellets = template.power_pellets
+            self.__own_items = False
+            return
+
+        self.items = bytearray(items)
+        self.pac_dots = _positions_of(self.items, ItemType.PAC_DOT, self.__width)
+        self.power_pellets = _positions_of(self.items, ItemType.POWER_PELLET, self.__width)
+        self.__own_items = True
+
+    def set_tile(self, index: int, tile: TileType):
+        """
+            Altera o tipo de uma célula.
+
+            Args:
+                index (int): A célula, como y * largura + x.
+                tile (TileType): O novo tipo.
+        """
+        if not self.__own_tiles:
+            self.tiles = bytearray(self.tiles)
+            self.__own_tiles = True
+
+        self.tiles[index] = tile
+        self.__distances = None
+        self.__junctions = None
+
+    def distances(self) -> DistanceTable:
+        """
+            Returns:
+                DistanceTable: A tabela de distâncias da disposição atual das paredes.
+        """
+        if self.__distances is None:
+            self.__distances = distance_table(self.tiles, self.__width)
+        return self.__distances
+
+    def junctions(self) -> JunctionGraph:
+        """
+            Returns:
+                JunctionGraph: O grafo de junções e corredores da disposição atual das paredes.
+        """
+        if self.__junctions is None:
+            self.__junctions = junction_graph(self.tiles, self.__width)
+        return self.__junctions
+
+    def distance(self, a: tuple[int, int], b: tuple[int, int]) -> int | None:
+        """
+            Distância, em casas, pelo menor caminho entre duas posições, respeitando as paredes.
+
+            Args:
+                a (tuple[int, int]): Posição (x, y) de origem.
+                b (tuple[int, int]): Posição (x, y) de destino.
+
+            Returns:
+                int | None: A distância, ou None se uma das posições não for acessível ou não houver caminho.
+        """
+        return self.distances().distance(a, b)
+
+    def next_step(self, a: tuple[int, int], b: tuple[int, int]) -> tuple[int, int] | None:
+        """
+            Primeiro passo de um menor caminho entre duas posições.
+
+            Args:
+                a (tuple[int, int]): Posição (x, y) de origem.
+                b (tuple[int, int]): Posição (x, y) de destino.
+
+            Returns:
+                tuple[int, int] | None: A posição vizinha de a na direção de b (a própria a, se a == b),
+                ou None se não houver caminho.
+        """
+        return self.distances().next_step(a, b)
+
+    def is_ghost_area_open(self) -> bool:
+        """
+            Verifica se a porta da área dos fantasmas está aberta.
+
+            Returns:
+                bool: True se as células da porta forem caminháveis, False caso contrário.
+        """
+        x, y = self.template.door[0]
+        return self.tiles[y * self.__width + x] != TileType.WALL
+
     def open_ghost_area(self):
         """
-            Abre a área dos fantasmas redefinindo-o para uma célula (Cell) do tipo TileType.EMPTY (E)
+            Abre a área dos fantasmas transformando a porta em células vazias (TileType.EMPTY, sem item)
         """
-        self.matrix[12][13] = E()
-        self.matrix[12][14] = E()
-        
+        self.__set_door(TileType.EMPTY)
+
     def close_ghost_area(self):
         """
-            Fecha a área dos fantasmas redefinindo-o para uma célula (Cell) do tipo TileType.WALL (W)
+            Fecha a área dos fantasmas transformando a porta em paredes (TileType.WALL)
         """
-        self.matrix[12][13] = W
-        self.matrix[12][14] = W
\ No newline at end of file
+        self.__set_door(TileType.WALL)
+
+    def __set_door(self, tile: TileType):
+        template = self.template
+        self.__distances = None
+        self.__junctions = None
+
+        # Sem outras alterações nas células, basta trocar pelo vetor pronto do modelo
+        if not self.__own_tiles:
+            self.tiles = template.tiles_open if tile == TileType.EMPTY else template.tiles_closed
+
+        for x, y in template.door:
+            index = y * self.__width + x
+
+            if self.__own_tiles:
+                self.tiles[index] = tile
+            self.set_item(index, None)
+
+    def legacy_state(self) -> dict:
+        """
+            Estado no formato das versões anteriores do Matrix (grade de objetos `Cell`), usado para
+            serializar o GameState para os clientes antigos (ver `server.network.legacy`).
+
+            Returns:
+                dict: 'matrix', 'entities' e 'initial_positions'.
+        """
+        return {
+            'matrix': self.get_matrix(),
+            'entities': dict(self.entities),
+            'initial_positions': dict(self.initial_positions),
+        }
+
+    def __getstate__(self) -> dict:
+        # Os conjuntos de posições dos itens são reconstruídos por __setstate__
+        state = {
+            'tiles': bytes(self.tiles),
+            'items': bytes(self.items),
+            'width': self.__width,
+            'entities': self.entities,
+            'initial_positions': self.initial_positions,
+        }
+
+        # O modelo padrão não é serializado
+        if self.template is not DEFAULT_TEMPLATE:
+            state['template'] = self.template
+
+        return state
+
+    def __setstate__(self, state: dict):
+        # Aceita também o formato das versões anteriores (grade de objetos Cell)
+        if 'matrix' in state:
+            rows = state['matrix']
+            state = dict(state,
+                         tiles=bytes(cell.tile for row in rows for cell in row),
+                         items=bytes(cell.item or 0 for row in rows for cell in row),
+                         width=len(rows[0]))
+
+        self.template = state.get('template', DEFAULT_TEMPLATE)
+        self.__width = state['width']
+        self.__height = len(state['tiles']) // self.__width
+
+        # Volta a compartilhar os vetores do modelo quando as células forem as dele
+        tiles = self.template.door_tiles(state['tiles'])
+        self.__own_tiles = tiles is None
+        self.tiles = bytearray(state['tiles']) if tiles is None else tiles
+        self.__distances = None
+        self.__junctions = None
+
+        self.__load_items(state['items'])
+        self.entities = state['entities']
+        self.initial_positions = state['initial_positions']
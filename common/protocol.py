@@ -0,0 +1,451 @@
+"""
+    Formato binário versionado das mensagens trocadas entre cliente e servidor.
+
+    Substitui o pickle na rede: os payloads ficam menores, mais rápidos de decodificar e
+    seguros para receber de peers não confiáveis (nenhum objeto arbitrário é reconstruído).
+
+    Enquadramento: [4 bytes Big-Endian (tamanho do payload)] + [payload]
+                   (em UDP, cada datagrama contém exatamente um payload, sem o cabeçalho de tamanho)
+    Payload:       [1 byte (versão)] + [1 byte (tipo)] + [corpo]
+
+    Handshake: o cliente envia HELLO logo após conectar, com a sua versão do protocolo (no prefixo),
+    as codificações que suporta, a taxa de atualização preferida e a sua identificação. O servidor
+    responde com WELCOME (as codificações escolhidas, o mais eficiente suportado pelos dois lados) e
+    ASSIGN, ou com REJECT. REJECT é legível por qualquer versão do protocolo. Clientes antigos, que
+    usam pickle e não enviam HELLO, são atendidos por um caminho de compatibilidade no servidor
+    (ver `server.network.legacy`).
+
+    Corpos:
+        HELLO:     [u32 sala (0 = escolha automática)] [u8 flags (HELLO_UDP: estado via UDP; HELLO_SPECTATOR: sem fantasma)]
+                   [u8 codificações suportadas (ENCODING_*)] [u32 id do dicionário de compressão (0 = nenhum)]
+                   [u8 atualizações por segundo preferidas (0 = as do servidor)] [u8 n + n bytes nome (UTF-8)]
+        WELCOME:   [u8 codificações escolhidas] [u8 ticks por segundo do servidor] [u8 ticks entre envios]
+        REJECT:    [u8 motivo (REJECT_*)] [u8 versão do protocolo do servidor]
+        ASSIGN:    [u8 fantasma (0 = espectador)] [u32 sala]
+        UDP_TOKEN: [u32 token] [u16 porta UDP do servidor (0 = UDP indisponível)]
+        UDP_HELLO: [u32 token] (datagrama do cliente que associa o seu endereço UDP à sessão TCP)
+        INPUT:    [u8 PlayerAction] [u32 sequência] [u32 instante do cliente (ms)]
+        ACK:      [u32 sequência] [u32 instante do cliente (ms)] [u32 tick em que a entrada foi aplicada]
+        KEYFRAME: [u32 tick] [u8 porta aberta] [5 x (u8 x, u8 y)] [campos] [u16 células] [bitset dots] [bitset pellets]
+                  (bitsets com 1 bit por célula, a primeira célula no bit mais significativo)
+        DELTA:    [u32 tick] [u32 tick base] [u8 porta] [u8 n + n x (u8 entidade, u8 x, u8 y)]
+                  [u16 n + n x u16 célula consumida] [u8 n + n x (u8 campo, i32 valor)]
+
+        COMPRESSED: [payload completo de um KEYFRAME ou DELTA, comprimido (ver `common.compression`)]
+
+    Keyframes e deltas são as mesmas tuplas produzidas por `common.snapshot.Snapshot`.
+"""
+
+import struct
+
+from . import compression
+from .enums import EntityType, ItemType, PlayerAction
+from .snapshot import KEYFRAME, DELTA, ENTITIES, FIELDS, GHOSTS
+
+PROTOCOL_VERSION = 4
+
+# Tipos de mensagem
+MSG_ASSIGN = 1
+MSG_INPUT = 2
+MSG_KEYFRAME = 3
+MSG_DELTA = 4
+MSG_HELLO = 5
+MSG_ACK = 6
+MSG_UDP_TOKEN = 7
+MSG_UDP_HELLO = 8
+MSG_COMPRESSED = 9
+MSG_WELCOME = 10
+MSG_REJECT = 11
+
+# Flags do HELLO
+HELLO_UDP = 0x01
+HELLO_SPECTATOR = 0x02      # Entra como espectador, sem ocupar um fantasma (clientes de observação e relays)
+
+# Codificações dos snapshots (os keyframes binários são sempre suportados)
+ENCODING_DELTA = 0x01       # Deltas entre keyframes
+ENCODING_COMPRESSED = 0x02  # Snapshots comprimidos com o dicionário pré-compartilhado
+
+# Motivos do REJECT
+REJECT_VERSION = 1          # Versão do protocolo não suportada
+REJECT_FULL = 2             # Limite de salas atingido
+
+HEADER = struct.Struct("!I")            # Tamanho do payload
+PREFIX = struct.Struct("!BB")           # Versão e tipo
+KEYFRAME_HEAD = struct.Struct("!IB")    # Tick e porta aberta
+DELTA_HEAD = struct.Struct("!IIB")      # Tick, tick base e porta
+POSITION = struct.Struct("!BB")
+ENTITY_CHANGE = struct.Struct("!BBB")
+FIELD_CHANGE = struct.Struct("!Bi")
+COUNT8 = struct.Struct("!B")
+COUNT16 = struct.Struct("!H")
+ROOM = struct.Struct("!I")
+HELLO = struct.Struct("!IBBIB")         # Sala, flags, codificações, id do dicionário e atualizações por segundo
+WELCOME = struct.Struct("!BBB")         # Codificações, ticks por segundo e ticks entre envios
+REJECT = struct.Struct("!BB")           # Motivo e versão do servidor
+UDP_TOKEN = struct.Struct("!IH")        # Token e porta
+TOKEN = struct.Struct("!I")
+INDEX16 = struct.Struct("!H")
+INPUT = struct.Struct("!BII")           # Ação, sequência e instante do cliente
+ACK = struct.Struct("!III")             # Sequência, instante do cliente e tick
+
+# Campos do keyframe: status, winner, pacman_lives, frightened_timer, restart_game_timer,
+# ghost_area_closed, restarted e os placares dos fantasmas
+KEYFRAME_FIELDS = struct.Struct("!BBBHHBB" + "i" * len(GHOSTS))
+
+NO_POSITION = 0xFF  # Marca uma entidade sem posição
+
+MAX_CLIENT_PAYLOAD = 256  # Tamanho máximo aceito para mensagens vindas dos clientes
+MAX_NAME = 32             # Tamanho máximo, em bytes, da identificação do cliente
+
+# Tabelas de tradução entre o vetor de itens (1 byte por célula) e os bitsets em texto ('0'/'1')
+_ITEM_TO_BIT = {}
+_BIT_TO_ITEM = {}
+for _item in (ItemType.PAC_DOT, ItemType.POWER_PELLET):
+    _table = bytearray(b"0" * 256)
+    _table[_item] = ord("1")
+    _ITEM_TO_BIT[_item] = bytes(_table)
+    _BIT_TO_ITEM[_item] = bytes.maketrans(b"01", bytes([0, _item]))
+del _item, _table
+
+# Valores da porta no delta
+DOOR_UNCHANGED = 0
+DOOR_OPENED = 1
+DOOR_CLOSED = 2
+
+
+class ProtocolError(ValueError):
+    """ Ocorre quando um payload não segue o formato binário esperado.
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+class VersionMismatch(ProtocolError):
+    """ Ocorre quando um payload usa outra versão do protocolo.
+
+    Attributes:
+        version (int): A versão do payload recebido.
+    """
+    def __init__(self, version: int):
+        super().__init__(f"Versão de protocolo não suportada: {version}")
+        self.version = version
+
+
+def frame(payload: bytes) -> bytes:
+    """
+        Adiciona o cabeçalho com o tamanho ao payload.
+
+        Args:
+            payload (bytes): O payload codificado.
+
+        Returns:
+            bytes: O frame pronto para envio.
+    """
+    return HEADER.pack(len(payload)) + payload
+
+
+def _prefix(msg_type: int) -> bytes:
+    return PREFIX.pack(PROTOCOL_VERSION, msg_type)
+
+
+def encode_hello(room_id: int | None, flags: int = 0, encodings: int = ENCODING_DELTA,
+                 update_rate: int | None = None, name: str = "") -> bytes:
+    """
+        Codifica o HELLO, enviado pelo cliente logo após conectar, com o pedido de entrada em uma sala.
+        Sem sala (None ou 0), o servidor escolhe automaticamente. Com ENCODING_COMPRESSED, o
+        identificador do dicionário local é enviado junto.
+    """
+    if not compression.available():
+        encodings &= ~ENCODING_COMPRESSED
+
+    dictionary_id = compression.DICTIONARY_ID if encodings & ENCODING_COMPRESSED else 0
+    name_bytes = name.encode()[:MAX_NAME]
+
+    return (
+        _prefix(MSG_HELLO)
+        + HELLO.pack(room_id or 0, flags, encodings, dictionary_id, min(update_rate or 0, 0xFF))
+        + COUNT8.pack(len(name_bytes)) + name_bytes
+    )
+
+
+def encode_welcome(encodings: int, tick_rate: int, interval: int) -> bytes:
+    """
+        Codifica a resposta ao HELLO: as codificações escolhidas e a taxa de envio do estado
+        (a cada `interval` ticks de `tick_rate` por segundo).
+    """
+    return _prefix(MSG_WELCOME) + WELCOME.pack(encodings, tick_rate, interval)
+
+
+def encode_reject(reason: int) -> bytes:
+    """
+        Codifica a recusa da conexão (REJECT_*), com a versão do protocolo deste lado.
+    """
+    return _prefix(MSG_REJECT) + REJECT.pack(reason, PROTOCOL_VERSION)
+
+
+def accepts_compression(encodings: int, dictionary_id: int) -> bool:
+    """
+        Verifica se os snapshots podem ser comprimidos para um cliente, a partir do seu HELLO.
+
+        Returns:
+            bool: True se o cliente suporta compressão e usa o mesmo dicionário deste lado.
+    """
+    return bool(encodings & ENCODING_COMPRESSED) and compression.available() and dictionary_id == compression.DICTIONARY_ID
+
+
+def encode_udp_token(token: int, port: int) -> bytes:
+    """
+        Codifica o token da sessão UDP e a porta UDP do servidor (0 se o UDP estiver indisponível).
+    """
+    return _prefix(MSG_UDP_TOKEN) + UDP_TOKEN.pack(token, port)
+
+
+def encode_udp_hello(token: int) -> bytes:
+    """
+        Codifica o datagrama com que o cliente registra o seu endereço UDP.
+    """
+    return _prefix(MSG_UDP_HELLO) + TOKEN.pack(token)
+
+
+def encode_assign(ghost: EntityType | None, room_id: int) -> bytes:
+    """
+        Codifica a atribuição de fantasma (ou espectador) e da sala, enviada ao cliente.
+    """
+    return _prefix(MSG_ASSIGN) + COUNT8.pack(int(ghost) if ghost else 0) + ROOM.pack(room_id)
+
+
+def encode_input(action: PlayerAction, seq: int = 0, timestamp: int = 0) -> bytes:
+    """
+        Codifica uma ação do jogador, com o número de sequência e o instante (em ms, módulo 2^32)
+        em que o cliente a enviou.
+    """
+    return _prefix(MSG_INPUT) + INPUT.pack(action.value, seq, timestamp & 0xFFFFFFFF)
+
+
+def encode_ack(seq: int, timestamp: int, tick: int) -> bytes:
+    """
+        Codifica a confirmação da última entrada aplicada pela simulação, ecoando o instante
+        enviado pelo cliente para que ele meça a latência entre a entrada e o efeito.
+    """
+    return _prefix(MSG_ACK) + ACK.pack(seq, timestamp, tick)
+
+
+def encode_compressed(payload: bytes) -> bytes:
+    """
+        Comprime um payload de snapshot já codificado.
+    """
+    return _prefix(MSG_COMPRESSED) + compression.compress(payload)
+
+
+def _bitset(items: bytes, item: ItemType) -> bytes:
+    """
+        Monta um bitset (1 bit por célula, o primeiro no bit mais significativo) das células que contêm o item.
+    """
+    size = (len(items) + 7) // 8
+    bits = items.translate(_ITEM_TO_BIT[item]).ljust(size * 8, b"0")
+    return int(bits, 2).to_bytes(size, "big")
+
+
+def _items_from_bitset(bits: bytes, cells: int, item: ItemType) -> int:
+    """
+        Converte um bitset no vetor de itens (1 byte por célula), representado como inteiro big-endian
+        para que os vetores de itens diferentes possam ser combinados por soma.
+    """
+    text = format(int.from_bytes(bits, "big"), f"0{len(bits) * 8}b")[:cells]
+    return int.from_bytes(text.encode().translate(_BIT_TO_ITEM[item]), "big")
+
+
+def encode_snapshot(message: tuple) -> bytes:
+    """
+        Codifica uma mensagem de snapshot (keyframe ou delta de `common.snapshot`).
+
+        Args:
+            message (tuple): A tupla do keyframe ou do delta.
+
+        Returns:
+            bytes: O payload codificado.
+
+        Raises:
+            ProtocolError: Se o tipo da mensagem for desconhecido.
+    """
+    if message[0] == KEYFRAME:
+        _, tick, entities, items, ghost_area_open, fields = message
+
+        parts = [_prefix(MSG_KEYFRAME), KEYFRAME_HEAD.pack(tick, int(ghost_area_open))]
+        for pos in entities:
+            parts.append(POSITION.pack(*pos) if pos is not None else POSITION.pack(NO_POSITION, NO_POSITION))
+
+        parts.append(KEYFRAME_FIELDS.pack(*fields))
+        parts.append(COUNT16.pack(len(items)))
+        parts.append(_bitset(items, ItemType.PAC_DOT))
+        parts.append(_bitset(items, ItemType.POWER_PELLET))
+        return b"".join(parts)
+
+    if message[0] == DELTA:
+        _, tick, base_tick, entities, consumed, door, fields = message
+
+        if door is None:
+            door_code = DOOR_UNCHANGED
+        else:
+            door_code = DOOR_OPENED if door else DOOR_CLOSED
+
+        parts = [_prefix(MSG_DELTA), DELTA_HEAD.pack(tick, base_tick, door_code)]
+
+        parts.append(COUNT8.pack(len(entities)))
+        parts.extend(ENTITY_CHANGE.pack(*change) for change in entities)
+
+        parts.append(COUNT16.pack(len(consumed)))
+        parts.extend(INDEX16.pack(index) for index in consumed)
+
+        parts.append(COUNT8.pack(len(fields)))
+        parts.extend(FIELD_CHANGE.pack(i, value) for i, value in fields.items())
+        return b"".join(parts)
+
+    raise ProtocolError(f"Tipo de snapshot desconhecido: {message[0]}")
+
+
+def _decode_keyframe(payload: bytes, offset: int) -> tuple:
+    tick, door = KEYFRAME_HEAD.unpack_from(payload, offset)
+    offset += KEYFRAME_HEAD.size
+
+    entities = []
+    for _ in ENTITIES:
+        x, y = POSITION.unpack_from(payload, offset)
+        offset += POSITION.size
+        entities.append(None if x == NO_POSITION else (x, y))
+
+    fields = KEYFRAME_FIELDS.unpack_from(payload, offset)
+    offset += KEYFRAME_FIELDS.size
+
+    (cells,) = COUNT16.unpack_from(payload, offset)
+    offset += COUNT16.size
+
+    size = (cells + 7) // 8
+    dots = payload[offset:offset + size]
+    pellets = payload[offset + size:offset + 2 * size]
+
+    if len(pellets) != size:
+        raise ProtocolError("Keyframe truncado")
+
+    # Cada célula contém no máximo um item, então os vetores podem ser somados
+    items = (
+        _items_from_bitset(dots, cells, ItemType.PAC_DOT)
+        + _items_from_bitset(pellets, cells, ItemType.POWER_PELLET)
+    ).to_bytes(cells, "big")
+
+    return (KEYFRAME, tick, tuple(entities), items, bool(door), fields)
+
+
+def _decode_delta(payload: bytes, offset: int) -> tuple:
+    tick, base_tick, door_code = DELTA_HEAD.unpack_from(payload, offset)
+    offset += DELTA_HEAD.size
+
+    (count,) = COUNT8.unpack_from(payload, offset)
+    offset += COUNT8.size
+    entities = []
+    for _ in range(count):
+        index, x, y = ENTITY_CHANGE.unpack_from(payload, offset)
+        offset += ENTITY_CHANGE.size
+        if index >= len(ENTITIES):
+            raise ProtocolError(f"Entidade inválida no delta: {index}")
+        entities.append((index, x, y))
+
+    (count,) = COUNT16.unpack_from(payload, offset)
+    offset += COUNT16.size
+    consumed = tuple(INDEX16.unpack_from(payload, offset + i * INDEX16.size)[0] for i in range(count))
+    offset += count * INDEX16.size
+
+    (count,) = COUNT8.unpack_from(payload, offset)
+    offset += COUNT8.size
+    fields = {}
+    for _ in range(count):
+        index, value = FIELD_CHANGE.unpack_from(payload, offset)
+        offset += FIELD_CHANGE.size
+        if index >= len(FIELDS) + len(GHOSTS):
+            raise ProtocolError(f"Campo inválido no delta: {index}")
+        fields[index] = value
+
+    door = None if door_code == DOOR_UNCHANGED else door_code == DOOR_OPENED
+    return (DELTA, tick, base_tick, tuple(entities), consumed, door, fields)
+
+
+def decode(payload: bytes) -> tuple[int, object]:
+    """
+        Decodifica um payload recebido.
+
+        Args:
+            payload (bytes): O payload, sem o cabeçalho de tamanho.
+
+        Returns:
+            tuple[int, object]: O tipo da mensagem e seu conteúdo:
+                - MSG_HELLO: tuple[int, int, int, int, int, str] (sala pedida, 0 para automática, flags,
+                  codificações, id do dicionário, atualizações por segundo preferidas e nome)
+                - MSG_WELCOME: tuple[int, int, int] (codificações, ticks por segundo e ticks entre envios)
+                - MSG_REJECT: tuple[int, int] (motivo e versão do protocolo de quem recusou)
+                - MSG_UDP_TOKEN: tuple[int, int] (token e porta UDP)
+                - MSG_UDP_HELLO: int (token)
+                - MSG_ASSIGN: tuple[EntityType | None, int] (fantasma e sala)
+                - MSG_INPUT: tuple[PlayerAction, int, int] (ação, sequência e instante do cliente)
+                - MSG_ACK: tuple[int, int, int] (sequência, instante do cliente e tick)
+                - MSG_KEYFRAME / MSG_DELTA: a tupla de snapshot (ver `common.snapshot`)
+                - MSG_COMPRESSED: bytes (o payload original, ainda a decodificar)
+
+        Raises:
+            VersionMismatch: Se o payload usar outra versão do protocolo.
+            ProtocolError: Se o tipo ou o conteúdo forem inválidos.
+    """
+    try:
+        version, msg_type = PREFIX.unpack_from(payload, 0)
+        offset = PREFIX.size
+
+        # REJECT tem o mesmo formato em todas as versões
+        if msg_type == MSG_REJECT:
+            return msg_type, REJECT.unpack_from(payload, offset)
+
+        if version != PROTOCOL_VERSION:
+            raise VersionMismatch(version)
+
+        if msg_type == MSG_HELLO:
+            hello = HELLO.unpack_from(payload, offset)
+            (size,) = COUNT8.unpack_from(payload, offset + HELLO.size)
+            start = offset + HELLO.size + COUNT8.size
+            name = bytes(payload[start:start + min(size, MAX_NAME)]).decode(errors="replace")
+            return msg_type, (*hello, name)
+
+        if msg_type == MSG_WELCOME:
+            return msg_type, WELCOME.unpack_from(payload, offset)
+
+        if msg_type == MSG_UDP_TOKEN:
+            return msg_type, UDP_TOKEN.unpack_from(payload, offset)
+
+        if msg_type == MSG_UDP_HELLO:
+            (token,) = TOKEN.unpack_from(payload, offset)
+            return msg_type, token
+
+        if msg_type == MSG_ASSIGN:
+            (ghost,) = COUNT8.unpack_from(payload, offset)
+            (room_id,) = ROOM.unpack_from(payload, offset + COUNT8.size)
+            return msg_type, (EntityType(ghost) if ghost else None, room_id)
+
+        if msg_type == MSG_INPUT:
+            action, seq, timestamp = INPUT.unpack_from(payload, offset)
+            return msg_type, (PlayerAction(action), seq, timestamp)
+
+        if msg_type == MSG_ACK:
+            return msg_type, ACK.unpack_from(payload, offset)
+
+        if msg_type == MSG_KEYFRAME:
+            return msg_type, _decode_keyframe(payload, offset)
+
+        if msg_type == MSG_DELTA:
+            return msg_type, _decode_delta(payload, offset)
+
+        if msg_type == MSG_COMPRESSED:
+            return msg_type, compression.decompress(payload[offset:])
+
+    except (struct.error, ValueError) as e:
+        if isinstance(e, ProtocolError):
+            raise
+        raise ProtocolError(f"Payload inválido: {e}")
+
+    raise ProtocolError(f"Tipo de mensagem desconhecido: {msg_type}")
@@ -0,0 +1,419 @@
+"""
+    Formato dos arquivos de replay das partidas e leitor.
+
+    O servidor pode gravar cada tick de uma partida (ver `server.recorder`) em um arquivo binário
+    compacto, escrito apenas com acréscimos no final. Os snapshots são gravados no mesmo formato
+    usado na rede (`common.protocol`): um keyframe no início e periodicamente, e deltas nos
+    demais ticks, com as posições alteradas, os itens consumidos e os campos alterados (vidas,
+    placares, status, timers), que registram os eventos da partida.
+
+    Arquivo:  [cabeçalho] [registro]* [índice] [rodapé]
+    Cabeçalho: [4 bytes "PMRP"] [u8 versão do formato] [u8 versão do protocolo] [u32 sala]
+               [u8 ticks por segundo] [u8 largura] [u8 altura] [u64 início (ms desde a época)]
+               [bitset das paredes do labirinto (1 bit por célula, a primeira no bit mais significativo)]
+    Registro:  [u32 tamanho (sem este campo)] [u32 tick] [u8 n + n x (u8 fantasma, u8 PlayerAction, u32 sequência)]
+               [payload do KEYFRAME ou DELTA]
+               (as entradas dos jogadores aplicadas no tick)
+    Índice:    [n x (u32 tick, u64 posição)] dos registros com keyframe
+    Rodapé:    [u32 n] [u32 último tick] [u64 posição do índice] [4 bytes "PMIX"]
+
+    O índice e o rodapé são escritos quando a gravação é encerrada. Sem eles (servidor
+    interrompido), o leitor reconstrói o índice percorrendo os registros e ignora um último
+    registro incompleto.
+
+    Para inspecionar um replay, execute a partir da raiz do projeto:
+
+        python3 -m common.replay replays/arquivo.replay --tick 200
+"""
+
+import os
+import mmap
+import time
+import struct
+import argparse
+
+from . import protocol
+from .enums import EntityType, PlayerAction, TileType
+from .game_state import GameState
+from .snapshot import ENTITIES, FIELDS, GHOSTS, KEYFRAME, apply_message
+
+FORMAT_VERSION = 1
+MAGIC = b"PMRP"
+INDEX_MAGIC = b"PMIX"
+EXTENSION = ".replay"
+
+HEADER = struct.Struct("!4sBBIBBBQ")    # Magic, versões, sala, ticks por segundo, largura, altura e início
+RECORD = struct.Struct("!IIB")          # Tamanho, tick e quantidade de entradas
+RECORD_INPUT = struct.Struct("!BBI")    # Fantasma, ação e sequência
+INDEX_ENTRY = struct.Struct("!IQ")      # Tick e posição do registro
+TRAILER = struct.Struct("!IIQ4s")       # Entradas do índice, último tick, posição do índice e magic
+
+SIZE = struct.Struct("!I")
+
+
+class ReplayError(ValueError):
+    """ Ocorre quando um arquivo não é um replay válido ou foi gravado em outra versão.
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+
+
+def walls_bitset(matrix) -> bytes:
+    """
+        Args:
+            matrix (Matrix): O labirinto.
+
+        Returns:
+            bytes: O bitset das paredes, linha a linha.
+    """
+    bits = "".join("1" if tile == TileType.WALL else "0" for tile in matrix.tiles)
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big") if bits else b""
+
+
+def encode_header(room_id: int, tick_rate: int, matrix, started: float | None = None) -> bytes:
+    """
+        Codifica o cabeçalho de um replay.
+
+        Args:
+            room_id (int): A sala gravada.
+            tick_rate (int): Ticks da simulação por segundo.
+            matrix (Matrix): O labirinto da partida.
+            started (float, optional): Instante do início (time.time()). Padrão é o instante atual.
+
+        Returns:
+            bytes: O cabeçalho.
+    """
+    started = time.time() if started is None else started
+
+    return HEADER.pack(MAGIC, FORMAT_VERSION, protocol.PROTOCOL_VERSION, room_id, tick_rate,
+                       matrix.width(), matrix.height(), int(started * 1000)) + walls_bitset(matrix)
+
+
+def encode_record(tick: int, inputs, payload) -> bytes:
+    """
+        Codifica o registro de um tick.
+
+        Args:
+            tick (int): O tick do servidor.
+            inputs (list[tuple[EntityType, PlayerAction, int]]): As entradas aplicadas no tick.
+            payload (bytes): O payload do keyframe ou do delta do tick.
+
+        Returns:
+            bytes: O registro.
+    """
+    inputs = inputs[:255]
+    size = RECORD.size - SIZE.size + RECORD_INPUT.size * len(inputs) + len(payload)
+
+    parts = [RECORD.pack(size, tick, len(inputs))]
+    parts.extend(RECORD_INPUT.pack(ghost.value, action.value, seq) for ghost, action, seq in inputs)
+    parts.append(payload)
+    return b"".join(parts)
+
+
+def encode_index(index: list[tuple[int, int]], last_tick: int, offset: int) -> bytes:
+    """
+        Codifica o índice dos keyframes e o rodapé.
+
+        Args:
+            index (list[tuple[int, int]]): (tick, posição) de cada registro com keyframe.
+            last_tick (int): O tick do último registro.
+            offset (int): Posição do índice no arquivo (o final dos registros).
+
+        Returns:
+            bytes: O índice seguido do rodapé.
+    """
+    parts = [INDEX_ENTRY.pack(tick, position) for tick, position in index]
+    parts.append(TRAILER.pack(len(index), last_tick, offset, INDEX_MAGIC))
+    return b"".join(parts)
+
+
+def is_keyframe(payload) -> bool:
+    """
+        Returns:
+            bool: True se o payload de snapshot for um keyframe.
+    """
+    return payload[1] == protocol.MSG_KEYFRAME
+
+
+class ReplayReader:
+    """
+        Lê um arquivo de replay, mapeado em memória (padrão) ou por leituras no arquivo.
+
+        Os registros são percorridos em ordem (`records`) e o estado de qualquer tick é
+        reconstruído a partir do keyframe anterior mais próximo, encontrado pelo índice (`state_at`).
+
+        Attributes:
+            path (str): O caminho do arquivo.
+            room_id (int): A sala gravada.
+            tick_rate (int): Ticks da simulação por segundo.
+            width (int): Largura do labirinto.
+            height (int): Altura do labirinto.
+            walls (bytes): Bitset das paredes do labirinto (ver `walls_bitset`).
+            started (float): Instante do início da gravação (segundos desde a época).
+            index (list[tuple[int, int]]): (tick, posição) de cada registro com keyframe.
+            first_tick (int | None): Tick do primeiro registro (None se não houver registros).
+            last_tick (int | None): Tick do último registro.
+            complete (bool): Se a gravação foi encerrada normalmente (índice gravado no arquivo).
+    """
+
+    def __init__(self, path: str, use_mmap: bool = True):
+        """
+            Args:
+                path (str): O caminho do arquivo.
+                use_mmap (bool, optional): Se o arquivo é mapeado em memória. Padrão é True.
+
+            Raises:
+                OSError: Se o arquivo não puder ser aberto.
+                ReplayError: Se o arquivo não for um replay válido desta versão do protocolo.
+        """
+        self.path = path
+        self.__file = open(path, 'rb')
+        self.__size = os.fstat(self.__file.fileno()).st_size
+        self.__data = None
+
+        if use_mmap and self.__size > 0:
+            self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.__read_header()
+            self.__read_index()
+        except (struct.error, ReplayError):
+            self.close()
+            raise
+
+    def __read(self, offset: int, size: int) -> bytes:
+        if self.__data is not None:
+            return self.__data[offset:offset + size]
+
+        self.__file.seek(offset)
+        return self.__file.read(size)
+
+    def __read_header(self):
+        header = self.__read(0, HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ReplayError(f"{self.path} não é um arquivo de replay")
+
+        (_, format_version, protocol_version, self.room_id, self.tick_rate,
+         self.width, self.height, started) = HEADER.unpack(header)
+
+        if format_version != FORMAT_VERSION:
+            raise ReplayError(f"Formato de replay não suportado: {format_version}")
+
+        if protocol_version != protocol.PROTOCOL_VERSION:
+            raise ReplayError(f"Replay gravado com a versão {protocol_version} do protocolo "
+                              f"(atual: {protocol.PROTOCOL_VERSION})")
+
+        self.started = started / 1000
+        walls_size = (self.width * self.height + 7) // 8
+        self.walls = self.__read(HEADER.size, walls_size)
+        self.__start = HEADER.size + walls_size
+
+    def __read_index(self):
+        """
+            Carrega o índice do rodapé ou, se a gravação não foi encerrada, percorre os registros.
+        """
+        self.complete = False
+
+        if self.__size >= self.__start + TRAILER.size:
+            count, last_tick, offset, magic = TRAILER.unpack(self.__read(self.__size - TRAILER.size, TRAILER.size))
+
+            if magic == INDEX_MAGIC and offset + count * INDEX_ENTRY.size + TRAILER.size == self.__size:
+                data = self.__read(offset, count * INDEX_ENTRY.size)
+                self.index = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(count)]
+                self.__end = offset
+                self.last_tick = last_tick if offset > self.__start else None
+                self.first_tick = self.__tick_at(self.__start) if offset > self.__start else None
+                self.complete = True
+                return
+
+        self.index = []
+        self.__end = self.__start
+        self.first_tick = self.last_tick = None
+
+        for offset, record_end, tick, count in self.__scan(self.__start, self.__size):
+            if is_keyframe(self.__read(offset + RECORD.size + count * RECORD_INPUT.size, 2)):
+                self.index.append((tick, offset))
+
+            if self.first_tick is None:
+                self.first_tick = tick
+            self.last_tick = tick
+            self.__end = record_end
+
+    def __tick_at(self, offset: int) -> int:
+        return RECORD.unpack(self.__read(offset, RECORD.size))[1]
+
+    def __scan(self, offset: int, end: int):
+        """
+            Percorre os cabeçalhos dos registros completos a partir de offset.
+
+            Yields:
+                tuple[int, int, int, int]: Posição e final do registro, tick e quantidade de entradas.
+        """
+        while offset + RECORD.size <= end:
+            size, tick, count = RECORD.unpack(self.__read(offset, RECORD.size))
+            record_end = offset + SIZE.size + size
+
+            if record_end > end:
+                break
+
+            yield offset, record_end, tick, count
+            offset = record_end
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start_tick: int | None = None):
+        """
+            Percorre os registros em ordem, a partir do keyframe mais próximo anterior a start_tick.
+
+            Args:
+                start_tick (int, optional): O tick de interesse. Padrão é o início do arquivo.
+
+            Yields:
+                tuple[int, tuple, list]: O tick, a mensagem de snapshot (ver `common.snapshot`) e as
+                entradas aplicadas no tick (fantasma, ação e sequência).
+        """
+        offset = self.__start
+        if start_tick is not None:
+            offset = self.keyframe_before(start_tick)[1]
+
+        for offset, record_end, tick, count in self.__scan(offset, self.__end):
+            data = self.__read(offset + RECORD.size, record_end - offset - RECORD.size)
+
+            inputs = []
+            for i in range(count):
+                ghost, action, seq = RECORD_INPUT.unpack_from(data, i * RECORD_INPUT.size)
+                inputs.append((EntityType(ghost), PlayerAction(action), seq))
+
+            _, message = protocol.decode(data[count * RECORD_INPUT.size:])
+            yield tick, message, inputs
+
+    def keyframe_before(self, tick: int) -> tuple[int, int]:
+        """
+            Args:
+                tick (int): O tick de interesse.
+
+            Returns:
+                tuple[int, int]: O tick e a posição do último keyframe até tick (o primeiro, se tick
+                for anterior a ele).
+
+            Raises:
+                ReplayError: Se o arquivo não tiver keyframes.
+        """
+        if not self.index:
+            raise ReplayError(f"{self.path} não contém registros")
+
+        low, high = 0, len(self.index)
+        while low + 1 < high:
+            middle = (low + high) // 2
+            if self.index[middle][0] <= tick:
+                low = middle
+            else:
+                high = middle
+
+        return self.index[low]
+
+    def state_at(self, tick: int) -> tuple[GameState, int]:
+        """
+            Reconstrói o estado da partida em um tick.
+
+            Args:
+                tick (int): O tick desejado.
+
+            Returns:
+                tuple[GameState, int]: O estado e o seu tick (o último registro até tick, ou o
+                primeiro registro se tick for anterior ao início).
+        """
+        game_state, state_tick = None, 0
+
+        for record_tick, message, _ in self.records(tick):
+            if record_tick > tick and game_state is not None:
+                break
+            game_state, state_tick = apply_message(game_state, state_tick, message)
+
+        return game_state, state_tick
+
+    def size(self) -> int:
+        """
+            Returns:
+                int: O tamanho do arquivo, em bytes.
+        """
+        return self.__size
+
+    def close(self):
+        """
+            Libera o mapeamento e fecha o arquivo.
+        """
+        if self.__data is not None:
+            self.__data.close()
+            self.__data = None
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def describe(tick: int, message: tuple, inputs: list) -> str:
+    """
+        Returns:
+            str: Uma linha legível com o registro de um tick (entradas e mudanças do snapshot).
+    """
+    parts = [f"{tick:>7}"]
+    parts.extend(f"{ghost.name}={action.name}#{seq}" for ghost, action, seq in inputs)
+
+    if message[0] == KEYFRAME:
+        parts.append("keyframe")
+        return " ".join(parts)
+
+    _, _, _, entities, consumed, ghost_area_open, fields = message
+    parts.extend(f"{ENTITIES[i].name}({x},{y})" for i, x, y in entities)
+
+    if consumed:
+        parts.append(f"consumidos={list(consumed)}")
+    if ghost_area_open is not None:
+        parts.append(f"porta={'aberta' if ghost_area_open else 'fechada'}")
+
+    names = FIELDS + tuple(f"score_{ghost.name}" for ghost in GHOSTS)
+    parts.extend(f"{names[i]}={value}" for i, value in fields.items())
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspeciona um arquivo de replay de partida.")
+    parser.add_argument("path", help="o arquivo de replay")
+    parser.add_argument("--tick", type=int, help="exibe o estado da partida neste tick")
+    parser.add_argument("--dump", action="store_true", help="exibe todos os registros")
+    parser.add_argument("--no-mmap", action="store_true", help="lê o arquivo sem mapeá-lo em memória")
+    options = parser.parse_args()
+
+    with ReplayReader(options.path, use_mmap=not options.no_mmap) as reader:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(reader.started))
+        print(f"Sala {reader.room_id}, {reader.width}x{reader.height}, {reader.tick_rate} ticks/s, início em {started}")
+
+        if reader.first_tick is None:
+            return print("Nenhum registro gravado")
+
+        ticks = reader.last_tick - reader.first_tick + 1
+        print(f"Ticks {reader.first_tick}..{reader.last_tick} ({ticks / reader.tick_rate:.1f}s), "
+              f"{len(reader.index)} keyframes, {reader.size()} bytes ({reader.size() / ticks:.1f} B/tick)"
+              + ("" if reader.complete else ", gravação interrompida"))
+
+        if options.dump:
+            for record in reader.records():
+                print(describe(*record))
+
+        if options.tick is not None:
+            game_state, tick = reader.state_at(options.tick)
+            positions = ", ".join(f"{entity.name}{game_state.matrix.get_entity_position(entity)}"
+                                  for entity in ENTITIES)
+            scores = ", ".join(f"{ghost.name}={game_state.scores[ghost]}" for ghost in GHOSTS)
+            print(f"Tick {tick}: {game_state.status.name}, vidas={game_state.pacman_lives}, {positions}")
+            print(f"Placar: {scores}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+    Protocolo de snapshots do estado do jogo.
+
+    Em vez de enviar o GameState completo a cada tick, o servidor envia:
+    - Keyframes: o estado completo (posições, itens, timers, placar e status),
+      no momento da entrada do cliente e periodicamente a cada N ticks.
+    - Deltas: apenas o que mudou em relação ao tick anterior (posições alteradas,
+      itens consumidos, mudança da porta dos fantasmas e campos alterados).
+
+    As mensagens são tuplas de inteiros/bytes, aplicadas ao GameState local do cliente.
+"""
+
+from .enums import EntityType, GameStatus
+from .game_state import GameState
+
+KEYFRAME = 0
+DELTA = 1
+
+# Ordem fixa das entidades e dos fantasmas nas mensagens
+ENTITIES = (EntityType.PACMAN, EntityType.BLINKY, EntityType.INKY, EntityType.PINKY, EntityType.CLYDE)
+GHOSTS = (EntityType.BLINKY, EntityType.INKY, EntityType.PINKY, EntityType.CLYDE)
+
+# Campos escalares do GameState, na ordem usada em Snapshot.fields (seguidos dos placares de GHOSTS)
+FIELDS = ('status', 'winner', 'pacman_lives', 'frightened_timer', 'restart_game_timer', 'ghost_area_closed', 'restarted')
+
+
+class Snapshot:
+    """
+        Fotografia imutável dos dados do GameState transmitidos pela rede em um tick.
+
+        Attributes:
+            tick (int): Tick do servidor em que a fotografia foi tirada.
+            entities (tuple): Posições (x, y) ou None de cada entidade, na ordem de ENTITIES.
+            items (bytes): Item de cada célula (0 quando vazia), indexado por y * largura + x.
+            ghost_area_open (bool): Estado da porta da área dos fantasmas.
+            fields (tuple[int, ...]): Campos escalares (FIELDS) seguidos dos placares (GHOSTS), como inteiros.
+    """
+    __slots__ = ('tick', 'entities', 'items', 'ghost_area_open', 'fields')
+
+    def __init__(self, tick: int, entities: tuple, items: bytes, ghost_area_open: bool, fields: tuple):
+        self.tick = tick
+        self.entities = entities
+        self.items = items
+        self.ghost_area_open = ghost_area_open
+        self.fields = fields
+
+    @classmethod
+    def capture(cls, game_state: GameState, tick: int) -> 'Snapshot':
+        """
+            Captura o estado atual do jogo.
+
+            Args:
+                game_state (GameState): O estado do jogo.
+                tick (int): O tick atual do servidor.
+
+            Returns:
+                Snapshot: A fotografia do estado.
+        """
+        matrix = game_state.matrix
+
+        entities = tuple(matrix.get_entity_position(entity) for entity in ENTITIES)
+        items = bytes(matrix.items)
+
+        fields = (
+            game_state.status.value,
+            int(game_state.winner) if game_state.winner else 0,
+            game_state.pacman_lives,
+            game_state.frightened_timer,
+            game_state.restart_game_timer,
+            int(game_state.ghost_area_closed),
+            int(game_state.restarted),
+        ) + tuple(game_state.scores[ghost] for ghost in GHOSTS)
+
+        return cls(tick, entities, items, matrix.is_ghost_area_open(), fields)
+
+    @classmethod
+    def from_message(cls, message: tuple, base: 'Snapshot | None' = None) -> 'Snapshot | None':
+        """
+            Reconstrói a fotografia descrita por uma mensagem de snapshot, sem passar por um GameState.
+
+            Args:
+                message (tuple): O keyframe ou o delta recebido.
+                base (Snapshot, optional): A fotografia do tick base do delta.
+
+            Returns:
+                Snapshot | None: A fotografia do tick da mensagem, ou None se for um delta sem a base correspondente.
+        """
+        if message[0] == KEYFRAME:
+            _, tick, entities, items, ghost_area_open, fields = message
+            return cls(tick, tuple(entities), bytes(items), ghost_area_open, tuple(fields))
+
+        _, tick, base_tick, changed, consumed, door, changed_fields = message
+
+        if base is None or base.tick != base_tick:
+            return None
+
+        entities = list(base.entities)
+        for i, x, y in changed:
+            entities[i] = (x, y)
+
+        items = base.items
+        if consumed:
+            items = bytearray(items)
+            for index in consumed:
+                items[index] = 0
+            items = bytes(items)
+
+        fields = base.fields
+        if changed_fields:
+            fields = list(fields)
+            for i, value in changed_fields.items():
+                fields[i] = value
+            fields = tuple(fields)
+
+        ghost_area_open = base.ghost_area_open if door is None else door
+        return cls(tick, tuple(entities), items, ghost_area_open, fields)
+
+    def keyframe(self) -> tuple:
+        """
+            Monta a mensagem de keyframe com o estado completo.
+
+            Returns:
+                tuple: (KEYFRAME, tick, entities, items, ghost_area_open, fields)
+        """
+        return (KEYFRAME, self.tick, self.entities, self.items, self.ghost_area_open, self.fields)
+
+    def delta_from(self, base: 'Snapshot') -> tuple | None:
+        """
+            Monta a mensagem de delta com as mudanças desde a fotografia base.
+
+            Args:
+                base (Snapshot): A fotografia anterior, já conhecida pelo cliente.
+
+            Returns:
+                tuple | None: (DELTA, tick, base_tick, entities, consumed, ghost_area_open, fields), ou None
+                se a mudança não puder ser descrita por um delta (itens reapareceram, como após um reset),
+                caso em que um keyframe deve ser enviado.
+        """
+        entities = tuple(
+            (i, *pos) for i, pos in enumerate(self.entities)
+            if pos != base.entities[i] and pos is not None
+        )
+
+        consumed = ()
+        if self.items != base.items:
+            changed = [i for i, (old, new) in enumerate(zip(base.items, self.items)) if old != new]
+
+            # Itens só podem desaparecer durante uma partida
+            if any(self.items[i] for i in changed):
+                return None
+
+            consumed = tuple(changed)
+
+        door = self.ghost_area_open if self.ghost_area_open != base.ghost_area_open else None
+
+        fields = {i: value for i, value in enumerate(self.fields) if value != base.fields[i]}
+
+        return (DELTA, self.tick, base.tick, entities, consumed, door, fields)
+
+
+def _apply_fields(game_state: GameState, fields: dict):
+    """
+        Aplica campos escalares (índice -> valor inteiro) ao GameState.
+    """
+    for i, value in fields.items():
+        if i >= len(FIELDS):
+            game_state.scores[GHOSTS[i - len(FIELDS)]] = value
+            continue
+
+        name = FIELDS[i]
+
+        if name == 'status':
+            value = GameStatus(value)
+        elif name == 'winner':
+            value = EntityType(value) if value else None
+        elif name in ('ghost_area_closed', 'restarted'):
+            value = bool(value)
+
+        setattr(game_state, name, value)
+
+
+def _apply_door(game_state: GameState, ghost_area_open: bool):
+    """
+        Abre ou fecha a porta da área dos fantasmas, se necessário.
+    """
+    if ghost_area_open == game_state.matrix.is_ghost_area_open():
+        return
+
+    if ghost_area_open:
+        game_state.matrix.open_ghost_area()
+    else:
+        game_state.matrix.close_ghost_area()
+
+
+def apply_message(game_state: GameState | None, tick: int, message: tuple) -> tuple[GameState | None, int]:
+    """
+        Aplica uma mensagem de snapshot (keyframe ou delta) ao estado local do cliente.
+
+        Deltas cuja base não corresponda ao tick local são descartados até a chegada do próximo keyframe.
+
+        Args:
+            game_state (GameState | None): O estado local, ou None se nenhum keyframe foi recebido.
+            tick (int): O tick do estado local.
+            message (tuple): A mensagem recebida do servidor.
+
+        Returns:
+            tuple[GameState | None, int]: O estado local atualizado e seu tick.
+    """
+    kind = message[0]
+
+    if kind == KEYFRAME:
+        _, tick, entities, items, ghost_area_open, fields = message
+
+        if game_state is None:
+            game_state = GameState()
+
+        matrix = game_state.matrix
+        matrix.set_items(items)
+
+        for entity, pos in zip(ENTITIES, entities):
+            if pos is not None:
+                matrix.entities[entity] = pos
+
+        _apply_door(game_state, ghost_area_open)
+        _apply_fields(game_state, dict(enumerate(fields)))
+
+        return game_state, tick
+
+    if kind == DELTA:
+        _, new_tick, base_tick, entities, consumed, door, fields = message
+
+        if game_state is None or base_tick != tick:
+            return game_state, tick
+
+        matrix = game_state.matrix
+
+        for i, x, y in entities:
+            matrix.entities[ENTITIES[i]] = (x, y)
+
+        for index in consumed:
+            matrix.set_item(index, None)
+
+        if door is not None:
+            _apply_door(game_state, door)
+
+        _apply_fields(game_state, fields)
+
+        return game_state, new_tick
+
+    return game_state, tick
@@ -0,0 +1,68 @@
+"""
+    Relógios usados para avançar as partidas.
+
+    As salas consultam o relógio apenas para saber quantos passos fixos estão pendentes (ver
+    `FixedTimestep`); o estado de cada passo não depende do instante em que ele é executado.
+    Com o relógio simulado, os passos são executados exatamente quando pedidos, sem esperas e
+    sem passos atrasados ou descartados, o que torna a partida reprodutível (ver `server.simulation`).
+"""
+
+import time
+
+
+class MonotonicClock:
+    """
+        Relógio real do servidor (time.monotonic).
+    """
+
+    def now(self) -> float:
+        """
+            Returns:
+                float: O instante atual, em segundos.
+        """
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        """
+            Aguarda o intervalo pedido.
+        """
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+        Relógio controlado pelo chamador: o tempo só avança com `advance` ou `sleep`, que retorna imediatamente.
+
+        Attributes:
+            time (float): O instante atual, em segundos.
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+            Args:
+                start (float, optional): O instante inicial. Padrão é 0.
+        """
+        self.time = start
+
+    def now(self) -> float:
+        """
+            Returns:
+                float: O instante atual, em segundos.
+        """
+        return self.time
+
+    def advance(self, seconds: float) -> float:
+        """
+            Avança o relógio.
+
+            Returns:
+                float: O novo instante.
+        """
+        self.time += seconds
+        return self.time
+
+    def sleep(self, seconds: float):
+        """
+            Avança o relógio pelo intervalo pedido, sem esperar.
+        """
+        self.advance(seconds)
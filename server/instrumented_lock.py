@@ -0,0 +1,96 @@
+import time
+import threading
+
+class InstrumentedLock:
+    """
+        Lock com medição do tempo de espera e do tempo de posse.
+
+        Usado como o threading.Lock (`with lock:`). Cada aquisição registra quanto tempo a thread
+        esperou pelo lock e quanto tempo o manteve, permitindo verificar se o lock está cobrindo
+        apenas o necessário.
+
+        Attributes:
+            name (str): Nome usado no relatório.
+            acquisitions (int): Aquisições desde o último `reset`.
+            wait_total (float): Tempo total de espera, em segundos.
+            wait_max (float): Maior espera, em segundos.
+            hold_total (float): Tempo total de posse, em segundos.
+            hold_max (float): Maior posse, em segundos.
+            total_acquisitions (int): Aquisições desde a criação (não afetadas por `reset`).
+            total_wait (float): Tempo total de espera desde a criação, em segundos.
+            total_hold (float): Tempo total de posse desde a criação, em segundos.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.__lock = threading.Lock()
+        self.__acquired_at = 0.0
+        self.total_acquisitions = 0
+        self.total_wait = 0.0
+        self.total_hold = 0.0
+        self.reset()
+
+    def reset(self):
+        """
+            Zera as estatísticas.
+        """
+        with self.__lock:
+            self.acquisitions = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.hold_total = 0.0
+            self.hold_max = 0.0
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.__lock.acquire()
+        self.__acquired_at = time.perf_counter()
+
+        # Estatísticas alteradas apenas por quem detém o lock
+        wait = self.__acquired_at - start
+        self.acquisitions += 1
+        self.total_acquisitions += 1
+        self.wait_total += wait
+        self.total_wait += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+        return self
+
+    def __exit__(self, *exc):
+        hold = time.perf_counter() - self.__acquired_at
+        self.hold_total += hold
+        self.total_hold += hold
+        if hold > self.hold_max:
+            self.hold_max = hold
+
+        self.__lock.release()
+
+    def report(self) -> str:
+        """
+            Returns:
+                str: Resumo das aquisições, com médias e máximos de espera e posse em microssegundos.
+        """
+        if not self.acquisitions:
+            return f"{self.name}: nenhuma aquisição"
+
+        return (
+            f"{self.name}: {self.acquisitions} aquisições, "
+            f"espera média {self.wait_total / self.acquisitions * 1e6:.0f} µs (máx. {self.wait_max * 1e6:.0f} µs), "
+            f"posse média {self.hold_total / self.acquisitions * 1e6:.0f} µs (máx. {self.hold_max * 1e6:.0f} µs)"
+        )
+
+    def totals(self) -> dict:
+        """
+            Returns:
+                dict: 'name', 'acquisitions', 'wait' e 'hold' (totais desde a criação, em segundos)
+                e 'wait_max' e 'hold_max' (desde o último `reset`).
+        """
+        return {
+            'name': self.name,
+            'acquisitions': self.total_acquisitions,
+            'wait': self.total_wait,
+            'hold': self.total_hold,
+            'wait_max': self.wait_max,
+            'hold_max': self.hold_max,
+        }
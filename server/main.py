@@ -1,3 +1,5 @@
 from .network.server_manager import ServerManager
 
-ServerManager().run()
\ No newline at end of file
+# A proteção é necessária no modo "sharded": os workers são iniciados com "spawn" e reimportam este módulo
+if __name__ == "__main__":
+    ServerManager().run()
@@ -0,0 +1,383 @@
+"""
+    Métricas do servidor, para o planejamento de capacidade.
+
+    Desativadas por padrão. Quando ativadas (chave "metrics_port" do settings.json), o servidor:
+        - mede a duração de cada passo da simulação e de cada `PacmanIA.update` em histogramas;
+        - expõe as métricas no formato de texto do Prometheus em http://127.0.0.1:<porta>/metrics;
+        - exibe um resumo no terminal a cada "metrics_interval" segundos.
+
+    Os demais valores (salas, clientes, bytes codificados e enviados, lock, threads e memória)
+    já são contabilizados pelo servidor e são apenas lidos no momento da coleta. Desativadas, as
+    métricas não criam threads nem medem nada além do que o servidor já mede.
+
+    Cada servidor monta uma amostra (dict) com as chaves:
+        - 'rooms', 'clients', 'threads' e 'rss' (bytes de memória residente);
+        - 'tick_duration' e 'pacman_update' (Histogram, em segundos);
+        - 'broadcast' (ver `StateBroadcaster.stats`);
+        - 'clients_sent': lista de dicts com 'peer', 'name', 'room', 'sent_frames' e 'sent_bytes';
+        - 'locks': lista de estatísticas de locks (ver `InstrumentedLock.totals`).
+"""
+
+import os
+import sys
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_IP = "127.0.0.1"    # O endpoint é apenas local
+LOG_INTERVAL = 30.0         # Segundos entre os resumos no terminal
+
+# Limites dos histogramas de duração, em segundos (o passo da simulação tem 50 ms)
+DURATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class Histogram:
+    """
+        Histograma com limites fixos, no formato cumulativo do Prometheus.
+
+        Attributes:
+            buckets (tuple[float, ...]): Limites superiores das faixas, em ordem crescente.
+            counts (list[int]): Observações em cada faixa; a última conta as acima do maior limite.
+            sum (float): Soma das observações.
+            count (int): Quantidade de observações.
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+            Registra uma observação.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: 'Histogram'):
+        """
+            Soma as observações de outro histograma com os mesmos limites.
+        """
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def copy(self) -> 'Histogram':
+        """
+            Returns:
+                Histogram: Uma cópia independente, para leitura fora da thread que observa.
+        """
+        histogram = Histogram(self.buckets)
+        histogram.merge(self)
+        return histogram
+
+    def quantile(self, q: float) -> float:
+        """
+            Estima um quantil pelo limite superior da faixa em que ele cai.
+
+            Args:
+                q (float): O quantil, entre 0 e 1.
+
+            Returns:
+                float: O limite da faixa (o maior limite se cair acima dele; 0 sem observações).
+        """
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        accumulated = 0
+
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+        Histogramas atualizados pela simulação, compartilhados por todas as salas de um processo.
+
+        Attributes:
+            tick_duration (Histogram): Duração de cada passo da simulação.
+            pacman_update (Histogram): Duração de cada `PacmanIA.update`.
+    """
+
+    def __init__(self):
+        self.tick_duration = Histogram()
+        self.pacman_update = Histogram()
+
+    def sample(self) -> dict:
+        """
+            Returns:
+                dict: Cópias dos histogramas e as métricas do processo ('threads' e 'rss').
+        """
+        return {
+            'tick_duration': self.tick_duration.copy(),
+            'pacman_update': self.pacman_update.copy(),
+            'threads': threading.active_count(),
+            'rss': rss_bytes(),
+        }
+
+
+def rss_bytes() -> int:
+    """
+        Returns:
+            int: Memória residente do processo, em bytes (o pico, fora do Linux; 0 se indisponível).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def merge(samples: list[dict]) -> dict:
+    """
+        Combina as amostras de vários processos (modo "sharded") em uma só.
+
+        Args:
+            samples (list[dict]): As amostras de cada processo.
+
+        Returns:
+            dict: A amostra combinada.
+    """
+    merged = {
+        'rooms': 0, 'clients': 0, 'threads': 0, 'rss': 0,
+        'tick_duration': Histogram(), 'pacman_update': Histogram(),
+        'broadcast': {}, 'clients_sent': [], 'locks': [],
+    }
+
+    for sample in samples:
+        for key in ('rooms', 'clients', 'threads', 'rss'):
+            merged[key] += sample[key]
+
+        merged['tick_duration'].merge(sample['tick_duration'])
+        merged['pacman_update'].merge(sample['pacman_update'])
+
+        for key, value in sample['broadcast'].items():
+            merged['broadcast'][key] = merged['broadcast'].get(key, 0) + value
+
+        merged['clients_sent'].extend(sample['clients_sent'])
+        merged['locks'].extend(sample['locks'])
+
+    return merged
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _histogram_lines(name: str, help_text: str, histogram: Histogram) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    accumulated = 0
+
+    for limit, count in zip(histogram.buckets, histogram.counts):
+        accumulated += count
+        lines.append(f'{name}_bucket{{le="{limit}"}} {accumulated}')
+
+    lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum {histogram.sum}")
+    lines.append(f"{name}_count {histogram.count}")
+    return lines
+
+
+def _metric_lines(name: str, kind: str, help_text: str, values: list[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+    for labels, value in values:
+        if labels:
+            label_text = ",".join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return lines
+
+
+def render(sample: dict) -> str:
+    """
+        Formata uma amostra no formato de texto do Prometheus.
+
+        Returns:
+            str: O corpo da resposta de /metrics.
+    """
+    broadcast = sample['broadcast']
+    lines = []
+
+    lines += _metric_lines("pacman_rooms", "gauge", "Salas ativas.", [({}, sample['rooms'])])
+    lines += _metric_lines("pacman_clients", "gauge", "Clientes conectados.", [({}, sample['clients'])])
+    lines += _metric_lines("pacman_threads", "gauge", "Threads do servidor.", [({}, sample['threads'])])
+    lines += _metric_lines("pacman_rss_bytes", "gauge", "Memória residente do servidor.", [({}, sample['rss'])])
+
+    lines += _histogram_lines("pacman_tick_duration_seconds", "Duração dos passos da simulação.",
+                              sample['tick_duration'])
+    lines += _histogram_lines("pacman_ai_update_seconds", "Duração de PacmanIA.update.", sample['pacman_update'])
+
+    lines += _metric_lines("pacman_snapshot_frames_total", "counter", "Frames de snapshot codificados.",
+                           [({}, broadcast.get('frames', 0))])
+    lines += _metric_lines("pacman_snapshot_encode_seconds_total", "counter", "Tempo gasto codificando snapshots.",
+                           [({}, broadcast.get('encode_time', 0.0))])
+    lines += _metric_lines("pacman_snapshot_bytes_total", "counter", "Bytes dos frames de snapshot codificados.",
+                           [({}, broadcast.get('raw_bytes', 0))])
+    lines += _metric_lines("pacman_snapshot_compressed_bytes_total", "counter",
+                           "Bytes das versões comprimidas dos mesmos frames.",
+                           [({}, broadcast.get('compressed_bytes', 0))])
+    lines += _metric_lines("pacman_snapshot_compress_seconds_total", "counter", "Tempo gasto comprimindo snapshots.",
+                           [({}, broadcast.get('compress_time', 0.0))])
+
+    clients = [({'peer': f"{c['peer'][0]}:{c['peer'][1]}", 'name': c['name'], 'room': c['room']}, c)
+               for c in sample['clients_sent']]
+    lines += _metric_lines("pacman_client_sent_bytes_total", "counter", "Bytes enviados a cada cliente.",
+                           [(labels, c['sent_bytes']) for labels, c in clients])
+    lines += _metric_lines("pacman_client_sent_frames_total", "counter", "Frames enviados a cada cliente.",
+                           [(labels, c['sent_frames']) for labels, c in clients])
+
+    if sample['locks']:
+        locks = [({'lock': lock['name']}, lock) for lock in sample['locks']]
+        lines += _metric_lines("pacman_lock_acquisitions_total", "counter", "Aquisições do lock.",
+                               [(labels, lock['acquisitions']) for labels, lock in locks])
+        lines += _metric_lines("pacman_lock_wait_seconds_total", "counter", "Tempo de espera pelo lock.",
+                               [(labels, lock['wait']) for labels, lock in locks])
+        lines += _metric_lines("pacman_lock_hold_seconds_total", "counter", "Tempo de posse do lock.",
+                               [(labels, lock['hold']) for labels, lock in locks])
+        lines += _metric_lines("pacman_lock_wait_max_seconds", "gauge", "Maior espera pelo lock.",
+                               [(labels, lock['wait_max']) for labels, lock in locks])
+        lines += _metric_lines("pacman_lock_hold_max_seconds", "gauge", "Maior posse do lock.",
+                               [(labels, lock['hold_max']) for labels, lock in locks])
+
+    return "\n".join(lines) + "\n"
+
+
+def summary(sample: dict, previous: dict | None, elapsed: float) -> str:
+    """
+        Resume uma amostra em uma linha, para o log periódico.
+
+        Args:
+            sample (dict): A amostra atual.
+            previous (dict | None): A amostra anterior, para as taxas (None na primeira).
+            elapsed (float): Segundos desde a amostra anterior.
+
+        Returns:
+            str: A linha do log.
+    """
+    tick, pacman, broadcast = sample['tick_duration'], sample['pacman_update'], sample['broadcast']
+    frames = broadcast.get('frames', 0)
+
+    line = (
+        f"Métricas: {sample['rooms']} salas, {sample['clients']} clientes, "
+        f"passo p50 {tick.quantile(0.5) * 1000:.2g} ms p99 {tick.quantile(0.99) * 1000:.2g} ms, "
+        f"PacmanIA p99 {pacman.quantile(0.99) * 1000:.2g} ms"
+    )
+
+    if frames:
+        line += (
+            f", codificação {broadcast['encode_time'] / frames * 1e6:.0f} µs "
+            f"{broadcast['raw_bytes'] / frames:.0f} B/frame"
+        )
+
+    if previous is not None and elapsed > 0:
+        sent = sum(c['sent_bytes'] for c in sample['clients_sent'])
+        sent_before = sum(c['sent_bytes'] for c in previous['clients_sent'])
+        line += f", enviados {max(sent - sent_before, 0) / elapsed / 1024:.1f} KiB/s"
+
+    for lock in sample['locks']:
+        if lock['acquisitions']:
+            line += f", espera do lock {lock['wait'] / lock['acquisitions'] * 1e6:.0f} µs"
+
+    return line + f", {sample['threads']} threads, RSS {sample['rss'] / 2**20:.1f} MiB"
+
+
+class MetricsServer:
+    """
+        Endpoint HTTP /metrics e log periódico, cada um na sua thread.
+
+        A coleta é feita sob demanda, pela função `collect` do servidor, a cada requisição
+        e a cada linha do log.
+    """
+
+    def __init__(self, collect, port: int, interval: float | None = None):
+        """
+            Args:
+                collect (callable): Retorna a amostra atual (ver o início do módulo).
+                port (int): A porta do endpoint HTTP.
+                interval (float, optional): Segundos entre as linhas do log (None desativa o log).
+        """
+        self.collect = collect
+        self.port = port
+        self.interval = interval
+        self.http_server = None
+
+    def start(self):
+        """
+            Inicia o endpoint e o log periódico. Se a porta não puder ser aberta, apenas o log é iniciado.
+        """
+        collect = self.collect
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    return self.send_error(404)
+
+                body = render(collect()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self.http_server = ThreadingHTTPServer((METRICS_IP, self.port), Handler)
+            self.http_server.daemon_threads = True
+        except OSError as e:
+            print(f"Não foi possível abrir o endpoint de métricas ({e})")
+        else:
+            threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+            print(f"Métricas em http://{METRICS_IP}:{self.port}/metrics")
+
+        if self.interval:
+            threading.Thread(target=self.__log_loop, daemon=True).start()
+
+    def __log_loop(self):
+        """
+            Thread que exibe o resumo das métricas a cada `interval` segundos.
+        """
+        previous, previous_at = None, time.monotonic()
+
+        while True:
+            time.sleep(self.interval)
+
+            try:
+                sample = self.collect()
+            except Exception as e:
+                print(f"Erro ao coletar as métricas: {e}")
+                continue
+
+            now = time.monotonic()
+            print(summary(sample, previous, now - previous_at))
+            previous, previous_at = sample, now
+
+    def stop(self):
+        """
+            Fecha o endpoint HTTP.
+        """
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
@@ -0,0 +1,64 @@
+from common.enums import EntityType, PlayerAction
+from common.matrix import Matrix
+
+# Mapeamento de ações para deltas (x, y)
+MOVEMENT_MAP = {
+    PlayerAction.UP: (0, -1),
+    PlayerAction.RIGHT: (1, 0),
+    PlayerAction.DOWN: (0, 1),
+    PlayerAction.LEFT: (-1, 0),
+}
+
+def move_ghost(matrix: Matrix, ghost: EntityType, client_context: dict) -> bool:
+    """
+        Executa um passo de movimento do fantasma controlado por um cliente.
+
+        O movimento persiste na mesma direção até que:
+        1. O cliente envie uma nova direção (`next_action`), aplicada como curva assim que possível.
+        2. O fantasma encontre um obstáculo, momento em que a ação atual é resetada para None.
+
+        Não faz nenhuma sincronização: o chamador deve garantir acesso exclusivo à matriz.
+
+        Args:
+            matrix (Matrix): A matriz do jogo.
+            ghost (EntityType): O tipo de fantasma (BLINKY, PINKY, etc.) controlado.
+            client_context (dict): Contexto do cliente, contendo 'current_action' e 'next_action'.
+
+        Returns:
+            bool: True se o fantasma se moveu, False caso contrário.
+    """
+    pos = matrix.get_entity_position(ghost)
+
+    if not pos:
+        return False
+
+    cx, cy = pos
+    current_action = client_context['current_action']
+    next_action = client_context['next_action']
+
+    # Curva
+    if next_action and next_action in MOVEMENT_MAP:
+        dx, dy = MOVEMENT_MAP[next_action]
+
+        if matrix.is_valid_position(cx + dx, cy + dy):
+            # Executa a curva e atualiza a direção atual
+            matrix.move_entity(ghost, dx, dy)
+            client_context['current_action'] = next_action
+            client_context['next_action'] = None
+            return True
+
+        # Falha: é parede
+        client_context['next_action'] = None
+
+    # Mantém movimento atual
+    if current_action and current_action in MOVEMENT_MAP:
+        dx, dy = MOVEMENT_MAP[current_action]
+
+        if matrix.is_valid_position(cx + dx, cy + dy):
+            # Continua na direção corrente
+            matrix.move_entity(ghost, dx, dy)
+            return True
+
+        client_context['current_action'] = None
+
+    return False
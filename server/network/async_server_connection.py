@@ -0,0 +1,571 @@
+import time
+import asyncio
+from common.enums import PlayerAction
+from common import protocol
+from common.protocol import ProtocolError
+
+from ..room import Lobby, Room
+from ..metrics import LOG_INTERVAL, Metrics, MetricsServer
+from ..recorder import ReplayStore
+from .send_queue import SendQueue
+from .broadcast import report as broadcast_report
+from .udp_state import UdpSessions, state_datagrams
+from . import handshake, legacy
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """
+        Repassa os datagramas recebidos no socket UDP para as sessões dos clientes.
+    """
+
+    def __init__(self, sessions: UdpSessions):
+        self.sessions = sessions
+
+    def datagram_received(self, data, addr):
+        self.sessions.handle_datagram(data, addr)
+
+
+class AsyncServerSocket:
+    """
+        Define o servidor TCP/IP baseado em asyncio.
+
+        Alternativa ao ServerSocket: aceitação de conexões, recebimento, envio e ticks da simulação
+        rodam como corrotinas em um único event loop, sem threads por cliente e sem lock.
+
+        Suporta várias partidas simultâneas (salas) no mesmo processo: o cliente pede uma sala
+        ao conectar (ou é colocado automaticamente) e uma única corrotina avança todas as salas,
+        cada uma no seu relógio de passo fixo. Após cada passo, as corrotinas de envio dos
+        clientes da sala são acordadas para enviar o novo estado.
+
+        Cada conexão começa com o handshake (HELLO), que define o formato do estado enviado ao
+        cliente (ver `handshake`); clientes antigos, sem HELLO, recebem o formato antigo (ver `legacy`).
+        Clientes que pedem UDP no HELLO recebem o estado por datagramas na mesma porta (ver `udp_state`).
+
+        Com `metrics_port`, as métricas do servidor são expostas em um endpoint HTTP local (ver `server.metrics`).
+        Com `replay_dir`, cada partida é gravada em um arquivo de replay nessa pasta (ver `server.recorder`).
+    """
+    REPORT_INTERVAL = 30.0  # Intervalo entre relatórios do broadcast (None desativa)
+
+    def __init__(self, server_ip:str, server_port:int, timeout: float = None, max_rooms: int = 256,
+                 shard: tuple[int, int] = (0, 1), send_high_water: int = SendQueue.HIGH_WATER,
+                 slow_client_timeout: float = SendQueue.SLOW_CLIENT_TIMEOUT, compression: bool = True,
+                 metrics_port: int | None = None, metrics_interval: float | None = LOG_INTERVAL,
+                 replay_dir: str | None = None):
+        """
+            Inicializa o AsyncServerSocket.
+
+            Args:
+                server_ip (str): O endereço IP para o servidor escutar.
+                server_port (int): A porta TCP para o servidor escutar.
+                timeout (float, optional): Timeout para operações de socket. Padrão é None.
+                max_rooms (int, optional): Quantidade máxima de salas simultâneas. Padrão é 256.
+                shard (tuple[int, int], optional): Índice deste processo e total de processos, quando as
+                    salas são distribuídas entre vários processos (ver `sharded_server`). Padrão é (0, 1).
+                send_high_water (int, optional): Frames pendentes por cliente antes da conflação (ver `SendQueue`).
+                slow_client_timeout (float, optional): Segundos que um cliente pode ficar atrasado antes de ser desconectado.
+                compression (bool, optional): Se os snapshots são comprimidos para os clientes que pedirem. Padrão é True.
+                metrics_port (int, optional): Porta do endpoint de métricas. Padrão é None (métricas desativadas).
+                metrics_interval (float, optional): Segundos entre os resumos das métricas no terminal.
+                replay_dir (str, optional): Pasta dos replays das partidas. Padrão é None (gravação desativada).
+        """
+        self.ip = server_ip
+        self.port = server_port
+        self.timeout = timeout
+        self.send_high_water = send_high_water
+        self.slow_client_timeout = slow_client_timeout
+        self.compression = compression
+
+        # Métricas (None se desativadas)
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.metrics = Metrics() if metrics_port is not None else None
+        self.loop = None
+
+        self.game_running = True
+        self.replays = ReplayStore(replay_dir) if replay_dir else None
+        self.lobby = Lobby(max_rooms, *shard, compress=compression, metrics=self.metrics, replays=self.replays)
+
+        # Contexto de cada cliente conectado (canal de escrita -> contexto)
+        self.client_contexts = {}
+
+        # Tempo total gasto atualizando as salas, usado nas estatísticas de carga
+        self.update_time = 0.0
+
+        # Transporte opcional do estado por UDP
+        self.udp_sessions = UdpSessions()
+        self.udp_transport = None
+        self.udp_port = 0
+
+    def start(self):
+        """
+            Executa o event loop do servidor até a interrupção pelo usuário (Ctrl+C).
+        """
+        try:
+            asyncio.run(self.__serve())
+        except KeyboardInterrupt:
+            print("\nServidor encerrando por interrupção do usuário (Ctrl+C).")
+        finally:
+            self.game_running = False
+
+            if self.replays is not None:
+                self.replays.close()
+
+            print("Servidor desligado com sucesso")
+
+    async def __serve(self):
+        """
+            Mantém a corrotina de atualização das salas enquanto as conexões são aceitas.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.start_metrics()
+
+        await self.__open_udp()
+        game_update_task = asyncio.create_task(self.__game_update_loop())
+
+        try:
+            await self.accept_connections()
+        finally:
+            self.game_running = False
+            game_update_task.cancel()
+
+            if self.udp_transport is not None:
+                self.udp_transport.close()
+
+    def start_metrics(self):
+        """
+            Inicia o endpoint e o log das métricas, se estiverem ativas.
+        """
+        if self.metrics is not None:
+            MetricsServer(self.collect_metrics, self.metrics_port, self.metrics_interval).start()
+
+    def collect_metrics(self) -> dict:
+        """
+            Coleta a amostra das métricas a partir de outra thread, executando `metrics_sample` no event loop.
+
+            Returns:
+                dict: A amostra (ver `server.metrics`).
+        """
+        async def sample():
+            return self.metrics_sample()
+
+        return asyncio.run_coroutine_threadsafe(sample(), self.loop).result(timeout=5.0)
+
+    def metrics_sample(self) -> dict:
+        """
+            Returns:
+                dict: A amostra atual das métricas (ver `server.metrics`). Deve ser chamada no event loop.
+        """
+        return {
+            **self.metrics.sample(),
+            'rooms': len(self.lobby.rooms),
+            'clients': self.lobby.client_count(),
+            'broadcast': self.lobby.broadcast_stats(),
+            'clients_sent': self.client_stats(),
+            'locks': [],
+        }
+
+    async def __open_udp(self):
+        """
+            Abre o socket UDP do estado do jogo. Se não for possível, os clientes que pedirem UDP
+            continuam recebendo o estado pelo TCP.
+        """
+        loop = asyncio.get_running_loop()
+
+        try:
+            self.udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self.udp_sessions), local_addr=(self.ip, self.port or 0))
+        except OSError as e:
+            return print(f"Não foi possível abrir o socket UDP ({e}). Estado enviado apenas por TCP")
+
+        self.udp_port = self.udp_transport.get_extra_info('sockname')[1]
+
+    async def accept_connections(self):
+        """
+            Abre o socket de escuta e aceita conexões até o servidor ser encerrado.
+
+            Subclasses podem sobrescrever este método para receber as conexões de outra origem.
+        """
+        try:
+            server = await asyncio.start_server(self.handle_client, self.ip, self.port, reuse_address=True)
+        except OSError:
+            return print("\nNão foi possível iniciar o servidor!\n")
+
+        async with server:
+            await server.serve_forever()
+
+    async def __game_update_loop(self):
+        """
+            Corrotina única de atualização de todas as salas (Pac-Man, fantasmas, timers, colisões e broadcast).
+        """
+        last_report = time.monotonic()
+
+        while self.game_running:
+            now = time.monotonic()
+
+            for room in self.lobby.update(now):
+                self.wake_senders(room, now)
+
+            finished = time.monotonic()
+            self.update_time += finished - now
+
+            if self.REPORT_INTERVAL and finished - last_report >= self.REPORT_INTERVAL:
+                print(broadcast_report(self.lobby.broadcast_stats()))
+                last_report = finished
+
+            await asyncio.sleep(self.lobby.next_delay(finished))
+
+    def wake_senders(self, room: Room, now: float):
+        """
+            Enfileira os frames novos na fila de saída de cada cliente da sala e acorda as corrotinas
+            de envio, desconectando os clientes que estão atrasados há tempo demais.
+        """
+        for writer in list(room.clients):
+            context = self.client_contexts.get(writer)
+            if context is None:
+                continue
+
+            queue = context['queue']
+
+            # Clientes UDP recebem apenas o estado mais recente, sem fila
+            if not context['udp'] and not queue.offer(room.broadcaster, now):
+                print(f"Cliente {context['peer']} atrasado há mais de {queue.slow_client_timeout:.0f}s. Desconectando")
+                context['running'] = False
+                queue.close()
+
+                # Descarta o buffer de saída e desbloqueia as corrotinas do cliente
+                writer.transport.abort()
+
+            context['wakeup'].set()
+
+    async def __game_state_sending(self, writer, room: Room, client_context):
+        """
+            Corrotina de envio contínuo do estado da sala para o cliente.
+
+            Envia os frames da fila de saída do cliente, preenchida pela corrotina de atualização,
+            seguidos da confirmação (ACK) da última entrada aplicada, quando o frame do tick em que
+            ela foi aplicada já tiver sido enviado. Clientes UDP recebem o keyframe do tick e o ACK
+            por datagramas, assim que o endereço UDP do cliente for conhecido.
+
+            Args:
+                writer (asyncio.StreamWriter): O canal de escrita do cliente.
+                room (Room): A sala do cliente.
+                client_context (dict): Contexto compartilhado com as demais corrotinas do cliente.
+        """
+        queue = client_context['queue']
+        wakeup = client_context['wakeup']
+
+        while client_context['running']:
+            try:
+                if client_context['udp']:
+                    addr = client_context['udp_addr']
+
+                    if addr is not None:
+                        for datagram in state_datagrams(room, client_context):
+                            self.udp_transport.sendto(datagram, addr)
+
+                    await wakeup.wait()
+                    wakeup.clear()
+                    continue
+
+                # Envia os frames compartilhados (keyframe ou deltas) pendentes
+                frames = queue.take()
+
+                ack = room.ack_for(client_context['ghost'], client_context['acked'], queue.sent_tick)
+                if ack is not None and not client_context['legacy']:
+                    frames.append(protocol.frame(protocol.encode_ack(*ack)))
+                    client_context['acked'] = ack[0]
+
+                if frames:
+                    writer.write(b"".join(frames))
+                    await writer.drain()
+
+                # Aguarda o próximo passo da sala
+                await wakeup.wait()
+                wakeup.clear()
+            except (ConnectionResetError, BrokenPipeError):
+                print("Cliente desconectado. Encerrando envio")
+                client_context['running'] = False
+            except Exception as e:
+                print(f"Erro inesperado durante o envio do estado do jogo ({e}). Encerrando envio.")
+                client_context['running'] = False
+
+        # Fecha o canal para desbloquear a leitura pendente em handle_client
+        writer.close()
+
+    async def handle_client(self, reader, writer):
+        """
+            Lida com a comunicação e lógica de jogo para um cliente específico.
+
+            Recebe o HELLO (ou detecta um cliente antigo) e continua em `serve_client`.
+
+            Args:
+                reader (asyncio.StreamReader): O canal de leitura do cliente.
+                writer (asyncio.StreamWriter): O canal de escrita do cliente.
+        """
+        print(f"Nova conexão de {writer.get_extra_info('peername')}")
+
+        try:
+            hello = await self.receive_hello(reader)
+        except protocol.VersionMismatch as e:
+            print(f"Cliente recusado: {e}")
+            await self.reject(writer, protocol.REJECT_VERSION)
+            return
+        except Exception as e:
+            print(f"Cliente não enviou um HELLO válido ({e!r}). Encerrando conexão")
+            writer.close()
+            return
+
+        await self.serve_client(reader, writer, hello)
+
+    async def receive_hello(self, reader) -> tuple | None:
+        """
+            Recebe o HELLO do cliente.
+
+            Args:
+                reader (asyncio.StreamReader): O canal de leitura do cliente.
+
+            Returns:
+                tuple | None: O HELLO decodificado, ou None se o cliente não enviar nada em
+                `legacy.LEGACY_TIMEOUT` segundos (cliente antigo).
+
+            Raises:
+                VersionMismatch: Se o cliente usar outra versão do protocolo.
+                ConnectionResetError: Se a mensagem for inválida ou não for um HELLO.
+        """
+        try:
+            header = await asyncio.wait_for(reader.readexactly(protocol.HEADER.size), legacy.LEGACY_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+
+        size = handshake.hello_size(header)
+        payload = await asyncio.wait_for(reader.readexactly(size), handshake.HELLO_TIMEOUT)
+        return handshake.decode_hello(payload)
+
+    async def reject(self, writer, reason: int):
+        """
+            Envia a recusa da conexão (REJECT) e fecha o canal.
+
+            Args:
+                writer (asyncio.StreamWriter): O canal de escrita do cliente.
+                reason (int): O motivo (protocol.REJECT_*).
+        """
+        try:
+            await self.send_data(writer, protocol.encode_reject(reason))
+        except Exception:
+            pass
+
+        writer.close()
+
+    async def serve_client(self, reader, writer, hello: tuple | None):
+        """
+            Negocia o formato do estado, coloca o cliente na sala pedida, atribui o fantasma,
+            inicia a corrotina de envio e entra no loop de recebimento de comandos do jogador (PlayerAction).
+
+            Args:
+                reader (asyncio.StreamReader): O canal de leitura do cliente.
+                writer (asyncio.StreamWriter): O canal de escrita do cliente.
+                hello (tuple | None): O HELLO do cliente, ou None para clientes antigos.
+        """
+        session = handshake.negotiate(hello, Room.TICK_RATE, self.compression, self.udp_transport is not None)
+        room = self.lobby.join(session['room_id'], session['spectator'])
+
+        if room is None:
+            print("Limite de salas atingido. Recusando conexão")
+            if session['legacy']:
+                writer.close()
+            else:
+                await self.reject(writer, protocol.REJECT_FULL)
+            return
+
+        assigned_ghost = room.assign_ghost(writer, session['spectator'])
+        peer = writer.get_extra_info('peername')
+        print(f"Cliente {session['name']} {peer} na sala {room.room_id}: {handshake.describe(session, Room.TICK_RATE)}")
+
+        # Envia o formato negociado e a atribuição de fantasma (ou espectador) e da sala
+        try:
+            writer.write(handshake.greeting(session, Room.TICK_RATE, assigned_ghost, room.room_id))
+            await writer.drain()
+        except Exception as e:
+            print(f"Erro ao enviar atribuição para cliente: {e}")
+            self.remove_client(room, writer)
+            return
+
+        client_context = {
+            'running': True,                # Controla as corrotinas do cliente
+            'wakeup': asyncio.Event(),      # Sinalizado a cada passo da sala
+            'peer': peer,
+            'name': session['name'],        # Identificação enviada pelo cliente no HELLO
+            'queue': SendQueue(self.send_high_water, self.slow_client_timeout, session['compressed'],
+                               session['deltas'], session['legacy'], session['interval']),
+            'ghost': assigned_ghost,
+            'acked': None,                  # Sequência da última entrada confirmada ao cliente
+            'legacy': session['legacy'],    # Se o cliente usa o protocolo antigo (pickle)
+            'udp': False                    # Se o estado é enviado por UDP
+        }
+        self.client_contexts[writer] = client_context
+
+        if session['udp_requested']:
+            # Porta 0 indica ao cliente que o UDP não está disponível e o estado segue pelo TCP
+            token = self.udp_sessions.open(client_context) if session['udp'] else 0
+            client_context['udp'] = session['udp']
+
+            try:
+                await self.send_data(writer, protocol.encode_udp_token(token, self.udp_port))
+            except Exception as e:
+                print(f"Erro ao enviar o token UDP para cliente: {e}")
+                self.remove_client(room, writer)
+                return
+
+        sender = asyncio.create_task(self.__game_state_sending(writer, room, client_context))
+
+        while client_context['running']:
+            try:
+                client_input_data = await self.receive_data(reader, client_context['legacy'])
+
+                if assigned_ghost:
+                    # Aplicada pela sala na ordem de chegada, nos próximos movimentos do fantasma
+                    room.queue_input(assigned_ghost, *client_input_data)
+
+            except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+                print("Cliente desconectado. Encerrando handle_client")
+                client_context['running'] = False
+            except Exception as e:
+                print(f"Erro na comunicação com o cliente: {e},\n Encerrando handle_client")
+                client_context['running'] = False
+
+        sender.cancel()
+        self.remove_client(room, writer)
+
+    async def send_data(self, writer, payload: bytes):
+        """
+            Empacota e envia um payload já codificado (ver `common.protocol`) com o prefixo de 4 bytes do tamanho.
+
+            Args:
+                writer (asyncio.StreamWriter): O canal de escrita do cliente.
+                payload (bytes): O payload codificado.
+        """
+        writer.write(protocol.frame(payload))
+        await writer.drain()
+
+    async def receive_message(self, reader, decode=protocol.decode) -> tuple[int, object]:
+        """
+            Recebe e decodifica uma mensagem do cliente.
+
+            Protocolo: [4 bytes Big-Endian Size] + [Payload (mensagem de `common.protocol`)]
+
+            Args:
+                reader (asyncio.StreamReader): O canal de leitura do cliente.
+                decode (callable, optional): A função de decodificação do payload. Padrão é `protocol.decode`.
+
+            Returns:
+                tuple[int, object]: O tipo da mensagem e seu conteúdo.
+
+            Raises:
+                asyncio.IncompleteReadError: Se a conexão for fechada durante a leitura.
+                ConnectionResetError: Se o payload for inválido.
+        """
+        header = await reader.readexactly(protocol.HEADER.size)
+        size = protocol.HEADER.unpack(header)[0]
+
+        if size > protocol.MAX_CLIENT_PAYLOAD:
+            raise ConnectionResetError(f"Payload muito grande: {size} bytes")
+
+        payload = await reader.readexactly(size)
+
+        try:
+            return decode(payload)
+        except ProtocolError as e:
+            raise ConnectionResetError(f"Erro ao receber ou processar dados do cliente: {e}")
+
+    async def receive_data(self, reader, legacy_client: bool = False) -> tuple[PlayerAction, int, int]:
+        """
+            Recebe uma ação do jogador (PlayerAction), com a sua sequência e o instante do cliente.
+
+            Args:
+                reader (asyncio.StreamReader): O canal de leitura do cliente.
+                legacy_client (bool, optional): Se o cliente usa o protocolo antigo (pickle, sem sequência).
+
+            Returns:
+                tuple[PlayerAction, int, int]: A ação, a sequência e o instante do cliente (ms).
+
+            Raises:
+                asyncio.IncompleteReadError: Se a conexão for fechada durante a leitura.
+                ConnectionResetError: Se o payload for inválido ou não for uma ação.
+        """
+        msg_type, data = await self.receive_message(reader, legacy.decode_input if legacy_client else protocol.decode)
+
+        if msg_type != protocol.MSG_INPUT:
+            raise ConnectionResetError(f"Mensagem inesperada do cliente: {msg_type}")
+
+        return data
+
+    def stats(self) -> dict:
+        """
+            Retorna as estatísticas de carga do servidor.
+
+            Returns:
+                dict: 'rooms' (salas ativas), 'clients' (clientes conectados), 'free_ghosts'
+                (fantasmas livres somando todas as salas), 'update_time' (segundos gastos
+                atualizando as salas desde o início), 'overruns' (passos atrasados nas salas ativas),
+                'broadcast' (ver `Lobby.broadcast_stats`) e, com as métricas ativas, 'metrics' (ver `metrics_sample`).
+        """
+        stats = {
+            'rooms': len(self.lobby.rooms),
+            'clients': self.lobby.client_count(),
+            'free_ghosts': self.lobby.free_ghost_count(),
+            'update_time': self.update_time,
+            'overruns': self.lobby.overrun_count(),
+            'broadcast': self.lobby.broadcast_stats(),
+        }
+
+        if self.metrics is not None:
+            stats['metrics'] = self.metrics_sample()
+
+        return stats
+
+    def client_stats(self) -> list[dict]:
+        """
+            Retorna as estatísticas de envio de cada cliente conectado.
+
+            Returns:
+                list[dict]: Por cliente: 'peer', 'name', 'room', 'ghost', 'buffered' (bytes no buffer de saída
+                do transporte) e as estatísticas da fila de saída (ver `SendQueue.stats`).
+        """
+        stats = []
+
+        for room in self.lobby.rooms.values():
+            for writer, ghost in room.clients.items():
+                context = self.client_contexts.get(writer)
+                if context is None:
+                    continue
+
+                stats.append({
+                    'peer': context['peer'],
+                    'name': context['name'],
+                    'room': room.room_id,
+                    'ghost': ghost.name if ghost else None,
+                    'buffered': writer.transport.get_write_buffer_size(),
+                    **context['queue'].stats()
+                })
+
+        return stats
+
+    def remove_client(self, room: Room, writer):
+        """
+            Remove o cliente da sala, libera o fantasma atribuído (se houver) e fecha a conexão.
+
+            Args:
+                room (Room): A sala do cliente.
+                writer (asyncio.StreamWriter): O canal de escrita do cliente a ser removido.
+        """
+        context = self.client_contexts.pop(writer, None)
+        if context is not None:
+            context['queue'].close()
+            self.udp_sessions.close(context)
+
+        if writer not in room.clients:
+            return
+
+        self.lobby.leave(room, writer)
+        writer.close()
+        print("Cliente removido e fantasma liberado.\n")
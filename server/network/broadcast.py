@@ -0,0 +1,355 @@
+import time
+import threading
+
+from common import protocol, compression
+from common.snapshot import Snapshot
+from . import legacy
+
+class Publication:
+    """
+        Estado publicado de um tick, imutável após a criação.
+
+        As threads de envio leem apenas a publicação atual (uma única leitura de atributo), sem
+        nenhum lock: a simulação monta uma publicação nova a cada tick e troca a referência.
+
+        Attributes:
+            tick (int): O tick publicado.
+            snapshot (Snapshot): A fotografia do estado no tick.
+            frame (bytes): O frame do tick (delta ou keyframe), já com o cabeçalho de tamanho.
+            history (tuple[tuple[int, bytes, bytes], ...]): (tick, frame, frame comprimido) dos últimos
+                ticks, do mais antigo ao atual.
+            keyframe (tuple[int, bytes, bytes] | None): O keyframe mais recente já codificado, com a
+                sua versão comprimida.
+    """
+    __slots__ = ('tick', 'snapshot', 'frame', 'history', 'keyframe')
+
+    def __init__(self, tick, snapshot, frame, history, keyframe):
+        self.tick = tick
+        self.snapshot = snapshot
+        self.frame = frame
+        self.history = history
+        self.keyframe = keyframe
+
+
+class StateBroadcaster:
+    """
+        Estágio de broadcast do estado do jogo.
+
+        A cada tick o estado é capturado (Snapshot) e codificado uma única vez em um buffer
+        imutável (bytes), já com o cabeçalho de 4 bytes do tamanho. O mesmo buffer é entregue
+        a todas as conexões, então o custo de serialização não cresce com o número de clientes.
+
+        Clientes antigos (ver `legacy`) recebem o GameState completo serializado com pickle,
+        também produzido sob demanda, no máximo uma vez por tick.
+
+        Com a compressão ativa, cada frame também é comprimido uma única vez (ver `common.compression`),
+        e os clientes que a negociaram recebem a versão comprimida. Se a compressão não reduzir o
+        frame, a versão "comprimida" é o próprio frame.
+
+        O frame de cada tick é um delta em relação ao tick anterior, exceto a cada
+        `keyframe_interval` ticks (ou quando um delta não é possível, como após um reset),
+        quando um keyframe completo é enviado. Clientes novos, ou atrasados além do histórico
+        de deltas, recebem o keyframe do tick atual, também codificado uma única vez.
+
+        A captura (`capture`) precisa de acesso exclusivo ao GameState, mas a codificação e a
+        publicação (`publish_snapshot`) não: o resultado é uma Publication imutável trocada
+        atomicamente, lida pelas threads de envio sem lock.
+
+        Attributes:
+            tick (int): Número de ticks capturados.
+            encode_calls (int): Total de serializações realizadas desde o início.
+            last_tick_encodes (int): Serializações realizadas para o último tick publicado.
+            compress (bool): Se os frames também são comprimidos.
+            raw_bytes (int): Total de bytes dos frames codificados.
+            compressed_bytes (int): Total de bytes das versões comprimidas dos mesmos frames.
+            encode_time (float): Tempo total gasto codificando os frames (sem a compressão), em segundos.
+            compress_time (float): Tempo total gasto comprimindo, em segundos.
+    """
+    KEYFRAME_INTERVAL = 100 # Ticks entre keyframes periódicos (5s @ 20 ticks/s)
+    HISTORY_SIZE = 40       # Quantidade de frames mantidos para clientes atrasados
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL, history_size: int = HISTORY_SIZE,
+                 compress: bool = True):
+        self.keyframe_interval = keyframe_interval
+        self.history_size = history_size
+        self.compress = compress and compression.available()
+
+        self.tick = 0
+        self.encode_calls = 0
+        self.last_tick_encodes = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.encode_time = 0.0
+        self.compress_time = 0.0
+
+        self.__current: Publication | None = None
+
+        # Keyframe codificado sob demanda para o tick atual, (tick, frame, frame comprimido)
+        self.__on_demand = None
+
+        # Frame dos clientes antigos para o tick atual, (tick, frame), e o GameState reconstruído para ele
+        self.__legacy = None
+        self.__legacy_state = None
+
+        # Evita que duas threads de envio codifiquem o mesmo keyframe (ou frame antigo) sob demanda
+        self.__keyframe_lock = threading.Lock()
+
+        # Acorda as threads de envio a cada tick publicado
+        self.__published = threading.Condition()
+
+    def __encode(self, message) -> tuple[bytes, bytes]:
+        """
+            Codifica uma mensagem de snapshot no formato binário e adiciona o cabeçalho com o tamanho do payload.
+
+            Returns:
+                tuple[bytes, bytes]: O frame e a sua versão comprimida (o próprio frame, se a compressão
+                estiver desativada ou não reduzir o tamanho).
+        """
+        start = time.perf_counter()
+        payload = protocol.encode_snapshot(message)
+        frame = protocol.frame(payload)
+        encoded = time.perf_counter()
+
+        self.encode_time += encoded - start
+        self.encode_calls += 1
+        self.last_tick_encodes += 1
+        compressed = frame
+
+        if self.compress:
+            candidate = protocol.frame(protocol.encode_compressed(payload))
+            self.compress_time += time.perf_counter() - encoded
+
+            if len(candidate) < len(frame):
+                compressed = candidate
+
+        self.raw_bytes += len(frame)
+        self.compressed_bytes += len(compressed)
+        return frame, compressed
+
+    def capture(self, game_state) -> Snapshot:
+        """
+            Captura o estado do tick atual. É a única etapa que lê o GameState, e deve ser
+            executada com acesso exclusivo a ele.
+
+            Args:
+                game_state (GameState): O estado do jogo.
+
+            Returns:
+                Snapshot: A fotografia do tick, a ser publicada com `publish_snapshot`.
+        """
+        self.tick += 1
+        return Snapshot.capture(game_state, self.tick)
+
+    def publish_snapshot(self, snapshot: Snapshot) -> bytes:
+        """
+            Codifica uma fotografia e a torna disponível para envio. Não acessa o GameState;
+            deve ser chamado por uma única thread, na ordem de captura.
+
+            Args:
+                snapshot (Snapshot): A fotografia retornada por `capture`.
+
+            Returns:
+                bytes: O frame publicado para o tick ([4 bytes (tamanho)] + [payload]).
+        """
+        self.last_tick_encodes = 0
+        previous = self.__current
+
+        message = None
+        if previous is not None and snapshot.tick % self.keyframe_interval != 0:
+            message = snapshot.delta_from(previous.snapshot)
+
+        if message is None:
+            frame, compressed = self.__encode(snapshot.keyframe())
+            keyframe = (snapshot.tick, frame, compressed)
+        else:
+            frame, compressed = self.__encode(message)
+            keyframe = previous.keyframe
+
+        history = previous.history[1 - self.history_size:] if previous is not None else ()
+        history += ((snapshot.tick, frame, compressed),)
+
+        # Troca atômica da referência: leitores veem a publicação anterior ou a nova, nunca uma mistura
+        self.__current = Publication(snapshot.tick, snapshot, frame, history, keyframe)
+
+        with self.__published:
+            self.__published.notify_all()
+
+        return frame
+
+    def publish(self, game_state) -> bytes:
+        """
+            Captura, codifica e publica o estado do tick atual.
+
+            Args:
+                game_state (GameState): O estado do jogo a ser publicado.
+
+            Returns:
+                bytes: O frame publicado para o tick ([4 bytes (tamanho)] + [payload]).
+        """
+        return self.publish_snapshot(self.capture(game_state))
+
+    def wait_for_tick(self, last_tick: int, timeout: float | None = None) -> bool:
+        """
+            Bloqueia a thread chamadora até que um tick posterior a `last_tick` seja publicado.
+
+            Args:
+                last_tick (int): O tick do último frame enviado ao cliente.
+                timeout (float, optional): Tempo máximo de espera, em segundos.
+
+            Returns:
+                bool: True se há um tick novo, False se o tempo se esgotou.
+        """
+        with self.__published:
+            return self.__published.wait_for(lambda: self.latest_tick() > last_tick, timeout)
+
+    def latest_tick(self) -> int:
+        """
+            Returns:
+                int: O último tick publicado (0 se nada foi publicado ainda).
+        """
+        current = self.__current
+        return current.tick if current is not None else 0
+
+    def keyframe(self, compressed: bool = False) -> tuple[int, bytes] | None:
+        """
+            Retorna o keyframe do tick publicado, codificando-o sob demanda (no máximo uma vez por tick).
+
+            Args:
+                compressed (bool, optional): Se deve retornar a versão comprimida do frame. Padrão é False.
+
+            Returns:
+                tuple[int, bytes] | None: O tick e o frame do keyframe, ou None se nada foi publicado ainda.
+        """
+        keyframe = self.__keyframe_of(self.__current)
+
+        if keyframe is None:
+            return None
+
+        return keyframe[0], keyframe[2 if compressed else 1]
+
+    def __keyframe_of(self, current: Publication | None) -> tuple[int, bytes, bytes] | None:
+        if current is None:
+            return None
+
+        if current.keyframe is not None and current.keyframe[0] == current.tick:
+            return current.keyframe
+
+        with self.__keyframe_lock:
+            if self.__on_demand is None or self.__on_demand[0] != current.tick:
+                self.__on_demand = (current.tick, *self.__encode(current.snapshot.keyframe()))
+
+            return self.__on_demand
+
+    def legacy_frame(self) -> tuple[int, bytes] | None:
+        """
+            Retorna o frame do tick publicado no formato antigo (GameState com pickle), codificando-o
+            sob demanda (no máximo uma vez por tick).
+
+            Returns:
+                tuple[int, bytes] | None: O tick e o frame, ou None se nada foi publicado ainda.
+        """
+        current = self.__current
+
+        if current is None:
+            return None
+
+        with self.__keyframe_lock:
+            if self.__legacy is None or self.__legacy[0] != current.tick:
+                self.__legacy_state, payload = legacy.encode_game_state(self.__legacy_state, current.snapshot)
+                self.__legacy = (current.tick, protocol.frame(payload))
+
+            return self.__legacy
+
+    def frames_since(self, last_tick: int, compressed: bool = False) -> tuple[int, list[bytes]]:
+        """
+            Retorna os frames que um cliente precisa receber para alcançar o tick atual.
+
+            Args:
+                last_tick (int): O tick do último frame enviado ao cliente (0 se nenhum).
+                compressed (bool, optional): Se deve retornar as versões comprimidas dos frames. Padrão é False.
+
+            Returns:
+                tuple[int, list[bytes]]: O tick alcançado após o envio e a lista de frames, na ordem.
+                A lista é vazia se o cliente já estiver atualizado.
+        """
+        current = self.__current
+
+        if current is None or current.tick == last_tick:
+            return last_tick, []
+
+        history = current.history
+
+        version = 2 if compressed else 1
+
+        # Cliente novo ou atrasado além do histórico: envia o keyframe atual
+        if last_tick == 0 or history[0][0] > last_tick + 1:
+            keyframe = self.__keyframe_of(current)
+            return keyframe[0], [keyframe[version]]
+
+        return current.tick, [entry[version] for entry in history if entry[0] > last_tick]
+
+    def latest(self) -> tuple[int, bytes] | None:
+        """
+            Retorna o último frame publicado.
+
+            Returns:
+                tuple[int, bytes] | None: O tick e o frame correspondente, ou None se nada foi publicado ainda.
+        """
+        current = self.__current
+        return (current.tick, current.frame) if current is not None else None
+
+    def latest_snapshot(self) -> Snapshot | None:
+        """
+            Returns:
+                Snapshot | None: A fotografia do último tick publicado, ou None se nada foi publicado ainda.
+        """
+        current = self.__current
+        return current.snapshot if current is not None else None
+
+    def stats(self) -> dict:
+        """
+            Returns:
+                dict: 'ticks', 'frames' (frames codificados), 'raw_bytes', 'compressed_bytes', 'encode_time'
+                e 'compress_time'.
+        """
+        return {
+            'ticks': self.tick,
+            'frames': self.encode_calls,
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': self.compressed_bytes,
+            'encode_time': self.encode_time,
+            'compress_time': self.compress_time,
+        }
+
+    @property
+    def encodes_per_tick(self) -> float:
+        """
+            Média de serializações por tick desde o início (1.0 mais os keyframes sob demanda, independentemente do número de clientes).
+        """
+        return self.encode_calls / self.tick if self.tick else 0.0
+
+
+def report(stats: dict) -> str:
+    """
+        Resume as estatísticas de um ou mais broadcasters (ver `StateBroadcaster.stats`).
+
+        Returns:
+            str: Bytes e tempo de codificação médios por frame, com e sem compressão, e o custo médio
+            da compressão por tick.
+    """
+    if not stats.get('frames'):
+        return "Broadcast: nenhum frame codificado"
+
+    line = (
+        f"Broadcast: {stats['frames']} frames, {stats['raw_bytes'] / stats['frames']:.1f} B/frame, "
+        f"codificação {stats['encode_time'] / stats['frames'] * 1e6:.0f} µs/frame"
+    )
+
+    if stats['compress_time']:
+        line += (
+            f", comprimidos {stats['compressed_bytes'] / stats['frames']:.1f} B/frame "
+            f"({stats['compressed_bytes'] / stats['raw_bytes']:.0%}), "
+            f"compressão {stats['compress_time'] / max(stats['ticks'], 1) * 1e6:.0f} µs/tick"
+        )
+
+    return line
@@ -0,0 +1,199 @@
+"""
+    Negociação das conexões (handshake).
+
+    Recebe o HELLO do cliente e, a partir dele (ou da ausência dele, para clientes antigos), escolhe o
+    formato mais eficiente que os dois lados suportam e monta as respostas enviadas antes do estado do jogo.
+
+    Regras de leitura do HELLO, comuns a todos os servidores: o cliente que não envia nada em
+    `legacy.LEGACY_TIMEOUT` segundos é tratado como antigo; depois do primeiro byte, o HELLO inteiro
+    deve chegar em HELLO_TIMEOUT segundos e ter no máximo `protocol.MAX_CLIENT_PAYLOAD` bytes.
+"""
+
+import math
+import socket
+
+from common import protocol
+from . import legacy
+
+HELLO_TIMEOUT = 5.0     # Tempo máximo de leitura do HELLO, após o início da sua chegada
+
+
+def hello_size(header: bytes) -> int:
+    """
+        Args:
+            header (bytes): O cabeçalho de tamanho do HELLO.
+
+        Returns:
+            int: O tamanho do payload do HELLO.
+
+        Raises:
+            ConnectionResetError: Se o tamanho passar de `protocol.MAX_CLIENT_PAYLOAD`.
+    """
+    size = protocol.HEADER.unpack(header)[0]
+
+    if size > protocol.MAX_CLIENT_PAYLOAD:
+        raise ConnectionResetError(f"Payload muito grande: {size} bytes")
+
+    return size
+
+
+def decode_hello(payload: bytes) -> tuple:
+    """
+        Args:
+            payload (bytes): O payload do HELLO.
+
+        Returns:
+            tuple: O HELLO decodificado (ver `protocol.decode`).
+
+        Raises:
+            VersionMismatch: Se o cliente usar outra versão do protocolo.
+            ConnectionResetError: Se a mensagem for inválida ou não for um HELLO.
+    """
+    try:
+        msg_type, hello = protocol.decode(payload)
+    except protocol.VersionMismatch:
+        raise
+    except protocol.ProtocolError as e:
+        raise ConnectionResetError(f"HELLO inválido: {e}")
+
+    if msg_type != protocol.MSG_HELLO:
+        raise ConnectionResetError(f"Mensagem inesperada do cliente: {msg_type}")
+
+    return hello
+
+
+def receive_hello(client_socket: socket.socket) -> tuple | None:
+    """
+        Lê o HELLO de um socket bloqueante, sem consumir nenhum byte além dele (o socket pode ser
+        repassado a outro processo em seguida). Ao final, o socket volta a não ter timeout.
+
+        Args:
+            client_socket (socket): O socket do cliente recém-conectado.
+
+        Returns:
+            tuple | None: O HELLO decodificado, ou None se o cliente não enviar nada em
+            `legacy.LEGACY_TIMEOUT` segundos (cliente antigo).
+
+        Raises:
+            VersionMismatch: Se o cliente usar outra versão do protocolo.
+            ConnectionResetError: Se a conexão for fechada ou a mensagem for inválida.
+            socket.timeout: Se o HELLO não chegar inteiro em HELLO_TIMEOUT segundos.
+    """
+    def receive_all(num_bytes):
+        data = b''
+        while len(data) < num_bytes:
+            packet = client_socket.recv(num_bytes - len(data))
+            if not packet:
+                raise ConnectionResetError("Conexão fechada durante o HELLO.")
+            data += packet
+        return data
+
+    try:
+        try:
+            # Aguarda o primeiro byte sem consumi-lo
+            client_socket.settimeout(legacy.LEGACY_TIMEOUT)
+            client_socket.recv(1, socket.MSG_PEEK)
+        except socket.timeout:
+            return None
+
+        client_socket.settimeout(HELLO_TIMEOUT)
+        size = hello_size(receive_all(protocol.HEADER.size))
+        return decode_hello(receive_all(size))
+    finally:
+        client_socket.settimeout(None)
+
+
+def negotiate(hello: tuple | None, tick_rate: int, compression: bool, udp_available: bool) -> dict:
+    """
+        Escolhe o formato do estado para uma conexão.
+
+        Args:
+            hello (tuple | None): O HELLO decodificado (ver `protocol.decode`), ou None para clientes antigos.
+            tick_rate (int): Ticks por segundo da simulação.
+            compression (bool): Se o servidor permite compressão.
+            udp_available (bool): Se o socket UDP do servidor está aberto.
+
+        Returns:
+            dict: 'name' (identificação do cliente), 'room_id' (sala pedida), 'spectator' (não ocupa fantasma),
+            'legacy' (pickle),
+            'udp' (estado por datagramas), 'udp_requested', 'deltas', 'compressed' e 'interval'
+            (ticks entre envios do estado).
+    """
+    if hello is None:
+        return {
+            'name': "cliente antigo",
+            'room_id': 0,
+            'spectator': False,
+            'legacy': True,
+            'udp': False,
+            'udp_requested': False,
+            'deltas': False,
+            'compressed': False,
+            'interval': 1,
+        }
+
+    room_id, flags, encodings, dictionary_id, update_rate, name = hello
+    udp_requested = bool(flags & protocol.HELLO_UDP)
+    udp = udp_requested and udp_available
+
+    # Taxa preferida abaixo da simulação: envia a cada `interval` ticks (com deltas, os dos ticks
+    # intermediários seguem juntos, em uma única escrita)
+    interval = math.ceil(tick_rate / update_rate) if 0 < update_rate < tick_rate else 1
+
+    return {
+        'name': name or "sem nome",
+        'room_id': room_id,
+        'spectator': bool(flags & protocol.HELLO_SPECTATOR),
+        'legacy': False,
+        'udp': udp,
+        'udp_requested': udp_requested,
+        # Por UDP cada datagrama é um keyframe autocontido
+        'deltas': bool(encodings & protocol.ENCODING_DELTA) and not udp,
+        'compressed': compression and protocol.accepts_compression(encodings, dictionary_id),
+        'interval': interval,
+    }
+
+
+def greeting(session: dict, tick_rate: int, ghost, room_id: int) -> bytes:
+    """
+        Monta as mensagens enviadas ao cliente após a negociação, já com os cabeçalhos de tamanho:
+        WELCOME e ASSIGN, ou apenas a atribuição no formato antigo para clientes antigos.
+
+        Args:
+            session (dict): O resultado de `negotiate`.
+            tick_rate (int): Ticks por segundo da simulação.
+            ghost (EntityType | None): O fantasma atribuído.
+            room_id (int): A sala do cliente.
+
+        Returns:
+            bytes: Os frames a enviar, na ordem.
+    """
+    if session['legacy']:
+        return protocol.frame(legacy.encode_assign(ghost))
+
+    encodings = 0
+    if session['deltas']:
+        encodings |= protocol.ENCODING_DELTA
+    if session['compressed']:
+        encodings |= protocol.ENCODING_COMPRESSED
+
+    return (
+        protocol.frame(protocol.encode_welcome(encodings, tick_rate, session['interval']))
+        + protocol.frame(protocol.encode_assign(ghost, room_id))
+    )
+
+
+def describe(session: dict, tick_rate: int) -> str:
+    """
+        Returns:
+            str: Resumo do formato negociado, para o log de conexões.
+    """
+    if session['legacy']:
+        return "protocolo antigo (pickle)"
+
+    parts = ["UDP" if session['udp'] else "TCP", "deltas" if session['deltas'] else "keyframes"]
+    if session['compressed']:
+        parts.append("comprimido")
+    parts.append(f"{tick_rate / session['interval']:.0f} atualizações/s")
+
+    return f"protocolo v{protocol.PROTOCOL_VERSION}, " + ", ".join(parts)
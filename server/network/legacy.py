@@ -0,0 +1,88 @@
+"""
+    Caminho de compatibilidade para clientes antigos (protocolo com pickle).
+
+    Esses clientes não enviam HELLO: conectam e esperam a atribuição do fantasma, recebem o
+    GameState completo serializado com pickle a cada atualização e enviam cada PlayerAction
+    serializada com pickle, sempre com o cabeçalho de 4 bytes do tamanho. Um cliente que não
+    envia nada em LEGACY_TIMEOUT segundos após conectar é tratado como antigo.
+
+    O GameState enviado é reconstruído a partir do snapshot publicado e serializado uma única vez
+    por tick (ver `StateBroadcaster.legacy_frame`), com o labirinto no formato que esses clientes
+    conhecem (grade de objetos Cell, ver `Matrix.legacy_state`). As ações recebidas não são desserializadas:
+    cada PlayerAction tem poucas serializações possíveis (uma por protocolo do pickle), e o payload só é
+    aceito se for exatamente uma delas.
+"""
+
+import io
+import copyreg
+import pickle
+
+from common import protocol
+from common.enums import PlayerAction
+from common.game_state import GameState
+from common.matrix import Matrix
+from common.snapshot import Snapshot, apply_message
+
+LEGACY_TIMEOUT = 1.0    # Segundos sem HELLO até o cliente ser tratado como antigo
+
+# Payload -> ação, para todas as serializações possíveis de cada PlayerAction
+_ACTIONS = {
+    pickle.dumps(action, protocol=version): action
+    for action in PlayerAction
+    for version in range(pickle.HIGHEST_PROTOCOL + 1)
+}
+
+
+class _LegacyPickler(pickle.Pickler):
+    """
+        Pickler que serializa o Matrix no formato das versões anteriores.
+    """
+
+    def reducer_override(self, obj):
+        if type(obj) is Matrix:
+            return copyreg.__newobj__, (Matrix,), obj.legacy_state()
+
+        return NotImplemented
+
+
+def encode_assign(ghost) -> bytes:
+    """
+        Codifica a atribuição de fantasma (EntityType ou None) no formato antigo.
+    """
+    return pickle.dumps(ghost)
+
+
+def encode_game_state(game_state: GameState | None, snapshot: Snapshot) -> tuple[GameState, bytes]:
+    """
+        Atualiza o GameState usado pelos clientes antigos com o snapshot e o serializa.
+
+        Args:
+            game_state (GameState | None): O GameState reconstruído no tick anterior (None no primeiro).
+            snapshot (Snapshot): O snapshot publicado.
+
+        Returns:
+            tuple[GameState, bytes]: O GameState atualizado, a ser reaproveitado no próximo tick, e o payload.
+    """
+    game_state, _ = apply_message(game_state, 0, snapshot.keyframe())
+
+    buffer = io.BytesIO()
+    _LegacyPickler(buffer).dump(game_state)
+    return game_state, buffer.getvalue()
+
+
+def decode_input(payload: bytes) -> tuple[int, tuple[PlayerAction, int, int]]:
+    """
+        Decodifica uma ação enviada por um cliente antigo, no mesmo formato de `protocol.decode`.
+
+        Returns:
+            tuple[int, tuple[PlayerAction, int, int]]: MSG_INPUT e (ação, sequência 0, instante 0).
+
+        Raises:
+            ProtocolError: Se o payload não for uma PlayerAction serializada.
+    """
+    action = _ACTIONS.get(bytes(payload))
+
+    if action is None:
+        raise protocol.ProtocolError(f"Ação antiga inválida: {bytes(payload[:32])!r}")
+
+    return protocol.MSG_INPUT, (action, 0, 0)
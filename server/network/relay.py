@@ -0,0 +1,307 @@
+"""
+    Relay de espectadores.
+
+    Processo independente que acompanha uma partida como um único espectador do servidor do jogo
+    (ou de outro relay) e retransmite o estado para qualquer número de espectadores, opcionalmente
+    com atraso. O servidor do jogo envia o estado uma única vez para o relay, então o seu custo não
+    depende de quantas pessoas assistem; relays podem ser encadeados para distribuir a carga.
+
+    Os espectadores usam o mesmo protocolo dos jogadores (HELLO, WELCOME, ASSIGN sem fantasma e
+    os snapshots), com as mesmas opções de codificação, taxa de atualização e transporte (TCP ou UDP).
+    As entradas enviadas por eles são ignoradas.
+
+    Execute a partir da raiz do projeto:
+        python3 -m server.network.relay --upstream 127.0.0.1:8888 --port 8890 --delay 10
+"""
+
+import time
+import asyncio
+import argparse
+from collections import deque
+
+from common import protocol, compression
+from common.snapshot import KEYFRAME, Snapshot
+
+from ..room import Lobby, Room
+from .broadcast import StateBroadcaster
+from .async_server_connection import AsyncServerSocket
+
+
+class RelayRoom:
+    """
+        Sala retransmitida: publica, com o atraso configurado, as fotografias recebidas do upstream.
+
+        Tem a interface de `Room` usada pelo AsyncServerSocket, mas todos os clientes são espectadores.
+        Os ticks publicados seguem os do upstream; após uma reconexão em que o upstream recomeça a
+        contagem (servidor reiniciado), os ticks são deslocados para continuarem crescentes.
+
+        Attributes:
+            room_id (int): A sala acompanhada no upstream (0 até a primeira atribuição).
+            delay (float): Atraso, em segundos, entre a chegada e a publicação de cada tick.
+            clients (dict): Cliente -> None (todos são espectadores).
+            available_ghosts (list): Sempre vazia.
+            broadcaster (StateBroadcaster): Publica o estado retransmitido.
+    """
+
+    def __init__(self, room_id: int = 0, delay: float = 0.0, compress: bool = True):
+        """
+            Args:
+                room_id (int, optional): A sala pedida ao upstream. Padrão é 0 (escolha automática).
+                delay (float, optional): Atraso da retransmissão, em segundos. Padrão é 0.
+                compress (bool, optional): Se o broadcaster também publica os frames comprimidos. Padrão é True.
+        """
+        self.room_id = room_id
+        self.delay = delay
+        self.clients = {}
+        self.available_ghosts = []
+        self.broadcaster = StateBroadcaster(compress=compress)
+
+        self.__received = None      # Última fotografia recebida, nos ticks do upstream
+        self.__last_tick = 0        # Último tick enfileirado para publicação
+        self.__tick_offset = 0
+        self.__pending = deque()    # (instante de publicação, fotografia)
+
+    def has_free_ghost(self) -> bool:
+        return False
+
+    def player_count(self) -> int:
+        return 0
+
+    def assign_ghost(self, client, spectator: bool = True) -> None:
+        """
+            Registra o cliente como espectador.
+        """
+        self.clients[client] = None
+        return None
+
+    def remove_client(self, client):
+        self.clients.pop(client, None)
+
+    def queue_input(self, *args):
+        """
+            Espectadores não controlam fantasmas: as entradas são ignoradas.
+        """
+
+    def ack_for(self, *args) -> None:
+        return None
+
+    def disconnected(self):
+        """
+            Descarta a base dos deltas ao perder a conexão com o upstream; a próxima conexão começa por um keyframe.
+        """
+        self.__received = None
+
+    def receive(self, message: tuple, now: float) -> bool:
+        """
+            Enfileira a fotografia descrita por uma mensagem do upstream.
+
+            Args:
+                message (tuple): O keyframe ou o delta recebido.
+                now (float): Instante da chegada (time.monotonic()).
+
+            Returns:
+                bool: False se a mensagem foi descartada (delta sem a base correspondente).
+        """
+        snapshot = Snapshot.from_message(message, self.__received)
+
+        if snapshot is None:
+            return False
+
+        self.__received = snapshot
+
+        # Upstream reiniciado: mantém os ticks publicados crescentes
+        if message[0] == KEYFRAME and snapshot.tick + self.__tick_offset <= self.__last_tick:
+            self.__tick_offset = self.__last_tick + 1 - snapshot.tick
+
+        if self.__tick_offset:
+            snapshot = Snapshot(snapshot.tick + self.__tick_offset, snapshot.entities, snapshot.items,
+                                snapshot.ghost_area_open, snapshot.fields)
+
+        self.__last_tick = snapshot.tick
+        self.__pending.append((now + self.delay, snapshot))
+        return True
+
+    def update(self, now: float) -> int:
+        """
+            Publica as fotografias cujo atraso já passou.
+
+            Args:
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                int: Quantidade de ticks publicados.
+        """
+        published = 0
+
+        while self.__pending and self.__pending[0][0] <= now:
+            _, snapshot = self.__pending.popleft()
+            self.broadcaster.publish_snapshot(snapshot)
+
+            # Sem captura local: conta os ticks retransmitidos
+            self.broadcaster.tick += 1
+            published += 1
+
+        return published
+
+    def next_delay(self, now: float) -> float:
+        """
+            Returns:
+                float: Tempo, em segundos, até a próxima publicação pendente (no máximo um tick).
+        """
+        if not self.__pending:
+            return 1.0 / Room.TICK_RATE
+
+        return min(max(0.0, self.__pending[0][0] - now), 1.0 / Room.TICK_RATE)
+
+
+class RelayLobby(Lobby):
+    """
+        Lobby com uma única sala, a retransmitida: todos os clientes entram nela, e ela nunca é descartada.
+    """
+
+    def __init__(self, room: RelayRoom):
+        super().__init__(max_rooms=1, compress=False)
+        self.room = room
+        self.rooms = {room.room_id: room}
+
+    def assigned(self, room_id: int):
+        """
+            Atualiza o identificador da sala após a atribuição do upstream.
+        """
+        self.room.room_id = room_id
+        self.rooms = {room_id: self.room}
+
+    def join(self, room_id: int = 0, spectator: bool = True) -> RelayRoom:
+        return self.room
+
+    def leave(self, room: RelayRoom, client):
+        room.remove_client(client)
+
+    def update(self, now: float) -> list[RelayRoom]:
+        return [self.room] if self.room.update(now) else []
+
+    def next_delay(self, now: float) -> float:
+        return self.room.next_delay(now)
+
+    def overrun_count(self) -> int:
+        return 0
+
+
+class RelayServer(AsyncServerSocket):
+    """
+        Servidor de espectadores alimentado por um upstream (servidor do jogo ou outro relay).
+
+        Uma corrotina mantém a conexão com o upstream como espectador (HELLO com HELLO_SPECTATOR,
+        deltas e compressão quando disponível, na taxa completa) e entrega cada snapshot à RelayRoom;
+        a partir dela, os espectadores são atendidos exatamente como no AsyncServerSocket. Se a
+        conexão cair, o relay tenta novamente a cada RECONNECT_DELAY segundos, mantendo os espectadores conectados.
+    """
+    RECONNECT_DELAY = 2.0   # Segundos entre as tentativas de conexão com o upstream
+    NAME = "relay"          # Identificação enviada ao upstream no HELLO
+
+    def __init__(self, server_ip: str, server_port: int, upstream: tuple[str, int], room_id: int = 0,
+                 delay: float = 0.0, compression: bool = True, **options):
+        """
+            Args:
+                server_ip (str): O endereço IP para o relay escutar.
+                server_port (int): A porta TCP (e UDP) para o relay escutar.
+                upstream (tuple[str, int]): Endereço e porta do servidor do jogo ou do relay anterior.
+                room_id (int, optional): A sala acompanhada. Padrão é 0 (a mais cheia do upstream).
+                delay (float, optional): Atraso da retransmissão, em segundos. Padrão é 0.
+                compression (bool, optional): Se os snapshots são comprimidos para os espectadores que pedirem.
+                **options: Demais parâmetros do AsyncServerSocket (send_high_water, metrics_port, ...).
+        """
+        super().__init__(server_ip, server_port, max_rooms=1, compression=compression, **options)
+        self.upstream = upstream
+        self.room = RelayRoom(room_id, delay, compression)
+        self.lobby = RelayLobby(self.room)
+
+    async def accept_connections(self):
+        """
+            Acompanha o upstream enquanto aceita os espectadores.
+        """
+        follower = asyncio.create_task(self.__follow_upstream())
+
+        try:
+            await super().accept_connections()
+        finally:
+            follower.cancel()
+
+    async def __follow_upstream(self):
+        """
+            Mantém a conexão com o upstream, reconectando quando ela cair.
+        """
+        while self.game_running:
+            try:
+                reader, writer = await asyncio.open_connection(*self.upstream)
+            except OSError as e:
+                print(f"Upstream {self.upstream[0]}:{self.upstream[1]} indisponível ({e})")
+            else:
+                try:
+                    await self.__relay(reader, writer)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                    print(f"Conexão com o upstream encerrada ({e!r})")
+                finally:
+                    writer.close()
+                    self.room.disconnected()
+
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def __relay(self, reader, writer):
+        """
+            Entra na sala do upstream como espectador e repassa os snapshots recebidos à sala retransmitida.
+        """
+        encodings = protocol.ENCODING_DELTA | protocol.ENCODING_COMPRESSED
+        hello = protocol.encode_hello(self.room.room_id, protocol.HELLO_SPECTATOR, encodings, name=self.NAME)
+        await self.send_data(writer, hello)
+
+        while self.game_running:
+            header = await reader.readexactly(protocol.HEADER.size)
+            size = protocol.HEADER.unpack(header)[0]
+
+            if size > compression.MAX_PAYLOAD:
+                raise protocol.ProtocolError(f"Payload muito grande: {size} bytes")
+
+            msg_type, message = protocol.decode(await reader.readexactly(size))
+
+            if msg_type == protocol.MSG_COMPRESSED:
+                msg_type, message = protocol.decode(message)
+
+            if msg_type in (protocol.MSG_KEYFRAME, protocol.MSG_DELTA):
+                now = time.monotonic()
+
+                if self.room.receive(message, now) and self.room.update(now):
+                    self.wake_senders(self.room, now)
+
+            elif msg_type == protocol.MSG_ASSIGN:
+                ghost, room_id = message
+                self.lobby.assigned(room_id)
+
+                if ghost is not None:
+                    print(f"O upstream não reconhece espectadores: o relay ocupa o fantasma {ghost.name}")
+                print(f"Retransmitindo a sala {room_id} de {self.upstream[0]}:{self.upstream[1]} "
+                      f"com {self.room.delay:.1f}s de atraso")
+
+            elif msg_type == protocol.MSG_REJECT:
+                reason, version = message
+                raise ConnectionRefusedError(f"recusado pelo upstream (motivo {reason}, protocolo v{version})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay de espectadores do Pac-Man Hunt.")
+    parser.add_argument("--upstream", default="127.0.0.1:8888",
+                        help="endereço do servidor do jogo ou de outro relay (ip:porta)")
+    parser.add_argument("--ip", default="0.0.0.0", help="endereço em que o relay escuta")
+    parser.add_argument("--port", type=int, default=8890, help="porta em que o relay escuta")
+    parser.add_argument("--room", type=int, default=0, help="sala acompanhada (0: a mais cheia)")
+    parser.add_argument("--delay", type=float, default=0.0, help="atraso da retransmissão, em segundos")
+    parser.add_argument("--no-compression", action="store_true", help="não comprime os snapshots para os espectadores")
+    options = parser.parse_args()
+
+    host, _, port = options.upstream.rpartition(":")
+    RelayServer(options.ip, options.port, (host, int(port)), options.room, options.delay,
+                not options.no_compression).start()
+
+
+if __name__ == "__main__":
+    main()
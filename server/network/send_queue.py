@@ -0,0 +1,198 @@
+import threading
+from collections import deque
+
+class SendQueue:
+    """
+        Fila de saída de uma conexão.
+
+        A cada tick publicado, a simulação oferece à fila os frames novos do broadcaster (`offer`);
+        a thread ou corrotina de envio do cliente retira tudo o que estiver pendente (`take`) e envia.
+        O formato dos frames segue o negociado no handshake: deltas e keyframes (padrão), apenas
+        keyframes, ou o GameState no formato antigo; comprimidos ou não. Com `interval` maior que 1,
+        os frames são enfileirados apenas a cada `interval` ticks.
+
+        Um cliente lento nunca bloqueia a simulação nem os demais clientes, e a memória usada por
+        ele fica limitada:
+
+        - Se a fila passar de `high_water` frames, os frames pendentes são descartados e substituídos
+          pelo keyframe do tick atual (conflação: apenas o estado mais recente é mantido).
+        - Se o cliente continuar atrasado por mais de `slow_client_timeout` segundos desde a primeira
+          conflação, `offer` retorna False e o cliente deve ser desconectado. O cliente só deixa de
+          ser considerado atrasado quando esvazia a fila sem que tenha havido conflação desde a
+          retirada anterior: esvaziar a fila de vez em quando, continuando a provocar conflações,
+          não interrompe a contagem.
+
+        Attributes:
+            high_water (int): Quantidade máxima de frames pendentes antes da conflação.
+            slow_client_timeout (float): Tempo máximo, em segundos, que um cliente pode ficar atrasado.
+            compressed (bool): Se o cliente recebe as versões comprimidas dos frames.
+            deltas (bool): Se o cliente recebe deltas (senão, apenas o estado completo de cada envio).
+            legacy (bool): Se o cliente recebe o GameState no formato antigo (pickle).
+            interval (int): Ticks entre envios.
+            max_depth (int): Maior quantidade de frames pendentes observada.
+            sent_frames (int): Frames entregues para envio (inclusive os datagramas, ver `count_datagrams`).
+            sent_bytes (int): Bytes entregues para envio (inclusive os datagramas).
+            conflations (int): Quantidade de conflações.
+            dropped_frames (int): Frames descartados pelas conflações.
+            sent_tick (int): Tick do último frame entregue para envio.
+            closed (bool): Se a fila foi fechada.
+    """
+    HIGH_WATER = 10             # Frames pendentes (0.5s @ 20 ticks/s)
+    SLOW_CLIENT_TIMEOUT = 5.0   # Segundos atrasado até a desconexão
+
+    def __init__(self, high_water: int = HIGH_WATER, slow_client_timeout: float = SLOW_CLIENT_TIMEOUT,
+                 compressed: bool = False, deltas: bool = True, legacy: bool = False, interval: int = 1):
+        self.high_water = high_water
+        self.slow_client_timeout = slow_client_timeout
+        self.compressed = compressed
+        self.deltas = deltas and not legacy
+        self.legacy = legacy
+        self.interval = interval
+
+        self.__frames = deque()
+        self.__bytes = 0
+        self.__last_tick = 0        # Tick do último frame enfileirado
+        self.__behind_since = None  # Instante da primeira conflação desde que o cliente alcançou o estado atual
+        self.__conflated = False    # Se houve conflação desde a última retirada
+
+        self.max_depth = 0
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.conflations = 0
+        self.dropped_frames = 0
+        self.sent_tick = 0
+        self.closed = False
+
+        self.__condition = threading.Condition()
+
+    def offer(self, broadcaster, now: float) -> bool:
+        """
+            Enfileira os frames publicados desde o último tick enfileirado.
+
+            Args:
+                broadcaster (StateBroadcaster): O broadcaster da sala do cliente.
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                bool: False se o cliente está atrasado há mais de `slow_client_timeout` e deve ser desconectado.
+        """
+        with self.__condition:
+            if self.closed:
+                return True
+
+            latest = broadcaster.latest_tick()
+
+            # Nada publicado ainda, ou fora da taxa de envio negociada
+            if not latest or (self.__last_tick and latest - self.__last_tick < self.interval):
+                return True
+
+            if self.deltas:
+                tick, frames = broadcaster.frames_since(self.__last_tick, self.compressed)
+            else:
+                tick, frame = self.__full_state(broadcaster)
+                frames = [frame] if tick > self.__last_tick else []
+
+            if not frames:
+                return True
+
+            self.__last_tick = tick
+            self.__frames.extend(frames)
+            self.__bytes += sum(len(frame) for frame in frames)
+
+            if len(self.__frames) > self.high_water:
+                # Conflação: descarta os frames pendentes e mantém apenas o estado atual completo
+                self.dropped_frames += len(self.__frames)
+                self.conflations += 1
+
+                self.__last_tick, keyframe = self.__full_state(broadcaster)
+                self.__frames.clear()
+                self.__frames.append(keyframe)
+                self.__bytes = len(keyframe)
+                self.__conflated = True
+
+                if self.__behind_since is None:
+                    self.__behind_since = now
+
+            self.max_depth = max(self.max_depth, len(self.__frames))
+            self.__condition.notify()
+
+            return self.__behind_since is None or now - self.__behind_since <= self.slow_client_timeout
+
+    def __full_state(self, broadcaster) -> tuple[int, bytes]:
+        """
+            Returns:
+                tuple[int, bytes]: O tick atual e o frame com o estado completo, no formato do cliente.
+        """
+        if self.legacy:
+            return broadcaster.legacy_frame()
+
+        return broadcaster.keyframe(self.compressed)
+
+    def take(self, timeout: float | None = 0) -> list[bytes]:
+        """
+            Retira todos os frames pendentes, na ordem.
+
+            Args:
+                timeout (float, optional): Tempo máximo de espera por frames, em segundos
+                    (0 retorna imediatamente; None espera indefinidamente).
+
+            Returns:
+                list[bytes]: Os frames pendentes (vazia se nada chegou no tempo ou se a fila foi fechada).
+        """
+        with self.__condition:
+            if timeout != 0:
+                self.__condition.wait_for(lambda: self.__frames or self.closed, timeout)
+
+            frames = list(self.__frames)
+            self.__frames.clear()
+
+            if frames:
+                self.sent_frames += len(frames)
+                self.sent_bytes += self.__bytes
+                self.__bytes = 0
+                self.sent_tick = self.__last_tick
+
+                # Fila esvaziada sem conflação desde a retirada anterior: o cliente alcançou o estado atual
+                if not self.__conflated:
+                    self.__behind_since = None
+                self.__conflated = False
+
+            return frames
+
+    def count_datagrams(self, datagrams: list):
+        """
+            Contabiliza nas estatísticas os datagramas enviados por UDP, fora da fila.
+
+            Args:
+                datagrams (list): Os payloads enviados.
+        """
+        with self.__condition:
+            self.sent_frames += len(datagrams)
+            self.sent_bytes += sum(len(datagram) for datagram in datagrams)
+
+    def close(self):
+        """
+            Fecha a fila, acordando quem estiver esperando em `take`.
+        """
+        with self.__condition:
+            self.closed = True
+            self.__frames.clear()
+            self.__bytes = 0
+            self.__condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+            Returns:
+                dict: 'depth' (frames pendentes), 'depth_bytes', 'max_depth', 'sent_frames', 'sent_bytes',
+                'conflations' e 'dropped_frames'.
+        """
+        with self.__condition:
+            return {
+                'depth': len(self.__frames),
+                'depth_bytes': self.__bytes,
+                'max_depth': self.max_depth,
+                'sent_frames': self.sent_frames,
+                'sent_bytes': self.sent_bytes,
+                'conflations': self.conflations,
+                'dropped_frames': self.dropped_frames,
+            }
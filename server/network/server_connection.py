@@ -1,21 +1,43 @@
 import time
-import pickle
 import socket
-import struct
 import threading 
-from common.game_state import GameState            
-from common.enums import EntityType, PlayerAction 
-
-from ..pacman import PacmanIA
+from common.enums import PlayerAction 
+from common import protocol
+from common.protocol import ProtocolError
+
+from ..room import Room
+from ..instrumented_lock import InstrumentedLock
+from ..metrics import LOG_INTERVAL, Metrics, MetricsServer
+from ..recorder import ReplayStore
+from .send_queue import SendQueue
+from .broadcast import report as broadcast_report
+from .udp_state import MAX_DATAGRAM, UdpSessions, state_datagrams
+from . import handshake, legacy
 
 class ServerSocket:
     """
         Define o servidor para conexões de socket TCP/IP.
 
         Gerencia o loop de aceitação de clientes, a comunicação thread-safe
-        com os clientes e a lógica de jogo (PacmanIA, GameState).
+        com os clientes e a lógica de jogo (Room).
+
+        Mantém uma única partida: a sala pedida pelo cliente é ignorada e todos
+        entram na sala ROOM_ID. Para várias salas, use o AsyncServerSocket.
+
+        Cada conexão começa com o handshake (HELLO), que define o formato do estado enviado ao
+        cliente (ver `handshake`); clientes antigos, sem HELLO, recebem o formato antigo (ver `legacy`).
+        Clientes que pedem UDP no HELLO recebem o estado por datagramas na mesma porta (ver `udp_state`).
+
+        Com `metrics_port`, as métricas do servidor são expostas em um endpoint HTTP local (ver `server.metrics`).
+        Com `replay_dir`, cada partida é gravada em um arquivo de replay nessa pasta (ver `server.recorder`).
     """
-    def __init__(self, server_ip:str, server_port:int, timeout: float = None):
+    ROOM_ID = 1
+    LOCK_REPORT_INTERVAL = 30.0 # Intervalo entre relatórios de espera/posse do lock e do broadcast
+
+    def __init__(self, server_ip:str, server_port:int, timeout: float = None,
+                 send_high_water: int = SendQueue.HIGH_WATER, slow_client_timeout: float = SendQueue.SLOW_CLIENT_TIMEOUT,
+                 compression: bool = True, metrics_port: int | None = None, metrics_interval: float | None = LOG_INTERVAL,
+                 replay_dir: str | None = None):
         """
             Inicializa o ServerSocket.
 
@@ -23,31 +45,49 @@ class ServerSocket:
                 server_ip (str): O endereço IP para o servidor escutar.
                 server_port (int): A porta TCP para o servidor escutar.
                 timeout (float, optional): Timeout para operações de socket. Padrão é None.
+                send_high_water (int, optional): Frames pendentes por cliente antes da conflação (ver `SendQueue`).
+                slow_client_timeout (float, optional): Segundos que um cliente pode ficar atrasado antes de ser desconectado.
+                compression (bool, optional): Se os snapshots são comprimidos para os clientes que pedirem. Padrão é True.
+                metrics_port (int, optional): Porta do endpoint de métricas. Padrão é None (métricas desativadas).
+                metrics_interval (float, optional): Segundos entre os resumos das métricas no terminal.
+                replay_dir (str, optional): Pasta dos replays das partidas. Padrão é None (gravação desativada).
         """
         self.ip = server_ip
         self.port = server_port
         self.timeout = timeout
+        self.send_high_water = send_high_water
+        self.slow_client_timeout = slow_client_timeout
+        self.compression = compression
 
-        self.game_state = GameState()
-        self.pacman_ai = PacmanIA()
-        self.pacman_running = False
+        # Métricas (None se desativadas)
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.metrics = Metrics() if metrics_port is not None else None
+
+        # Gravação das partidas (None se desativada)
+        self.replays = ReplayStore(replay_dir) if replay_dir else None
+
+        # Partida única: Pac-Man, fantasmas, timers e broadcast avançam no passo fixo da sala
+        self.room = Room(self.ROOM_ID, compression, self.metrics, self.replays)
 
         # Flags para controlar thread de update do jogo
         self.game_running = True
         self.game_update_thread = None
 
         self.server_socket = None
-        self.clients = {}
 
-        # Sincronização: Lock para acesso thread-safe aos recursos compartilhados
-        self.lock = threading.Lock()
+        # Transporte opcional do estado por UDP
+        self.udp_sessions = UdpSessions()
+        self.udp_socket = None
+        self.udp_port = 0
 
-        self.available_ghosts = [
-            EntityType.BLINKY,
-            EntityType.INKY,
-            EntityType.PINKY,
-            EntityType.CLYDE
-        ]
+        # Contexto de cada cliente conectado (socket -> contexto com a fila de saída)
+        self.client_contexts = {}
+
+        # Sincronização: Lock para acesso thread-safe ao estado da sala. Cobre apenas as alterações
+        # (passos da simulação, entrada e saída de clientes e ações); as threads de envio leem o
+        # estado publicado pelo broadcaster sem lock
+        self.lock = InstrumentedLock("ServerSocket.lock")
     
     def start(self):
         """
@@ -69,6 +109,11 @@ class ServerSocket:
         except:
             return print("\nNão foi possível iniciar o servidor!\n")
 
+        self.__open_udp()
+
+        if self.metrics is not None:
+            MetricsServer(self.metrics_sample, self.metrics_port, self.metrics_interval).start()
+
         try:
             # Inicia thread de atualização do jogo (game_state)
             self.game_update_thread = threading.Thread(target=self.__game_update_loop)
@@ -88,25 +133,71 @@ class ServerSocket:
         finally:
             self.__shutdown() # Método de desligamento
 
+    def __open_udp(self):
+        """
+            Abre o socket UDP do estado do jogo e inicia a thread que recebe os datagramas dos clientes.
+            Se não for possível, os clientes que pedirem UDP continuam recebendo o estado pelo TCP.
+        """
+        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        try:
+            udp_socket.bind((self.ip, self.port))
+        except OSError as e:
+            udp_socket.close()
+            return print(f"Não foi possível abrir o socket UDP ({e}). Estado enviado apenas por TCP")
+
+        self.udp_socket = udp_socket
+        self.udp_port = udp_socket.getsockname()[1]
+
+        udp_receiver = threading.Thread(target=self.__udp_receive_loop)
+        udp_receiver.daemon = True
+        udp_receiver.start()
+
+    def __udp_receive_loop(self):
+        """
+            Thread que recebe os datagramas dos clientes (UDP_HELLO), registrando o endereço de cada sessão.
+        """
+        while self.game_running:
+            try:
+                data, addr = self.udp_socket.recvfrom(MAX_DATAGRAM + 1)
+            except OSError:
+                # Socket fechado no desligamento
+                return
+
+            self.udp_sessions.handle_datagram(data, addr)
+
     def __game_update_loop(self):
         """
             Thread dedicada à atualização contínua do estado do jogo.
             Responsável por manter a lógica do jogo funcionando independentemente das operações de rede.
+
+            É a única thread que move as entidades: executa os passos pendentes da sala
+            (Pac-Man, fantasmas, timers e colisões) e captura o estado com o lock, e codifica
+            e publica o estado fora dele. Periodicamente exibe as estatísticas do lock e do broadcast.
         """
-        # Intervalo entre atualizações em segundos
-        UPDATE_INTERVAL = 0.05
-        
+        last_report = time.monotonic()
+
         # Loop principal de atualização do jogo
         while self.game_running:
             with self.lock:
+                snapshots = self.room.advance(time.monotonic())
+
+            # Codificação e troca atômica da publicação, sem bloquear as demais threads
+            for snapshot in snapshots:
+                self.room.publish(snapshot)
 
-                # Executa uma atualização completa do estado do jogo
-                self.game_state.update()
+            now = time.monotonic()
 
-                if self.game_state.restart_game_timer == 0:
-                    self.game_state.reset()
-               
-            time.sleep(UPDATE_INTERVAL)
+            if snapshots:
+                self.__fill_send_queues(now)
+
+            if now - last_report >= self.LOCK_REPORT_INTERVAL:
+                print(self.lock.report())
+                print(broadcast_report(self.room.broadcaster.stats()))
+                self.lock.reset()
+                last_report = now
+
+            time.sleep(self.room.scheduler.delay(time.monotonic()))
 
     def __shutdown(self):
         """
@@ -123,80 +214,69 @@ class ServerSocket:
             if self.server_socket:
                 self.server_socket.close()
 
+            if self.udp_socket:
+                self.udp_socket.close()
+
+        if self.replays is not None:
+            self.replays.close()
+
         print("Servidor desligado com sucesso")
 
     def __receive_all(self, client_socket, num_bytes:int) -> bytes | None:
         """
             Método auxiliar para garantir que todos os bytes solicitados sejam lidos do socket.
 
-            Define um timeout temporário de 1.0s para evitar bloqueio infinito.
+            A leitura é bloqueante: a thread dorme no recv até a chegada de dados ou o fechamento
+            da conexão (inclusive pelo próprio servidor, com shutdown).
 
             Args:
                 client_socket (socket): O socket do qual receber os dados.
                 num_bytes (int): O número exato de bytes a serem lidos.
 
             Returns:
-                bytes | None: Os dados lidos, ou None se a conexão for fechada ou ocorrer timeout sem dados.
+                bytes | None: Os dados lidos, ou None se a conexão for fechada.
         """
         data = b""
-        client_socket.settimeout(1.0)
-        try:
-            while len(data) < num_bytes:
-                packet = client_socket.recv(num_bytes - len(data))
-                if not packet:
-                    # Conexão fechada
-                    return None
-                data += packet
-            return data
-        except socket.timeout:
-            # Retorna o que foi lido até o timeout
-            return data if data else None
-        finally:
-            client_socket.settimeout(None) # Remove timeout
+        while len(data) < num_bytes:
+            packet = client_socket.recv(num_bytes - len(data))
+            if not packet:
+                # Conexão fechada
+                return None
+            data += packet
+        return data
 
-    def __assign_ghost(self, client_socket):
+    def __fill_send_queues(self, now: float):
         """
-            Atribui um fantasma disponível ao cliente de forma thread-safe.
-
-            Se não houver fantasmas disponíveis, atribui como espectador (None).
+            Enfileira os frames novos na fila de saída de cada cliente, desconectando
+            os clientes que estão atrasados há tempo demais.
 
             Args:
-                client_socket (socket): O socket do cliente.
-
-            Returns:
-                EntityType | None: O tipo de fantasma atribuído ou None se for espectador.
+                now (float): Instante atual (time.monotonic()).
         """
-        assigned_ghost = None
-
-        with self.lock:
-            if self.available_ghosts:
-                assigned_ghost = self.available_ghosts.pop(0)
-                self.clients[client_socket] = assigned_ghost
+        for client_socket, client_context in list(self.client_contexts.items()):
+            queue = client_context['queue']
 
-                # TODO: Implementar a lógica para colocar entidade na matriz inicial aqui
-            else:
-                self.clients[client_socket] = None
+            # Clientes UDP recebem apenas o estado mais recente, sem fila
+            if client_context['udp'] or queue.offer(self.room.broadcaster, now):
+                continue
 
-        return assigned_ghost
-
-    def __move_pacman(self):
-        """
-            Thread de controle da inteligência artificial do Pac-Man.
-
-            O Pac-Man se move em intervalos de 0.2 segundos, usando a IA para atualizar sua posição na matriz de forma thread-safe.
-        """
-        while self.pacman_running:
+            print(f"Cliente {client_context['peer']} atrasado há mais de {queue.slow_client_timeout:.0f}s. Desconectando")
+            client_context['running'] = False
+            queue.close()
 
-            with self.lock:
-                self.pacman_ai.update(self.game_state)
-            
-            modifier = 0.012 * (4 - len(self.available_ghosts)) # 0.012 mais rapido para cada fantasma no jogo 
-            time.sleep(0.23 - modifier)
+            # Desbloqueia o sendall da thread de envio e a leitura de handle_client
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
     def __game_state_sending(self, client_socket, client_context):
         """
             Thread de envio contínuo do estado atual do jogo para o cliente.
 
+            Envia os frames da fila de saída do cliente, preenchida pela thread de atualização,
+            ou os datagramas de estado, se o cliente recebe o estado por UDP.
+
             Args:
                 client_socket (socket): O socket do cliente para o qual enviar dados.
 
@@ -204,15 +284,16 @@ class ServerSocket:
                 ConnectionResetError, BrokenPipeError: Capturadas para encerrar
                 a thread de envio quando o cliente desconecta abruptamente.
         """
-        COOLDOWN = 0.05
-
         isConected = True
 
-        while isConected:
+        while isConected and client_context['running']:
 
             try:
-                self.send_game_state(client_socket)
-                time.sleep(COOLDOWN)
+                # Aguarda os frames do próximo passo da sala
+                if client_context['udp']:
+                    self.send_state_datagrams(client_context, timeout=1.0)
+                else:
+                    self.send_game_state(client_socket, client_context, timeout=1.0)
             except (ConnectionResetError, BrokenPipeError) as e:
                 # O cliente fechou a conexão de forma inesperada.
                 isConected = False
@@ -227,83 +308,14 @@ class ServerSocket:
             if not isConected:
                 client_context['running'] = False
 
-    def __ghost_movement(self, assigned_ghost, client_context):
-        """
-            Executa o loop de movimento contínuo para o fantasma de um cliente.
-
-            Esta função verifica periodicamente a última direção solicitada pelo cliente (`current_action`)
-            e aplica o movimento na matriz do jogo. O movimento persiste na mesma direção até que:
-            1. O cliente envie uma nova direção.
-            2. O fantasma encontre um obstáculo, momento em que a ação é resetada para None.
-
-            O acesso ao estado do jogo (`self.game_state`) é protegido por `self.lock` para garantir
-            a integridade dos dados em ambiente multithread.
-
-            Args:
-                assigned_ghost (EntityType): O tipo de fantasma (BLINKY, PINKY, etc.) controlado.
-                client_context (dict): Dicionário compartilhado para sincronização entre a thread de recebimento
-                                    e esta thread de movimento. Deve conter:
-                                    - 'running' (bool): Controle de execução do loop.
-                                    - 'current_action' (PlayerAction | None): A direção atual do movimento.
-        """
-        movement_map = { # Mapeamento de ações para deltas (x, y)
-            PlayerAction.UP: (0, -1),
-            PlayerAction.RIGHT: (1, 0),
-            PlayerAction.DOWN: (0, 1),
-            PlayerAction.LEFT: (-1, 0),
-        }
-
-        MOVE_INTERVAL = 0.2
-
-        while client_context['running']:
-            current_action = client_context['current_action']
-            next_action = client_context['next_action']
-
-            move_performed = False
-
-            with self.lock:
-                pos = self.game_state.matrix.get_entity_position(assigned_ghost)
-
-                if not pos:
-                    time.sleep(MOVE_INTERVAL)
-                    continue
-
-                cx, cy = pos
-
-                # Curva
-                if next_action and next_action in movement_map:
-                    dx, dy = movement_map[next_action]
-                    nx, ny = cx + dx, cy + dy
-
-                    if self.game_state.matrix.is_valid_position(nx, ny):
-                        # Executa a curva e atualiza a direção atual
-                        self.game_state.matrix.move_entity(assigned_ghost, dx, dy)
-                        client_context['current_action'] = next_action
-                        client_context['next_action'] = None
-                        move_performed = True
-                    else:
-                        # Falha: é parede
-                        client_context['next_action'] = None
-
-                # Mantém movimento atual
-                if not move_performed and current_action and current_action in movement_map:
-                    dx, dy = movement_map[current_action]
-                    nx, ny = cx + dx, cy + dy
-
-                    if self.game_state.matrix.is_valid_position(nx, ny):
-                        # Continua na direção corrente
-                        self.game_state.matrix.move_entity(assigned_ghost, dx, dy)
-                    else:
-                        client_context['current_action'] = None
-            time.sleep(MOVE_INTERVAL)
-
     def handle_client(self, client_socket):
         """
             Lida com a comunicação e lógica de jogo para um cliente específico.
 
             Este método roda em uma thread separada e é responsável por:
-            1. Atribuir o fantasma.
-            2. Iniciar threads de envio de estado de jogo e movimento do Pac-Man (se aplicável).
+            1. Receber o HELLO (ou detectar um cliente antigo), negociar o formato do estado, atribuir
+               o fantasma e, se pedido, abrir a sessão UDP.
+            2. Iniciar a thread de envio de estado de jogo.
             3. Loop principal de recebimento de comandos do jogador (PlayerAction).
             4. Tratar desconexões abruptas (`ConnectionResetError`, `BrokenPipeError`).
 
@@ -315,120 +327,236 @@ class ServerSocket:
                 para sinalizar desconexão abrupta e iniciar a remoção formal.
                 Exception: Capturada para erros inesperados na comunicação.
         """
-        assigned_ghost = self.__assign_ghost(client_socket)
+        try:
+            hello = handshake.receive_hello(client_socket)
+        except protocol.VersionMismatch as e:
+            print(f"Cliente recusado: {e}")
+            self.reject(client_socket, protocol.REJECT_VERSION)
+            return
+        except Exception as e:
+            print(f"Cliente não enviou um HELLO válido ({e}). Encerrando conexão")
+            client_socket.close()
+            return
+
+        session = handshake.negotiate(hello, Room.TICK_RATE, self.compression, self.udp_socket is not None)
+
+        with self.lock:
+            assigned_ghost = self.room.assign_ghost(client_socket, session['spectator'])
 
-        # Envia atribuição de fantasma (ou espectador)
+        peer = client_socket.getpeername()
+        print(f"Cliente {session['name']} {peer}: {handshake.describe(session, Room.TICK_RATE)}")
+
+        # Envia o formato negociado e a atribuição de fantasma (ou espectador)
         try:
-            self.send_data(client_socket, assigned_ghost)
+            client_socket.sendall(handshake.greeting(session, Room.TICK_RATE, assigned_ghost, self.ROOM_ID))
         except Exception as e:
             print(f"Erro ao enviar atribuição para cliente: {e}")
             self.remove_client(client_socket)
             return
 
-        # Thread que inicia o PacMan
-        if assigned_ghost and not self.pacman_running:
-            self.pacman_running = True
-            pacman_mover = threading.Thread(target=self.__move_pacman)
-            pacman_mover.daemon = True # Usado para desligamento rápido
-            pacman_mover.start()
-
         client_context = {
-            'running': True,          # Controla o loop da thread de movimento
-            'current_action': None,    # Direção que o fantasma está
-            'next_action': None       # Próxima direção solicitada pelo cliente
+            'running': True,                # Controla os loops de envio e recebimento
+            'peer': peer,
+            'name': session['name'],        # Identificação enviada pelo cliente no HELLO
+            'queue': SendQueue(self.send_high_water, self.slow_client_timeout, session['compressed'],
+                               session['deltas'], session['legacy'], session['interval']),
+            'ghost': assigned_ghost,
+            'acked': None,                  # Sequência da última entrada confirmada ao cliente
+            'legacy': session['legacy'],    # Se o cliente usa o protocolo antigo (pickle)
+            'udp': False                    # Se o estado é enviado por UDP
         }
 
+        if session['udp_requested']:
+            # Porta 0 indica ao cliente que o UDP não está disponível e o estado segue pelo TCP
+            token = self.udp_sessions.open(client_context) if session['udp'] else 0
+            client_context['udp'] = session['udp']
+
+            try:
+                self.send_data(client_socket, protocol.encode_udp_token(token, self.udp_port))
+            except Exception as e:
+                print(f"Erro ao enviar o token UDP para cliente: {e}")
+                self.udp_sessions.close(client_context)
+                self.remove_client(client_socket)
+                return
+
+        with self.lock:
+            self.client_contexts[client_socket] = client_context
+
         # Thread que envia o estado do jogo constantemente
         game_state_sender = threading.Thread(target=self.__game_state_sending, args=(client_socket, client_context))
         game_state_sender.daemon = True # Usado para desligamento rápido
         game_state_sender.start()
 
-        # Se o cliente controla um fantasma, inicia a thread de movimento dele
-        if assigned_ghost:
-            ghost_mover = threading.Thread(target=self.__ghost_movement, args=(assigned_ghost, client_context))
-            ghost_mover.daemon = True
-            ghost_mover.start()
-
         # Loop de controle de movimento e envio de estado
         while client_context['running']:
             try:
-                # Recebe a entrada do cliente (movimentação)
-                client_input_data: PlayerAction = self.receive_data(client_socket)
+                # Recebe a entrada do cliente (movimentação), bloqueando até a chegada
+                client_input_data = self.receive_data(client_socket, client_context['legacy'])
 
-                if assigned_ghost and client_input_data:
-                    #print(f"Fantasma {assigned_ghost.name} solicitou direção: {client_input_data.name}")
-                    # Armazena a nova direção solicitada, mas não a executa imediatamente 
-                    client_context['next_action'] = client_input_data
+                if client_input_data is None:
+                    raise ConnectionResetError("Conexão fechada pelo cliente.")
 
-                # Pausa para não consumir 100% da CPU
-                time.sleep(0.01)
+                if assigned_ghost:
+                    # Enfileira a nova direção solicitada, aplicada pela simulação na ordem de chegada
+                    with self.lock:
+                        self.room.queue_input(assigned_ghost, *client_input_data)
 
             except (ConnectionResetError, BrokenPipeError): 
                 print("Cliente desconectado. Encerrando handle_client")
+                client_context['running'] = False
             except Exception as e:
                 print(f"Erro na comunicação com o cliente: {e},\n Encerrando handle_client")
+                client_context['running'] = False
     
         self.remove_client(client_socket)
             
-    def send_game_state(self, client_socket):
+    def send_game_state(self, client_socket, client_context: dict, timeout: float | None = 0) -> int:
         """
-            Serializa o game_state usando pickle e envia para o cliente.
+            Envia para o cliente os frames pendentes na sua fila de saída.
+
+            Um cliente novo recebe um keyframe com o estado completo; os demais recebem os deltas
+            de cada tick (ou um keyframe após uma conflação). Os frames já estão serializados e
+            empacotados, sendo os mesmos buffers compartilhados entre todos os clientes.
+            Após o frame do tick em que a última entrada do cliente foi aplicada, é enviada a
+            confirmação (ACK) dessa entrada.
             
-            Protocolo: [4 bytes (tamanho do payload)] + [payload (game_state serializado)]
+            Protocolo: [4 bytes (tamanho do payload)] + [payload (keyframe, delta ou ACK)]
 
             Args:
                 client_socket (socket): O socket do cliente de destino.
+                client_context (dict): O contexto do cliente, com a fila de saída.
+                timeout (float, optional): Tempo máximo de espera por frames, em segundos. Padrão é 0.
+
+            Returns:
+                int: A quantidade de frames enviados.
 
             Raises:
-                Exception: Propaga exceções de conexão ou struct.pack/pickle.
+                Exception: Propaga exceções de conexão.
         """
-        with self.lock:
-            # Serializa o objeto GameState completo para incluir as entidades
-            payload = pickle.dumps(self.game_state)
-        
-        self.send_data(client_socket, payload)
+        queue = client_context['queue']
+        frames = queue.take(timeout)
+
+        ack = self.room.ack_for(client_context['ghost'], client_context['acked'], queue.sent_tick)
+        if ack is not None and not client_context['legacy']:
+            frames.append(protocol.frame(protocol.encode_ack(*ack)))
+            client_context['acked'] = ack[0]
+
+        if frames:
+            client_socket.sendall(b"".join(frames))
+
+        return len(frames)
+
+    def send_state_datagrams(self, client_context: dict, timeout: float | None = None) -> int:
+        """
+            Envia por UDP o keyframe do tick atual e a confirmação (ACK) da última entrada, assim que
+            houver um tick ainda não enviado ao cliente. Enquanto o endereço UDP do cliente não for
+            conhecido (UDP_HELLO), apenas aguarda o próximo tick.
+
+            Args:
+                client_context (dict): O contexto do cliente, com a sessão UDP aberta.
+                timeout (float, optional): Tempo máximo de espera por um tick novo, em segundos.
+
+            Returns:
+                int: A quantidade de datagramas enviados.
+
+            Raises:
+                socket.error: Se ocorrer um erro no envio.
+        """
+        broadcaster = self.room.broadcaster
+        addr = client_context['udp_addr']
+
+        if addr is None:
+            broadcaster.wait_for_tick(broadcaster.latest_tick(), timeout)
+            return 0
+
+        # Aguarda o próximo envio, conforme a taxa negociada
+        if not broadcaster.wait_for_tick(client_context['udp_tick'] + client_context['queue'].interval - 1, timeout):
+            return 0
+
+        datagrams = state_datagrams(self.room, client_context)
+
+        for datagram in datagrams:
+            self.udp_socket.sendto(datagram, addr)
+
+        return len(datagrams)
     
-    def send_data(self, client_socket, data):
+    def send_data(self, client_socket, payload: bytes):
         """
-            Empacota e envia os dados (GameState ou EntityType) com o prefixo de 4 bytes do tamanho.
+            Empacota e envia um payload já codificado (ver `common.protocol`) com o prefixo de 4 bytes do tamanho.
 
             Args:
                 client_socket (socket): O socket do cliente de destino.
-                data (any | bytes | None): Os dados a serem serializados e enviados. Pode ser um objeto (serializado via pickle) ou bytes (para dados já serializados).
+                payload (bytes): O payload codificado.
 
             Raises:
                 socket.error: Se ocorrer um erro de conexão durante `sendall`.
         """
-        if data is None:
-            payload = pickle.dumps(None)
-        elif isinstance(data, bytes):
-            payload = data
-        else:
-            payload = pickle.dumps(data)
-        
-        size = struct.pack("!I", len(payload))
+        client_socket.sendall(protocol.frame(payload))
+
+    def reject(self, client_socket, reason: int):
+        """
+            Envia a recusa da conexão (REJECT) e fecha o socket.
 
-        client_socket.sendall(size + payload)
+            Args:
+                client_socket (socket): O socket do cliente.
+                reason (int): O motivo (protocol.REJECT_*).
+        """
+        try:
+            self.send_data(client_socket, protocol.encode_reject(reason))
+        except OSError:
+            pass
+
+        client_socket.close()
+
+    def receive_data(self, client_socket, legacy_client: bool = False) -> tuple[PlayerAction, int, int] | None:
+        """
+            Recebe uma ação do jogador (PlayerAction), com a sua sequência e o instante do cliente.
+
+            Args:
+                client_socket (socket): O socket do qual receber os dados.
+                legacy_client (bool, optional): Se o cliente usa o protocolo antigo (pickle, sem sequência).
+
+            Returns:
+                tuple[PlayerAction, int, int] | None: A ação, a sequência e o instante do cliente (ms),
+                ou None se a conexão for fechada.
+
+            Raises:
+                ConnectionResetError: Se a conexão for interrompida, o payload for inválido
+                ou a mensagem não for uma ação.
+        """
+        message = self.receive_message(client_socket, legacy.decode_input if legacy_client else protocol.decode)
+
+        if message is None:
+            return None
 
-    def receive_data(self,client_socket) -> PlayerAction | None:
+        msg_type, data = message
+
+        if msg_type != protocol.MSG_INPUT:
+            raise ConnectionResetError(f"Mensagem inesperada do cliente: {msg_type}")
+
+        return data
+
+    def receive_message(self, client_socket, decode=protocol.decode) -> tuple[int, object] | None:
         """
-            Recebe e deserializa uma mensagem (PlayerAction) do cliente, lidando com o 
+            Recebe e decodifica uma mensagem do cliente, lidando com o 
             protocolo de cabeçalho (tamanho).
 
-            Protocolo: [4 bytes Big-Endian Size] + [Payload (pickle-dumps de PlayerAction)]
+            Protocolo: [4 bytes Big-Endian Size] + [Payload (mensagem de `common.protocol`)]
 
             Args:
                 client_socket (socket): O socket do qual receber os dados.
+                decode (callable, optional): A função de decodificação do payload. Padrão é `protocol.decode`.
 
             Returns:
-                PlayerAction | None: A ação do jogador deserializada, ou None se a conexão for fechada 
+                tuple[int, object] | None: O tipo da mensagem e seu conteúdo, ou None se a conexão for fechada 
                 ou o cliente enviar um payload de tamanho zero.
 
             Raises:
+                VersionMismatch: Se o payload usar outra versão do protocolo.
                 ConnectionResetError: Se a conexão for interrompida, o cabeçalho for inválido, 
-                ou ocorrer erro na deserialização (pickle).
+                ou ocorrer erro na decodificação.
         """
-        HEADER_SIZE = 4 # Tamanho do cabeçalho de empacotamento (em bytes)
+        HEADER_SIZE = protocol.HEADER.size # Tamanho do cabeçalho de empacotamento (em bytes)
 
         # Tenta receber o cabeçalho (tamanho)
         header = self.__receive_all(client_socket, HEADER_SIZE)
@@ -443,25 +571,70 @@ class ServerSocket:
             
         try:
             # Desempacota o tamanho
-            size = struct.unpack("!I", header)[0]
+            size = protocol.HEADER.unpack(header)[0]
 
             # Se tamanho igual a zero (cliente enviou None ou um objeto vazio), retorna None
             if size == 0:
                 return None
 
+            # Mensagens de clientes são pequenas; recusa tamanhos abusivos
+            if size > protocol.MAX_CLIENT_PAYLOAD:
+                raise ProtocolError(f"Payload muito grande: {size} bytes")
+
             # Recebe o payload completo
             payload = self.__receive_all(client_socket, size)
 
             if not payload or len(payload) != size:
                 raise ConnectionResetError("Conexão interrompida ou payload incompleto.")
 
-            # Deserializa o payload (PlayerAction)
-            data = pickle.loads(payload)
-            return data
+            # Decodifica o payload
+            return decode(payload)
+        except protocol.VersionMismatch:
+            raise
         except Exception as e:
             # Erro de desempacotamento/deserialização
             raise ConnectionResetError(f"Erro ao receber ou processar dados do cliente: {e}")
 
+    def metrics_sample(self) -> dict:
+        """
+            Returns:
+                dict: A amostra atual das métricas (ver `server.metrics`).
+        """
+        clients = self.client_stats()
+
+        return {
+            **self.metrics.sample(),
+            'rooms': 1,
+            'clients': len(clients),
+            'broadcast': self.room.broadcaster.stats(),
+            'clients_sent': clients,
+            'locks': [self.lock.totals()],
+        }
+
+    def client_stats(self) -> list[dict]:
+        """
+            Retorna as estatísticas de envio de cada cliente conectado.
+
+            Returns:
+                list[dict]: Por cliente: 'peer', 'name', 'room', 'ghost' e as estatísticas da fila de saída (ver `SendQueue.stats`).
+        """
+        with self.lock:
+            clients = [
+                (client_context, self.room.clients.get(client_socket))
+                for client_socket, client_context in self.client_contexts.items()
+            ]
+
+        return [
+            {
+                'peer': client_context['peer'],
+                'name': client_context['name'],
+                'room': self.ROOM_ID,
+                'ghost': ghost.name if ghost else None,
+                **client_context['queue'].stats()
+            }
+            for client_context, ghost in clients
+        ]
+
     def remove_client(self, client_socket):
         """
             Remove o cliente da lista de ativos, libera o fantasma atribuído (se houver)
@@ -471,18 +644,14 @@ class ServerSocket:
                 client_socket (socket): O socket do cliente a ser removido.
         """
         with self.lock:
-            if client_socket in self.clients:
-                assigned_ghost = self.clients.pop(client_socket)
+            client_context = self.client_contexts.pop(client_socket, None)
+            if client_context is not None:
+                client_context['queue'].close()
+                self.udp_sessions.close(client_context)
 
-                if assigned_ghost is not None:
-                    # Libera o fanstasma para outros jogadores
-                    #self.available_ghosts.append(assigned_ghost)
-                    self.available_ghosts.insert(0, assigned_ghost)
-                    # TODO: Implementar a lógica para remover a entidade da matriz ou movê-la
+            if client_socket in self.room.clients:
+                # Libera o fanstasma para outros jogadores (e reinicia a partida se não restar nenhum)
+                self.room.remove_client(client_socket)
 
                 client_socket.close()
-                print("Cliente removido e fantasma liberado.\n")
-
-                if len(self.available_ghosts) == 4:
-                    self.game_state.reset()
-                    self.pacman_running = False
\ No newline at end of file
+                print("Cliente removido e fantasma liberado.\n")
\ No newline at end of file
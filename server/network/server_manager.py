@@ -1,6 +1,10 @@
 import os
 import json
 from .server_connection import ServerSocket
+from .async_server_connection import AsyncServerSocket
+from .sharded_server import ShardedServer
+from .send_queue import SendQueue
+from ..metrics import LOG_INTERVAL
 
 class ServerManager:
     """
@@ -14,14 +18,51 @@ class ServerManager:
         """
             Inicializa o ServerManager.
 
-            Carrega as configurações de IP, porta e timeout e cria a instância de ServerSocket.
+            Carrega as configurações de IP, porta, timeout e modo de execução e cria a instância do servidor.
+
+            Modos suportados (chave "mode" da seção "network"):
+                - "threaded": ServerSocket, com threads por cliente (padrão).
+                - "asyncio": AsyncServerSocket, com todas as tarefas em um único event loop
+                  e várias salas (até "max_rooms") no mesmo processo.
+                - "sharded": ShardedServer, com as salas distribuídas entre "workers" processos
+                  (até "max_rooms" salas em cada um; sem "workers", um processo por CPU).
+
+            Em todos os modos, "send_high_water" e "slow_client_timeout" configuram a fila de saída
+            de cada cliente (ver `SendQueue`), e "compression" permite comprimir os snapshots para os
+            clientes que pedirem (ver `common.compression`). Com "metrics_port", as métricas são expostas
+            em http://127.0.0.1:<metrics_port>/metrics e resumidas no terminal a cada "metrics_interval"
+            segundos (ver `server.metrics`). Com "replay_dir", cada partida é gravada em um arquivo de
+            replay nessa pasta (ver `server.recorder`).
+
+            Raises:
+                RuntimeError: Se o modo configurado não for reconhecido.
         """
         settings = self.__load_settings()
         self.ip = settings["network"]["ip"]
         self.port = settings["network"]["port"]
         self.timeout = settings["network"]["timeout"]
+        self.mode = settings["network"].get("mode", "threaded")
+        self.max_rooms = settings["network"].get("max_rooms", 256)
+        self.workers = settings["network"].get("workers")
+
+        # Fila de saída de cada cliente (ver `SendQueue`), compressão dos snapshots, métricas e replays
+        send_options = {
+            'send_high_water': settings["network"].get("send_high_water", SendQueue.HIGH_WATER),
+            'slow_client_timeout': settings["network"].get("slow_client_timeout", SendQueue.SLOW_CLIENT_TIMEOUT),
+            'compression': settings["network"].get("compression", True),
+            'metrics_port': settings["network"].get("metrics_port"),
+            'metrics_interval': settings["network"].get("metrics_interval", LOG_INTERVAL),
+            'replay_dir': settings["network"].get("replay_dir"),
+        }
 
-        self.conn = ServerSocket(self.ip, self.port, self.timeout)
+        if self.mode == "threaded":
+            self.conn = ServerSocket(self.ip, self.port, self.timeout, **send_options)
+        elif self.mode == "asyncio":
+            self.conn = AsyncServerSocket(self.ip, self.port, self.timeout, self.max_rooms, **send_options)
+        elif self.mode == "sharded":
+            self.conn = ShardedServer(self.ip, self.port, self.timeout, self.max_rooms, self.workers, **send_options)
+        else:
+            raise RuntimeError(f"Modo de servidor desconhecido: {self.mode} (use threaded, asyncio ou sharded)")
 
     def __load_settings(self):
         """
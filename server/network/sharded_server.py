@@ -0,0 +1,419 @@
+import time
+import signal
+import socket
+import asyncio
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from multiprocessing.reduction import send_handle, recv_handle
+
+from common import protocol
+
+from ..room import Lobby
+from .. import metrics
+from . import handshake
+from .async_server_connection import AsyncServerSocket
+from .send_queue import SendQueue
+from .broadcast import report as broadcast_report
+
+class ShardWorker(AsyncServerSocket):
+    """
+        Processo de trabalho do servidor com shards.
+
+        Executa um AsyncServerSocket com o seu próprio conjunto de salas, mas em vez de abrir um
+        socket de escuta recebe as conexões já aceitas pelo supervisor através de um canal
+        (multiprocessing.Pipe), junto com a sala e as opções pedidas pelo cliente. Periodicamente
+        envia as suas estatísticas de carga pelo mesmo canal.
+
+        Cada worker abre o seu próprio socket UDP, em uma porta livre do mesmo endereço, para os
+        clientes que recebem o estado por UDP (a porta é informada ao cliente no UDP_TOKEN).
+    """
+    STATS_INTERVAL = 0.5    # Intervalo entre envios das estatísticas ao supervisor
+    REPORT_INTERVAL = None  # O relatório é exibido pelo supervisor
+
+    def __init__(self, index: int, count: int, channel, server_ip: str = None, **options):
+        """
+            Args:
+                index (int): Índice deste worker (shard).
+                count (int): Quantidade total de workers.
+                channel (multiprocessing.connection.Connection): Canal com o supervisor.
+                server_ip (str, optional): O endereço do servidor, usado pelo socket UDP do worker.
+                **options: Demais parâmetros do AsyncServerSocket (max_rooms, send_high_water, ...).
+        """
+        super().__init__(server_ip, 0, shard=(index, count), **options)
+        self.index = index
+        self.channel = channel
+
+    async def accept_connections(self):
+        """
+            Recebe as conexões repassadas pelo supervisor até o canal ser fechado.
+        """
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+
+        def on_readable():
+            try:
+                while self.channel.poll():
+                    hello = self.channel.recv()
+                    client = socket.socket(fileno=recv_handle(self.channel))
+                    asyncio.create_task(self.__adopt(client, hello))
+            except (EOFError, OSError):
+                if not closed.done():
+                    closed.set_result(None)
+
+        loop.add_reader(self.channel.fileno(), on_readable)
+        stats_task = asyncio.create_task(self.__report_stats(closed))
+
+        try:
+            await closed
+        finally:
+            loop.remove_reader(self.channel.fileno())
+            stats_task.cancel()
+
+    def start_metrics(self):
+        """
+            As métricas do worker seguem nas estatísticas enviadas ao supervisor, que as expõe.
+        """
+
+    async def __adopt(self, client: socket.socket, hello: tuple | None):
+        """
+            Assume uma conexão repassada pelo supervisor.
+
+            Args:
+                client (socket.socket): O socket do cliente (o HELLO já foi lido).
+                hello (tuple | None): O HELLO decodificado, ou None para clientes antigos.
+        """
+        try:
+            reader, writer = await asyncio.open_connection(sock=client)
+        except OSError as e:
+            print(f"Worker {self.index}: não foi possível assumir a conexão ({e})")
+            client.close()
+            return
+
+        await self.serve_client(reader, writer, hello)
+
+    async def __report_stats(self, closed):
+        """
+            Envia as estatísticas de carga ao supervisor a cada STATS_INTERVAL.
+        """
+        while True:
+            try:
+                self.channel.send(self.stats())
+            except (OSError, ValueError):
+                if not closed.done():
+                    closed.set_result(None)
+                return
+
+            await asyncio.sleep(self.STATS_INTERVAL)
+
+
+def _run_worker(index: int, count: int, channel, options: dict):
+    """
+        Ponto de entrada dos processos de trabalho.
+    """
+    # O desligamento é conduzido pelo supervisor (fechando o canal)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ShardWorker(index, count, channel, **options).start()
+
+
+class ShardedServer:
+    """
+        Supervisor do servidor com shards.
+
+        Um único processo CPython fica limitado a um núcleo pelo GIL, então as salas são distribuídas
+        entre vários processos de trabalho (ShardWorker), cada um com o seu event loop e o seu
+        conjunto de salas. O supervisor aceita as conexões, lê o HELLO (ver `protocol`) e repassa
+        o socket ao worker adequado, que conclui a negociação:
+            - sala pedida: o worker dono da sala (`Lobby.shard_of`);
+            - escolha automática: o worker menos carregado entre os que têm fantasmas livres,
+              ou o menos carregado de todos se nenhum tiver (também para clientes antigos, sem HELLO).
+
+        A carga de cada worker (salas, clientes e uso de CPU da simulação) é recebida periodicamente
+        e exibida pelo supervisor a cada REPORT_INTERVAL. Com as métricas ativas, o supervisor também
+        expõe a soma das métricas dos workers (ver `server.metrics`).
+    """
+    REPORT_INTERVAL = 10.0  # Intervalo entre exibições da carga dos workers
+
+    def __init__(self, server_ip: str, server_port: int, timeout: float = None,
+                 max_rooms: int = 256, workers: int | None = None, send_high_water: int = SendQueue.HIGH_WATER,
+                 slow_client_timeout: float = SendQueue.SLOW_CLIENT_TIMEOUT, compression: bool = True,
+                 metrics_port: int | None = None, metrics_interval: float | None = metrics.LOG_INTERVAL,
+                 replay_dir: str | None = None):
+        """
+            Inicializa o ShardedServer.
+
+            Args:
+                server_ip (str): O endereço IP para o servidor escutar.
+                server_port (int): A porta TCP para o servidor escutar.
+                timeout (float, optional): Timeout para operações de socket. Padrão é None.
+                max_rooms (int, optional): Quantidade máxima de salas em cada worker. Padrão é 256.
+                workers (int, optional): Quantidade de processos de trabalho. Padrão é o número de CPUs.
+                send_high_water (int, optional): Frames pendentes por cliente antes da conflação (ver `SendQueue`).
+                slow_client_timeout (float, optional): Segundos que um cliente pode ficar atrasado antes de ser desconectado.
+                compression (bool, optional): Se os snapshots são comprimidos para os clientes que pedirem. Padrão é True.
+                metrics_port (int, optional): Porta do endpoint de métricas. Padrão é None (métricas desativadas).
+                metrics_interval (float, optional): Segundos entre os resumos das métricas no terminal.
+                replay_dir (str, optional): Pasta dos replays das partidas, gravados pelos workers. Padrão é None.
+        """
+        self.ip = server_ip
+        self.port = server_port
+        self.timeout = timeout
+        self.max_rooms = max_rooms
+
+        # Parâmetros repassados ao AsyncServerSocket de cada worker
+        self.worker_options = {
+            'server_ip': server_ip,
+            'max_rooms': max_rooms,
+            'send_high_water': send_high_water,
+            'slow_client_timeout': slow_client_timeout,
+            'compression': compression,
+            'metrics_port': metrics_port,
+            'replay_dir': replay_dir,
+        }
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.worker_count = workers or multiprocessing.cpu_count()
+
+        # "spawn" evita que os workers herdem o socket de escuta e os canais dos outros workers
+        self.context = multiprocessing.get_context("spawn")
+
+        self.server_socket = None
+        self.running = True
+
+        self.processes = []
+        self.channels = []
+        self.channel_locks = []
+
+        # Última estatística recebida de cada worker (None se o worker não estiver ativo)
+        self.loads: list[dict | None] = [None] * self.worker_count
+
+        # Conexões repassadas desde a última estatística de cada worker
+        self.pending = [0] * self.worker_count
+
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+            Inicia os workers, o socket de escuta e o loop de aceitação de conexões.
+        """
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        try:
+            self.server_socket.bind((self.ip, self.port))
+            self.server_socket.listen()
+        except OSError:
+            return print("\nNão foi possível iniciar o servidor!\n")
+
+        try:
+            self.__start_workers()
+
+            threading.Thread(target=self.__collect_stats, daemon=True).start()
+            threading.Thread(target=self.__report_loop, daemon=True).start()
+
+            if self.metrics_port is not None:
+                metrics.MetricsServer(self.collect_metrics, self.metrics_port, self.metrics_interval).start()
+
+            while True:
+                client, addr = self.server_socket.accept()
+                print(f"Nova conexão de {addr}")
+
+                router = threading.Thread(target=self.route_client, args=(client,))
+                router.daemon = True
+                router.start()
+
+        except KeyboardInterrupt:
+            print("\nServidor encerrando por interrupção do usuário (Ctrl+C).")
+        finally:
+            self.__shutdown()
+
+    def __start_workers(self):
+        """
+            Cria os processos de trabalho e os canais de comunicação com cada um.
+        """
+        for index in range(self.worker_count):
+            parent_channel, child_channel = self.context.Pipe()
+
+            process = self.context.Process(
+                target=_run_worker,
+                args=(index, self.worker_count, child_channel, self.worker_options),
+                name=f"pacman-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_channel.close()
+
+            self.processes.append(process)
+            self.channels.append(parent_channel)
+            self.channel_locks.append(threading.Lock())
+
+        print(f"{self.worker_count} workers iniciados")
+
+    def __shutdown(self):
+        """
+            Fecha o socket de escuta e os canais, aguardando o encerramento dos workers.
+        """
+        self.running = False
+
+        if self.server_socket:
+            self.server_socket.close()
+
+        for channel in self.channels:
+            channel.close()
+
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+
+        print("Servidor desligado com sucesso")
+
+    def __collect_stats(self):
+        """
+            Thread que recebe as estatísticas enviadas pelos workers.
+        """
+        indexes = {channel: index for index, channel in enumerate(self.channels)}
+
+        while self.running and indexes:
+            for channel in wait(list(indexes), timeout=1.0):
+                index = indexes[channel]
+
+                try:
+                    stats = channel.recv()
+                except (EOFError, OSError):
+                    print(f"Worker {index} encerrado")
+                    del indexes[channel]
+                    with self.lock:
+                        self.loads[index] = None
+                    continue
+
+                with self.lock:
+                    previous = self.loads[index]
+                    stats['received_at'] = time.monotonic()
+
+                    # Fração do tempo gasta atualizando as salas desde a estatística anterior
+                    if previous is not None:
+                        elapsed = stats['received_at'] - previous['received_at']
+                        busy = stats['update_time'] - previous['update_time']
+                        stats['cpu'] = busy / elapsed if elapsed > 0 else previous['cpu']
+                    else:
+                        stats['cpu'] = 0.0
+
+                    self.loads[index] = stats
+                    self.pending[index] = 0
+
+    def __report_loop(self):
+        """
+            Thread que exibe a carga dos workers a cada REPORT_INTERVAL.
+        """
+        while self.running:
+            time.sleep(self.REPORT_INTERVAL)
+            print(self.report())
+
+    def report(self) -> str:
+        """
+            Returns:
+                str: Uma linha por worker com salas, clientes, uso de CPU da simulação e passos atrasados,
+                seguida do resumo do broadcast de cada worker.
+        """
+        lines = []
+
+        with self.lock:
+            for index, stats in enumerate(self.loads):
+                pid = self.processes[index].pid if index < len(self.processes) else None
+
+                if stats is None:
+                    lines.append(f"Worker {index} (pid {pid}): inativo")
+                else:
+                    lines.append(
+                        f"Worker {index} (pid {pid}): {stats['rooms']} salas, "
+                        f"{stats['clients']} clientes, CPU {stats['cpu']:.0%}, "
+                        f"{stats['overruns']} passos atrasados\n"
+                        f"    {broadcast_report(stats['broadcast'])}"
+                    )
+
+        return "\n".join(lines)
+
+    def collect_metrics(self) -> dict:
+        """
+            Returns:
+                dict: A soma das últimas métricas recebidas dos workers ativos, com as threads e a memória
+                do supervisor (ver `server.metrics`).
+        """
+        with self.lock:
+            samples = [stats['metrics'] for stats in self.loads if stats is not None and 'metrics' in stats]
+
+        sample = metrics.merge(samples)
+        sample['threads'] += threading.active_count()
+        sample['rss'] += metrics.rss_bytes()
+        return sample
+
+    def __choose_worker(self, room_id: int) -> int | None:
+        """
+            Escolhe o worker que receberá o cliente.
+
+            Args:
+                room_id (int): A sala pedida pelo cliente (0 para escolha automática).
+
+            Returns:
+                int | None: O índice do worker, ou None se nenhum worker adequado estiver ativo.
+        """
+        with self.lock:
+            if room_id:
+                index = Lobby.shard_of(room_id, self.worker_count)
+                chosen = index if self.loads[index] is not None else None
+            else:
+                active = [i for i, stats in enumerate(self.loads) if stats is not None]
+
+                def load(i):
+                    return (self.loads[i]['clients'] + self.pending[i], self.loads[i]['cpu'])
+
+                # Prefere completar salas existentes antes de criar novas
+                with_free_ghost = [i for i in active if self.loads[i]['free_ghosts'] > self.pending[i]]
+                candidates = with_free_ghost or active
+                chosen = min(candidates, key=load) if candidates else None
+
+            if chosen is not None:
+                self.pending[chosen] += 1
+
+            return chosen
+
+    def route_client(self, client_socket):
+        """
+            Lê o HELLO do cliente e repassa a conexão ao worker escolhido.
+            Clientes com outra versão do protocolo são recusados (REJECT) aqui mesmo.
+
+            Args:
+                client_socket (socket): O socket do cliente recém-aceito.
+        """
+        try:
+            hello = handshake.receive_hello(client_socket)
+        except protocol.VersionMismatch as e:
+            print(f"Cliente recusado: {e}")
+            try:
+                client_socket.sendall(protocol.frame(protocol.encode_reject(protocol.REJECT_VERSION)))
+            except OSError:
+                pass
+            client_socket.close()
+            return
+        except OSError as e:
+            print(f"Cliente não enviou um HELLO válido ({e}). Encerrando conexão")
+            client_socket.close()
+            return
+
+        index = self.__choose_worker(hello[0] if hello else 0)
+
+        if index is None:
+            print("Nenhum worker disponível para o cliente. Encerrando conexão")
+            client_socket.close()
+            return
+
+        try:
+            with self.channel_locks[index]:
+                self.channels[index].send(hello)
+                send_handle(self.channels[index], client_socket.fileno(), self.processes[index].pid)
+        except OSError as e:
+            print(f"Erro ao repassar o cliente ao worker {index}: {e}")
+        finally:
+            # O worker recebe uma cópia do descritor
+            client_socket.close()
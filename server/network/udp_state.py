@@ -0,0 +1,129 @@
+"""
+    Transporte opcional do estado do jogo por UDP.
+
+    Sobre TCP, um segmento perdido atrasa todos os estados seguintes (bloqueio de cabeça de fila),
+    embora apenas o mais recente importe. Clientes que pedem UDP no HELLO continuam usando a conexão
+    TCP para o handshake, a atribuição do fantasma e as entradas (caminho confiável), mas recebem o
+    estado por datagramas não confiáveis, em que o mais novo vence:
+
+    1. O servidor responde ao HELLO com WELCOME, ASSIGN e UDP_TOKEN (token da sessão e porta UDP) pelo TCP.
+    2. O cliente envia UDP_HELLO com o token para a porta UDP, repetindo até receber estados.
+    3. A cada tick o servidor envia ao endereço registrado o keyframe do tick (autocontido, com o
+       tick como número de sequência) e, quando houver, a confirmação (ACK) da última entrada.
+       O cliente descarta datagramas com tick menor ou igual ao último aplicado.
+
+    O keyframe de cada tick é codificado uma única vez pelo broadcaster, independentemente da
+    quantidade de clientes UDP.
+"""
+
+import secrets
+import threading
+
+from common import protocol
+from common.protocol import ProtocolError
+
+MAX_DATAGRAM = 64   # Tamanho máximo aceito para datagramas vindos dos clientes
+
+
+class UdpSessions:
+    """
+        Associa os tokens UDP aos contextos dos clientes e registra o endereço de cada um.
+    """
+
+    def __init__(self):
+        self.__sessions = {}
+        self.__lock = threading.Lock()
+
+    def open(self, client_context: dict) -> int:
+        """
+            Cria a sessão UDP de um cliente.
+
+            Args:
+                client_context (dict): O contexto do cliente. Recebe 'udp_token', 'udp_addr' e 'udp_tick'.
+
+            Returns:
+                int: O token da sessão, a ser enviado ao cliente.
+        """
+        with self.__lock:
+            token = secrets.randbits(32)
+            while token in self.__sessions:
+                token = secrets.randbits(32)
+
+            client_context['udp_token'] = token
+            client_context['udp_addr'] = None
+            client_context['udp_tick'] = 0
+            self.__sessions[token] = client_context
+
+        return token
+
+    def close(self, client_context: dict):
+        """
+            Encerra a sessão UDP de um cliente, se houver.
+        """
+        with self.__lock:
+            self.__sessions.pop(client_context.get('udp_token'), None)
+
+    def handle_datagram(self, data: bytes, addr) -> bool:
+        """
+            Processa um datagrama recebido. Datagramas inválidos ou de sessões desconhecidas são ignorados.
+
+            Args:
+                data (bytes): O conteúdo do datagrama.
+                addr: O endereço de origem.
+
+            Returns:
+                bool: True se o datagrama registrou o endereço de uma sessão.
+        """
+        if len(data) > MAX_DATAGRAM:
+            return False
+
+        try:
+            msg_type, token = protocol.decode(data)
+        except ProtocolError:
+            return False
+
+        if msg_type != protocol.MSG_UDP_HELLO:
+            return False
+
+        with self.__lock:
+            client_context = self.__sessions.get(token)
+
+            if client_context is None:
+                return False
+
+            client_context['udp_addr'] = addr
+
+        return True
+
+
+def state_datagrams(room, client_context: dict) -> list:
+    """
+        Retorna os datagramas de estado ainda não enviados ao cliente: o keyframe do tick atual
+        e a confirmação da última entrada aplicada.
+
+        Args:
+            room (Room): A sala do cliente.
+            client_context (dict): O contexto do cliente, com a sessão UDP aberta.
+
+        Returns:
+            list: Os payloads a enviar (memoryview/bytes), na ordem.
+    """
+    datagrams = []
+    queue = client_context['queue']
+    keyframe = room.broadcaster.keyframe(queue.compressed)
+
+    # Respeita a taxa de envio negociada (a cada `interval` ticks)
+    if keyframe is not None and keyframe[0] >= client_context['udp_tick'] + queue.interval:
+        tick, frame = keyframe
+
+        # O frame compartilhado já tem o cabeçalho de tamanho, desnecessário em datagramas
+        datagrams.append(memoryview(frame)[protocol.HEADER.size:])
+        client_context['udp_tick'] = tick
+
+    ack = room.ack_for(client_context['ghost'], client_context['acked'], client_context['udp_tick'])
+    if ack is not None:
+        datagrams.append(protocol.encode_ack(*ack))
+        client_context['acked'] = ack[0]
+
+    queue.count_datagrams(datagrams)
+    return datagrams
@@ -8,6 +8,13 @@ class PacmanIA:
     # 2. Frightened: Caça fantasmas ativamente
     # 3. Heatmap p fugir de áreas perigosas
     # 4. Fuga do loop de travamento
+    #
+    # Distâncias entre posições (fantasmas, alvos, heurística do A*) são
+    # as do menor caminho pelo labirinto, consultadas na tabela do Matrix;
+    # o heatmap e a busca do ponto de fuga usam o raio em Manhattan.
+    #
+    # Como o GameState, a IA não faz escolhas aleatórias: com o mesmo
+    # estado, ela toma sempre as mesmas decisões.
     # -----------------------------------------------------------
 
 
@@ -32,8 +39,7 @@ class PacmanIA:
         
         for y in range(matriz.height()):
             for x in range(matriz.width()):
-                cell = matriz.get_cell(x, y)
-                if not cell or not cell.is_walkable():
+                if not matriz.is_valid_position(x, y):
                     continue
                 
                 perigo = 0
@@ -92,6 +98,11 @@ class PacmanIA:
         # Se todos estão no histórico, escolhe o menos perigoso
         return min(vizinhos, key=lambda v: self.obter_perigo(v))
 
+    def memoria(self):
+        """Estado interno que influencia os próximos movimentos (para comparar execuções)"""
+        return (self.ultima_posicao, tuple(self.historico_posicoes), self.contador_travamento,
+                self.ultima_atualizacao_heatmap)
+
     # -----------------------------------------------------------
     # DISTÂNCIAS E AUXILIARES
     # -----------------------------------------------------------
@@ -99,13 +110,24 @@ class PacmanIA:
     def manhattan(a, b):
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
+    @staticmethod
+    def distancia(matriz, a, b):
+        """Distância pelo menor caminho no labirinto (999999 se não houver caminho)"""
+        dist = matriz.distance(a, b)
+        return 999999 if dist is None else dist
+
     @staticmethod
     def reconstruir_caminho(veio_de, atual):
-        caminho = [atual]
+        """Junta os trechos de corredor percorridos até `atual` no caminho de casas"""
+        trechos = []
         while atual in veio_de:
-            atual = veio_de[atual]
-            caminho.append(atual)
-        return caminho[::-1]
+            atual, casas = veio_de[atual]
+            trechos.append(casas)
+
+        caminho = [atual]
+        for casas in reversed(trechos):
+            caminho.extend(casas)
+        return caminho
 
     def vizinhos(self, matriz, pos):
         x, y = pos
@@ -118,8 +140,7 @@ class PacmanIA:
 
         validos = []
         for nx, ny in candidatos:
-            cell = matriz.get_cell(nx, ny)
-            if cell and cell.is_walkable():
+            if matriz.is_valid_position(nx, ny):
                 validos.append((nx, ny))
 
         return validos
@@ -132,12 +153,32 @@ class PacmanIA:
         A* que considera:
         - Heatmap de perigo (modo normal)
         - Prioriza proximidade no modo caça
+
+        A busca expande apenas as junções e becos do labirinto (grafo do
+        Matrix): cada corredor é percorrido de uma vez, somando o custo das
+        suas casas. O caminho retornado continua sendo o de casas.
         """
+        if inicio == destino:
+            return [inicio]
+
+        # Destino inacessível (parede ou área fechada): não há o que buscar
+        if matriz.distance(inicio, destino) is None:
+            return None
+
+        grafo = matriz.junctions()
+
+        # Destino no meio de um corredor: as pontas do corredor ganham uma saída até ele
+        extras = {}
+        if destino not in grafo.nodes:
+            for ponta, casas in grafo.edges(destino):
+                extras.setdefault(ponta, []).append((destino, casas[-2::-1] + (destino,)))
+
         fila = []
         heapq.heappush(fila, (0, inicio))
 
         veio_de = {}
         gscore = {inicio: 0}
+        fechados = set()
 
         while fila:
             _, atual = heapq.heappop(fila)
@@ -145,20 +186,34 @@ class PacmanIA:
             if atual == destino:
                 return self.reconstruir_caminho(veio_de, atual)
 
-            for viz in self.vizinhos(matriz, atual):
-                custo = 1
+            if atual in fechados:
+                continue
+            fechados.add(atual)
+
+            saidas = grafo.edges(atual)
+
+            # Partindo do mesmo corredor do destino, o trecho termina nele
+            if atual == inicio:
+                saidas = [(destino, casas[:casas.index(destino) + 1]) if destino in casas else (viz, casas)
+                          for viz, casas in saidas]
+
+            if atual in extras:
+                saidas = saidas + extras[atual]
+
+            for viz, casas in saidas:
+                custo = len(casas)
                 
                 # No modo caça, ignora perigo; no modo normal, adiciona peso
                 if not modo_caca:
-                    perigo = self.obter_perigo(viz)
+                    perigo = sum(self.obter_perigo(casa) for casa in casas)
                     custo += perigo * 1.5
                 
                 novo_g = gscore[atual] + custo
 
                 if novo_g < gscore.get(viz, 999999):
-                    veio_de[viz] = atual
+                    veio_de[viz] = (atual, casas)
                     gscore[viz] = novo_g
-                    fscore = novo_g + self.manhattan(viz, destino)
+                    fscore = novo_g + self.distancia(matriz, viz, destino)
                     heapq.heappush(fila, (fscore, viz))
 
         return None
@@ -174,7 +229,7 @@ class PacmanIA:
             # Verifica se o fantasma está em jogo (posição diferente da inicial)
             pos_inicial = matriz.initial_positions.get(fantasma)
             if pos and pos != pos_inicial:
-                dist = self.manhattan(pos, pos_pac)
+                dist = self.distancia(matriz, pos, pos_pac)
                 fantasmas.append((fantasma, pos, dist))
         
         return sorted(fantasmas, key=lambda x: x[2])
@@ -191,9 +246,8 @@ class PacmanIA:
         for dy in range(-raio, raio + 1):
             for dx in range(-raio, raio + 1):
                 x, y = x_pac + dx, y_pac + dy
-                cell = matriz.get_cell(x, y)
                 
-                if not cell or not cell.is_walkable():
+                if not matriz.is_valid_position(x, y):
                     continue
                 
                 perigo = self.obter_perigo((x, y))
@@ -210,38 +264,20 @@ class PacmanIA:
 
     def dot_mais_proximo(self, matriz, pos):
         """Encontra o pac-dot mais próximo considerando segurança"""
-        melhor = None
-        menor_score = 999999
-
-        for y, linha in enumerate(matriz.matrix):
-            for x, cell in enumerate(linha):
-                if cell.has_pac_dot():
-                    dist = self.manhattan((x, y), pos)
-                    perigo = self.obter_perigo((x, y))
-                    
-                    # Score balanceado: distância + perigo
-                    score = dist + (perigo * 0.3)
-                    
-                    if score < menor_score:
-                        menor_score = score
-                        melhor = (x, y)
+        if not matriz.pac_dots:
+            return None
 
-        return melhor
+        # Score balanceado: distância + perigo
+        # (percorre apenas os dots restantes; empates ficam com o primeiro na ordem das linhas)
+        return min(matriz.pac_dots,
+                   key=lambda p: (self.distancia(matriz, p, pos) + self.obter_perigo(p) * 0.3, p[1], p[0]))
 
     def power_pellet_mais_proximo(self, matriz, pos):
         """Encontra a power pellet mais próxima"""
-        melhor = None
-        menor_dist = 999999
-
-        for y, linha in enumerate(matriz.matrix):
-            for x, cell in enumerate(linha):
-                if cell.has_power_pellet():
-                    dist = self.manhattan((x, y), pos)
-                    if dist < menor_dist:
-                        menor_dist = dist
-                        melhor = (x, y)
+        if not matriz.power_pellets:
+            return None
 
-        return melhor
+        return min(matriz.power_pellets, key=lambda p: (self.distancia(matriz, p, pos), p[1], p[0]))
 
     # -----------------------------------------------------------
     # OBJETIVOS - MODO CAÇA (FRIGHTENED)
@@ -258,7 +294,7 @@ class PacmanIA:
             
             # Só considera fantasmas que saíram da posição inicial (estão em jogo)
             if pos and pos != pos_inicial:
-                dist = self.manhattan(pos, pos_pac)
+                dist = self.distancia(matriz, pos, pos_pac)
                 if dist < menor_dist:
                     menor_dist = dist
                     melhor_fantasma = fantasma
@@ -354,7 +390,7 @@ class PacmanIA:
                 power_pellet = self.power_pellet_mais_proximo(matriz, pos_pac)
                 
                 if power_pellet:
-                    dist_pellet = self.manhattan(power_pellet, pos_pac)
+                    dist_pellet = self.distancia(matriz, power_pellet, pos_pac)
                     dist_fantasma = fantasmas_prox[0][2]
                     
                     # Se power pellet está mais perto que o fantasma, vai pegá-la
@@ -0,0 +1,212 @@
+"""
+    Gravação das partidas em arquivos de replay (formato em `common.replay`).
+
+    A gravação não acrescenta trabalho ao passo da simulação além de guardar referências: a sala
+    entrega a cada tick a fotografia, o frame já codificado pelo broadcaster e as entradas aplicadas
+    (`MatchRecorder.record`), e uma única thread de escrita por processo (`ReplayStore`) monta os
+    registros e os grava em lotes, a cada FLUSH_INTERVAL segundos.
+
+    Cada partida (do início até o reinício após a vitória, ou até a saída de todos os jogadores)
+    é gravada em um arquivo próprio, `sala<id>-<data>-<n>.replay`, criado apenas quando o primeiro
+    tick da partida é gravado.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+from common import protocol, replay
+
+
+class MatchRecorder:
+    """
+        Grava os ticks de uma partida em um arquivo de replay.
+
+        `record` é chamado pela thread da simulação; `flush` e `finish`, apenas pela thread de
+        escrita do ReplayStore.
+
+        Attributes:
+            path (str): O caminho do arquivo.
+            closed (bool): Se a partida terminou (nenhum tick novo será gravado).
+    """
+
+    def __init__(self, path: str, header: bytes):
+        """
+            Args:
+                path (str): O caminho do arquivo.
+                header (bytes): O cabeçalho do replay (ver `common.replay.encode_header`).
+        """
+        self.path = path
+        self.closed = False
+        self.__header = header
+        self.__pending = deque()
+
+        self.__file = None
+        self.__failed = False
+        self.__offset = 0
+        self.__index = []
+        self.__last_tick = None
+        self.__final_tick = None
+
+    def record(self, snapshot, frame: bytes, inputs: list):
+        """
+            Enfileira um tick para gravação.
+
+            Args:
+                snapshot (Snapshot): A fotografia do tick.
+                frame (bytes): O frame publicado para o tick (ver `StateBroadcaster.publish_snapshot`).
+                inputs (list[tuple[EntityType, PlayerAction, int]]): As entradas aplicadas no tick.
+        """
+        self.__pending.append((snapshot, frame, inputs))
+
+    def close(self, final_tick: int | None = None):
+        """
+            Encerra a partida. Os ticks pendentes, o índice e o rodapé são gravados pela thread de escrita.
+
+            Args:
+                final_tick (int, optional): Último tick da partida, se ele ainda não foi entregue a `record`.
+        """
+        self.__final_tick = final_tick
+        self.closed = True
+
+    def done(self) -> bool:
+        """
+            Returns:
+                bool: True se a partida terminou e todos os seus ticks já foram gravados.
+        """
+        if not self.closed:
+            return False
+
+        return self.__final_tick is None or (self.__last_tick or 0) >= self.__final_tick or self.__failed
+
+    def flush(self):
+        """
+            Grava os ticks pendentes em uma única escrita.
+        """
+        records = []
+        while self.__pending:
+            records.append(self.__pending.popleft())
+
+        if not records or self.__failed:
+            return
+
+        # O cabeçalho é gravado junto com o primeiro lote
+        parts = [self.__header] if self.__file is None else []
+        offset = self.__offset + sum(map(len, parts))
+
+        for snapshot, frame, inputs in records:
+            payload = memoryview(frame)[protocol.HEADER.size:]
+
+            # O replay começa por um keyframe, e um delta só vale se o tick anterior foi gravado
+            if not replay.is_keyframe(payload) and (self.__last_tick is None or snapshot.tick != self.__last_tick + 1):
+                payload = protocol.encode_snapshot(snapshot.keyframe())
+
+            if replay.is_keyframe(payload):
+                self.__index.append((snapshot.tick, offset))
+
+            record = replay.encode_record(snapshot.tick, inputs, payload)
+            parts.append(record)
+            offset += len(record)
+            self.__last_tick = snapshot.tick
+
+        try:
+            if self.__file is None:
+                self.__file = open(self.path, 'wb')
+
+            self.__file.write(b"".join(parts))
+            self.__file.flush()
+            self.__offset = offset
+        except OSError as e:
+            self.__failed = True
+            print(f"Gravação do replay {self.path} interrompida: {e}")
+
+    def finish(self):
+        """
+            Grava os ticks pendentes, o índice dos keyframes e o rodapé, e fecha o arquivo.
+        """
+        self.flush()
+
+        if self.__file is None:
+            return
+
+        try:
+            if not self.__failed:
+                self.__file.write(replay.encode_index(self.__index, self.__last_tick, self.__offset))
+            self.__file.close()
+        except OSError as e:
+            print(f"Gravação do replay {self.path} interrompida: {e}")
+
+
+class ReplayStore:
+    """
+        Cria os gravadores das partidas e mantém a thread que grava os seus ticks em disco.
+    """
+    FLUSH_INTERVAL = 1.0    # Segundos entre as escritas em lote
+
+    def __init__(self, directory: str, flush_interval: float = FLUSH_INTERVAL):
+        """
+            Args:
+                directory (str): A pasta dos arquivos de replay (criada se não existir).
+                flush_interval (float, optional): Segundos entre as escritas em lote.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.__recorders = []
+        self.__lock = threading.Lock()
+        self.__count = 0
+        self.__stopped = threading.Event()
+
+        self.__thread = threading.Thread(target=self.__run, name="ReplayStore", daemon=True)
+        self.__thread.start()
+
+    def open(self, room_id: int, tick_rate: int, matrix) -> MatchRecorder:
+        """
+            Inicia a gravação de uma partida.
+
+            Args:
+                room_id (int): A sala da partida.
+                tick_rate (int): Ticks da simulação por segundo.
+                matrix (Matrix): O labirinto da partida.
+
+            Returns:
+                MatchRecorder: O gravador, a ser encerrado com `close` no fim da partida.
+        """
+        with self.__lock:
+            self.__count += 1
+            name = f"sala{room_id}-{time.strftime('%Y%m%d-%H%M%S')}-{self.__count}{replay.EXTENSION}"
+            recorder = MatchRecorder(os.path.join(self.directory, name), replay.encode_header(room_id, tick_rate, matrix))
+            self.__recorders.append(recorder)
+
+        return recorder
+
+    def __run(self):
+        while not self.__stopped.wait(self.flush_interval):
+            self.__flush()
+
+    def __flush(self):
+        with self.__lock:
+            recorders = list(self.__recorders)
+
+        for recorder in recorders:
+            recorder.flush()
+
+            if recorder.done():
+                recorder.finish()
+                with self.__lock:
+                    self.__recorders.remove(recorder)
+
+    def close(self):
+        """
+            Encerra todas as gravações, gravando os ticks pendentes e os índices.
+        """
+        self.__stopped.set()
+        self.__thread.join(timeout=5.0)
+
+        with self.__lock:
+            recorders, self.__recorders = self.__recorders, []
+
+        for recorder in recorders:
+            recorder.finish()
@@ -0,0 +1,548 @@
+import time
+import hashlib
+from collections import deque
+from common import protocol
+from common.game_state import GameState
+from common.enums import EntityType, PlayerAction
+from common.snapshot import GHOSTS, Snapshot
+
+from .pacman import PacmanIA
+from .clock import MonotonicClock
+from .movement import move_ghost
+from .scheduler import FixedTimestep
+from .network.broadcast import StateBroadcaster
+
+class Room:
+    """
+        Representa uma partida (sala) independente.
+
+        Cada sala possui seu próprio GameState, sua IA do Pac-Man, suas vagas de fantasma,
+        seus clientes e seu estágio de broadcast.
+
+        A partida avança em passos fixos (TICK_RATE por segundo), sempre na mesma ordem:
+        Pac-Man, fantasmas (na ordem de GHOSTS), timers e colisões (GameState.update), captura
+        do estado e broadcast.
+        Cada entidade tem um acumulador de velocidade: a cada passo recebe `velocidade * dt` e
+        se move uma casa para cada unidade acumulada.
+
+        As ações dos jogadores chegam numeradas (sequência do cliente) e ficam em uma fila por
+        fantasma; cada movimento do fantasma consome a próxima ação da fila, na ordem, de modo que
+        teclas pressionadas em sequência entre dois movimentos não se perdem. A última ação
+        consumida de cada fantasma fica em `acks`, para ser confirmada ao cliente.
+
+        Com a gravação ativa, cada partida em andamento é gravada em um arquivo de replay: os passos
+        publicados, com as ações aplicadas em cada um, são entregues ao gravador (ver `server.recorder`).
+
+        A partida é determinística (nem o GameState nem a IA do Pac-Man fazem escolhas aleatórias):
+        as mesmas entradas aplicadas nos mesmos passos produzem exatamente o mesmo estado (ver `state_hash` e `server.simulation`). O relógio
+        apenas decide quando os passos são executados.
+
+        Attributes:
+            room_id (int): Identificador da sala.
+            game_state (GameState): O estado da partida.
+            pacman_ai (PacmanIA): A IA que controla o Pac-Man.
+            available_ghosts (list[EntityType]): Fantasmas ainda livres.
+            clients (dict): Cliente -> fantasma atribuído (None para espectadores).
+            controls (dict): Fantasma em jogo -> direções atual e pedida ('current_action', 'next_action').
+            inputs (dict): Fantasma em jogo -> fila de ações pendentes (ação, sequência, instante do cliente).
+            acks (dict): Fantasma em jogo -> (sequência, instante do cliente, tick) da última ação aplicada.
+            broadcaster (StateBroadcaster): Publica o estado da sala a cada tick.
+            scheduler (FixedTimestep): Relógio de passo fixo da partida.
+            metrics (Metrics | None): Histogramas de duração dos passos e da IA (None se as métricas
+                estiverem desativadas).
+            replays (ReplayStore | None): Onde as partidas são gravadas (None se a gravação estiver desativada).
+            recorder (MatchRecorder | None): O gravador da partida atual.
+            clock (MonotonicClock | SimulatedClock): O relógio consultado quando `update` e `advance` não recebem o instante.
+    """
+    TICK_RATE = 20              # Passos da simulação por segundo (os timers do GameState contam passos)
+    PACMAN_INTERVAL = 0.23      # Intervalo base entre movimentos do Pac-Man
+    PACMAN_SPEEDUP = 0.012      # Redução do intervalo para cada fantasma em jogo
+    GHOST_SPEED = 5.0           # Casas por segundo percorridas por um fantasma
+    MAX_PENDING_INPUTS = 8      # Ações pendentes por fantasma (as mais antigas são descartadas)
+
+    def __init__(self, room_id: int, compress: bool = True, metrics=None, replays=None, clock=None):
+        """
+            Args:
+                room_id (int): Identificador da sala.
+                compress (bool, optional): Se o broadcaster também publica os frames comprimidos. Padrão é True.
+                metrics (Metrics, optional): Onde registrar as durações (ver `server.metrics`). Padrão é None.
+                replays (ReplayStore, optional): Onde gravar as partidas (ver `server.recorder`). Padrão é None.
+                clock (optional): O relógio da partida (ver `server.clock`). Padrão é o relógio monotônico.
+        """
+        self.room_id = room_id
+        self.metrics = metrics
+        self.clock = clock or MonotonicClock()
+
+        self.game_state = GameState()
+        self.pacman_ai = PacmanIA()
+        self.pacman_running = False
+
+        self.clients = {}
+        self.controls = {}
+        self.inputs = {}
+        self.acks = {}
+        self.__last_seq = {}
+        self.speed_accumulators = {}
+        self.broadcaster = StateBroadcaster(compress=compress)
+        self.scheduler = FixedTimestep(self.TICK_RATE, f"Sala {room_id}")
+
+        # Gravação da partida: entradas aplicadas no passo atual e, por tick capturado e ainda não
+        # publicado, o gravador e as entradas do passo
+        self.replays = replays
+        self.recorder = replays.open(room_id, self.TICK_RATE, self.game_state.matrix) if replays else None
+        self.__tick_inputs = []
+        self.__unrecorded = {}
+
+        self.available_ghosts = [
+            EntityType.BLINKY,
+            EntityType.INKY,
+            EntityType.PINKY,
+            EntityType.CLYDE
+        ]
+
+    def has_free_ghost(self) -> bool:
+        """
+            Returns:
+                bool: True se ainda houver fantasmas livres na sala.
+        """
+        return bool(self.available_ghosts)
+
+    def player_count(self) -> int:
+        """
+            Returns:
+                int: Quantidade de clientes controlando fantasmas.
+        """
+        return 4 - len(self.available_ghosts)
+
+    def assign_ghost(self, client, spectator: bool = False) -> EntityType | None:
+        """
+            Atribui um fantasma disponível ao cliente, ou None se ele for espectador.
+            O Pac-Man começa a se mover quando o primeiro fantasma entra na sala.
+
+            Args:
+                client: Identificador do cliente (socket ou canal de escrita).
+                spectator (bool, optional): Se o cliente pediu para apenas assistir. Padrão é False.
+
+            Returns:
+                EntityType | None: O tipo de fantasma atribuído ou None se for espectador.
+        """
+        assigned_ghost = self.available_ghosts.pop(0) if self.available_ghosts and not spectator else None
+        self.clients[client] = assigned_ghost
+
+        if assigned_ghost:
+            self.controls[assigned_ghost] = {'current_action': None, 'next_action': None}
+            self.inputs[assigned_ghost] = deque(maxlen=self.MAX_PENDING_INPUTS)
+            self.__last_seq[assigned_ghost] = -1
+            self.speed_accumulators[assigned_ghost] = 0.0
+
+            if not self.pacman_running:
+                self.pacman_running = True
+                self.speed_accumulators[EntityType.PACMAN] = 0.0
+
+        return assigned_ghost
+
+    def queue_input(self, ghost: EntityType, action: PlayerAction, seq: int = 0, timestamp: int = 0):
+        """
+            Enfileira a direção pedida pelo jogador, aplicada em um dos próximos movimentos do fantasma.
+            Ações repetidas ou fora de ordem (sequência não crescente) são ignoradas.
+
+            Args:
+                ghost (EntityType): O fantasma controlado pelo jogador.
+                action (PlayerAction): A direção pedida.
+                seq (int, optional): Número de sequência atribuído pelo cliente.
+                timestamp (int, optional): Instante do envio no cliente, em ms, ecoado na confirmação.
+        """
+        if ghost not in self.inputs or (seq != 0 and seq <= self.__last_seq[ghost]):
+            return
+
+        self.__last_seq[ghost] = seq
+        self.inputs[ghost].append((action, seq, timestamp))
+
+    def ack_for(self, ghost: EntityType | None, acked_seq: int | None, sent_tick: int) -> tuple[int, int, int] | None:
+        """
+            Retorna a confirmação da última entrada aplicada do fantasma, se ela ainda não foi
+            confirmada ao cliente e o frame do tick em que foi aplicada já foi enviado.
+
+            Args:
+                ghost (EntityType | None): O fantasma do cliente.
+                acked_seq (int | None): A sequência da última entrada já confirmada ao cliente.
+                sent_tick (int): O tick do último frame enviado ao cliente.
+
+            Returns:
+                tuple[int, int, int] | None: (sequência, instante do cliente, tick), ou None se não há o que confirmar.
+        """
+        ack = self.acks.get(ghost)
+
+        if ack is None or ack[0] == acked_seq or ack[2] > sent_tick:
+            return None
+
+        return ack
+
+    def remove_client(self, client):
+        """
+            Remove o cliente da sala e libera seu fantasma.
+            Quando não restam jogadores, a partida é reiniciada e o Pac-Man para.
+
+            Args:
+                client: Identificador do cliente.
+        """
+        if client not in self.clients:
+            return
+
+        assigned_ghost = self.clients.pop(client)
+
+        if assigned_ghost is not None:
+            # Libera o fanstasma para outros jogadores
+            self.available_ghosts.insert(0, assigned_ghost)
+            self.controls.pop(assigned_ghost, None)
+            self.inputs.pop(assigned_ghost, None)
+            self.acks.pop(assigned_ghost, None)
+
+        if self.player_count() == 0:
+            self.__restart()
+            self.pacman_running = False
+
+    def close(self):
+        """
+            Encerra a gravação da partida, se houver. Chamado quando a sala é descartada.
+        """
+        if self.recorder is not None:
+            self.__close_recorder()
+            self.recorder = None
+
+    def __close_recorder(self):
+        """
+            Encerra a gravação da partida atual, depois dos passos já capturados e ainda não publicados.
+        """
+        pending = [tick for tick, (recorder, _) in list(self.__unrecorded.items()) if recorder is self.recorder]
+        self.recorder.close(max(pending, default=None))
+
+    def __restart(self):
+        """
+            Reinicia o estado da partida e, se a gravação estiver ativa, passa a gravar em um novo arquivo.
+        """
+        self.game_state.reset()
+
+        if self.recorder is not None:
+            self.__close_recorder()
+            self.recorder = self.replays.open(self.room_id, self.TICK_RATE, self.game_state.matrix)
+
+    def pacman_interval(self) -> float:
+        """
+            Returns:
+                float: Intervalo entre movimentos do Pac-Man, menor quanto mais fantasmas estiverem em jogo.
+        """
+        return self.PACMAN_INTERVAL - self.PACMAN_SPEEDUP * self.player_count()
+
+    def __advance(self, entity: EntityType, speed: float) -> int:
+        """
+            Soma o deslocamento de um passo ao acumulador da entidade.
+
+            Returns:
+                int: Quantidade de casas que a entidade deve andar neste passo.
+        """
+        accumulated = self.speed_accumulators.get(entity, 0.0) + speed * self.scheduler.dt
+        moves = int(accumulated)
+        self.speed_accumulators[entity] = accumulated - moves
+        return moves
+
+    def update(self, now: float | None = None) -> int:
+        """
+            Executa os passos da partida que estão pendentes no relógio (normalmente um;
+            mais de um para recuperar um atraso) e publica o estado de cada um.
+
+            Args:
+                now (float, optional): Instante atual. Padrão é o instante do relógio da sala.
+
+            Returns:
+                int: Quantidade de passos executados.
+        """
+        snapshots = self.advance(now)
+
+        for snapshot in snapshots:
+            self.publish(snapshot)
+
+        return len(snapshots)
+
+    def publish(self, snapshot: Snapshot):
+        """
+            Codifica e publica a fotografia de um passo (ver `StateBroadcaster.publish_snapshot`) e a
+            entrega ao gravador da partida. Deve ser chamado por uma única thread, na ordem de captura.
+
+            Args:
+                snapshot (Snapshot): A fotografia retornada por `advance`.
+        """
+        frame = self.broadcaster.publish_snapshot(snapshot)
+
+        if self.__unrecorded:
+            recording = self.__unrecorded.pop(snapshot.tick, None)
+
+            if recording is not None:
+                recording[0].record(snapshot, frame, recording[1])
+
+    def advance(self, now: float | None = None) -> list[Snapshot]:
+        """
+            Executa os passos pendentes e captura o estado de cada um, sem codificá-lo nem publicá-lo.
+
+            É a única etapa que altera o GameState: com várias threads, apenas ela precisa de acesso
+            exclusivo, e a publicação (`publish`) pode ser feita fora do lock.
+
+            Args:
+                now (float, optional): Instante atual. Padrão é o instante do relógio da sala.
+
+            Returns:
+                list[Snapshot]: As fotografias dos passos executados, na ordem.
+        """
+        if now is None:
+            now = self.clock.now()
+
+        snapshots = []
+
+        for _ in range(self.scheduler.due(now)):
+            start = time.perf_counter()
+            self.tick()
+            snapshot = self.broadcaster.capture(self.game_state)
+            snapshots.append(snapshot)
+
+            # Apenas os passos com a partida em andamento são gravados
+            if self.recorder is not None and self.pacman_running:
+                self.__unrecorded[snapshot.tick] = (self.recorder, self.__tick_inputs)
+                self.__tick_inputs = []
+
+            duration = time.perf_counter() - start
+            self.scheduler.record(duration, now)
+
+            if self.metrics is not None:
+                self.metrics.tick_duration.observe(duration)
+
+        return snapshots
+
+    def state_hash(self, snapshot: Snapshot) -> str:
+        """
+            Resumo do estado da partida após um passo, para comparar execuções.
+
+            Inclui o estado transmitido (o keyframe da fotografia) e o estado interno que influencia os
+            próximos passos: acumuladores de velocidade, memória da IA, direções e ações pendentes dos fantasmas.
+
+            Args:
+                snapshot (Snapshot): A fotografia do passo, retornada por `advance`.
+
+            Returns:
+                str: O resumo (BLAKE2b de 64 bits, em hexadecimal).
+        """
+        internal = (
+            sorted(self.speed_accumulators.items()),
+            self.pacman_ai.memoria(),
+            sorted((ghost, control['current_action'], control['next_action']) for ghost, control in self.controls.items()),
+            sorted((ghost, tuple(pending)) for ghost, pending in self.inputs.items()),
+        )
+
+        digest = hashlib.blake2b(protocol.encode_snapshot(snapshot.keyframe()), digest_size=8)
+        digest.update(repr(internal).encode())
+        return digest.hexdigest()
+
+    def tick(self):
+        """
+            Avança a partida em um passo: move o Pac-Man e os fantasmas conforme as suas velocidades
+            e atualiza o estado do jogo (timers, colisões, vitória).
+        """
+        if self.pacman_running:
+            moves = self.__advance(EntityType.PACMAN, 1.0 / self.pacman_interval())
+
+            if self.metrics is None:
+                for _ in range(moves):
+                    self.pacman_ai.update(self.game_state)
+            else:
+                for _ in range(moves):
+                    start = time.perf_counter()
+                    self.pacman_ai.update(self.game_state)
+                    self.metrics.pacman_update.observe(time.perf_counter() - start)
+
+        for ghost in GHOSTS:
+            control = self.controls.get(ghost)
+
+            if control is None:
+                continue
+
+            pending = self.inputs[ghost]
+
+            for _ in range(self.__advance(ghost, self.GHOST_SPEED)):
+                if pending:
+                    action, seq, timestamp = pending.popleft()
+                    control['next_action'] = action
+
+                    # O efeito aparece no estado capturado ao final deste passo
+                    self.acks[ghost] = (seq, timestamp, self.broadcaster.tick + 1)
+
+                    if self.recorder is not None:
+                        self.__tick_inputs.append((ghost, action, seq))
+
+                move_ghost(self.game_state.matrix, ghost, control)
+
+        self.game_state.update()
+
+        if self.game_state.restart_game_timer == 0:
+            self.__restart()
+
+
+class Lobby:
+    """
+        Gerencia as salas do servidor.
+
+        Clientes podem entrar em uma sala pelo seu identificador ou ser colocados automaticamente
+        na primeira sala com fantasma livre (preenchendo as salas antes de criar novas).
+        Salas sem clientes são descartadas.
+
+        Quando as salas são distribuídas entre vários processos, cada Lobby gera apenas os
+        identificadores do seu shard: a sala `room_id` pertence ao shard `(room_id - 1) % shard_count`.
+    """
+
+    def __init__(self, max_rooms: int, shard_index: int = 0, shard_count: int = 1, compress: bool = True,
+                 metrics=None, replays=None):
+        """
+            Args:
+                max_rooms (int): Quantidade máxima de salas simultâneas.
+                shard_index (int, optional): Índice do shard deste Lobby. Padrão é 0.
+                shard_count (int, optional): Quantidade total de shards. Padrão é 1.
+                compress (bool, optional): Se as salas também publicam os frames comprimidos. Padrão é True.
+                metrics (Metrics, optional): Histogramas compartilhados pelas salas (ver `server.metrics`). Padrão é None.
+                replays (ReplayStore, optional): Onde as salas gravam as partidas (ver `server.recorder`). Padrão é None.
+        """
+        self.max_rooms = max_rooms
+        self.shard_count = shard_count
+        self.compress = compress
+        self.metrics = metrics
+        self.replays = replays
+        self.rooms: dict[int, Room] = {}
+        self.__next_id = shard_index + 1
+
+        # Estatísticas de broadcast das salas já encerradas
+        self.__closed_stats = {}
+
+    def __create_room(self, room_id: int | None = None) -> Room | None:
+        if len(self.rooms) >= self.max_rooms:
+            return None
+
+        if room_id is None:
+            while self.__next_id in self.rooms:
+                self.__next_id += self.shard_count
+            room_id = self.__next_id
+            self.__next_id += self.shard_count
+
+        room = Room(room_id, self.compress, self.metrics, self.replays)
+        self.rooms[room_id] = room
+        print(f"Sala {room_id} criada ({len(self.rooms)} salas ativas)")
+        return room
+
+    def join(self, room_id: int = 0, spectator: bool = False) -> Room | None:
+        """
+            Retorna a sala em que o cliente deve entrar.
+
+            Args:
+                room_id (int): Sala pedida pelo cliente, ou 0 para escolha automática.
+                spectator (bool, optional): Se o cliente vai apenas assistir: na escolha automática,
+                    entra na sala com mais jogadores, mesmo sem fantasmas livres. Padrão é False.
+
+            Returns:
+                Room | None: A sala escolhida, ou None se o limite de salas foi atingido.
+        """
+        if room_id:
+            return self.rooms.get(room_id) or self.__create_room(room_id)
+
+        # Preenche primeiro as salas com mais jogadores
+        candidates = [room for room in self.rooms.values() if spectator or room.has_free_ghost()]
+        if candidates:
+            return max(candidates, key=lambda room: room.player_count())
+
+        return self.__create_room()
+
+    def leave(self, room: Room, client):
+        """
+            Remove o cliente da sala, descartando a sala se ela ficar vazia.
+
+            Args:
+                room (Room): A sala do cliente.
+                client: Identificador do cliente.
+        """
+        room.remove_client(client)
+
+        if not room.clients and self.rooms.get(room.room_id) is room:
+            del self.rooms[room.room_id]
+            room.close()
+
+            for key, value in room.broadcaster.stats().items():
+                self.__closed_stats[key] = self.__closed_stats.get(key, 0) + value
+
+            print(f"Sala {room.room_id} encerrada ({len(self.rooms)} salas ativas)")
+
+    def update(self, now: float) -> list[Room]:
+        """
+            Executa os passos pendentes de todas as salas.
+
+            Args:
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                list[Room]: As salas que avançaram pelo menos um passo.
+        """
+        return [room for room in list(self.rooms.values()) if room.update(now)]
+
+    def next_delay(self, now: float) -> float:
+        """
+            Args:
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                float: Tempo, em segundos, até o próximo passo de alguma sala.
+        """
+        if not self.rooms:
+            return 1.0 / Room.TICK_RATE
+
+        return min(room.scheduler.delay(now) for room in self.rooms.values())
+
+    def overrun_count(self) -> int:
+        """
+            Returns:
+                int: Total de passos atrasados (acima do intervalo ou descartados) em todas as salas.
+        """
+        return sum(room.scheduler.overruns + room.scheduler.dropped_ticks for room in self.rooms.values())
+
+    def client_count(self) -> int:
+        """
+            Returns:
+                int: Total de clientes conectados em todas as salas.
+        """
+        return sum(len(room.clients) for room in self.rooms.values())
+
+    def free_ghost_count(self) -> int:
+        """
+            Returns:
+                int: Total de fantasmas livres em todas as salas.
+        """
+        return sum(len(room.available_ghosts) for room in self.rooms.values())
+
+    def broadcast_stats(self) -> dict:
+        """
+            Returns:
+                dict: As estatísticas de broadcast somadas de todas as salas, inclusive as já encerradas
+                (ver `StateBroadcaster.stats`).
+        """
+        totals = dict(self.__closed_stats)
+
+        for room in self.rooms.values():
+            for key, value in room.broadcaster.stats().items():
+                totals[key] = totals.get(key, 0) + value
+
+        return totals
+
+    @staticmethod
+    def shard_of(room_id: int, shard_count: int) -> int:
+        """
+            Args:
+                room_id (int): Identificador da sala (maior que 0).
+                shard_count (int): Quantidade total de shards.
+
+            Returns:
+                int: O índice do shard responsável pela sala.
+        """
+        return (room_id - 1) % shard_count
@@ -0,0 +1,117 @@
+class FixedTimestep:
+    """
+        Relógio de passo fixo de uma partida.
+
+        A simulação avança sempre em passos de `1 / tick_rate` segundos, independentemente de quando
+        o laço de atualização é de fato executado. Se uma atualização atrasar, os passos pendentes são
+        executados em sequência (recuperação) até o limite `max_catch_up`; passos além do limite são
+        descartados para que a partida não fique presa tentando alcançar o relógio.
+
+        Passos que demoram mais que o intervalo e passos descartados são contabilizados e informados
+        no terminal (no máximo uma vez a cada REPORT_INTERVAL).
+
+        Attributes:
+            dt (float): Duração de um passo, em segundos.
+            ticks (int): Passos executados.
+            catch_up_ticks (int): Passos executados com atraso, em sequência a outro passo.
+            dropped_ticks (int): Passos descartados por atraso excessivo.
+            overruns (int): Passos cuja execução demorou mais que `dt`.
+            max_tick_duration (float): Maior duração de um passo, em segundos.
+    """
+    MAX_CATCH_UP = 5        # Passos executados em sequência, no máximo, para recuperar um atraso
+    REPORT_INTERVAL = 5.0   # Intervalo mínimo entre avisos de atraso
+
+    def __init__(self, tick_rate: float, name: str = "", max_catch_up: int = MAX_CATCH_UP):
+        """
+            Args:
+                tick_rate (float): Passos por segundo.
+                name (str, optional): Nome usado nos avisos de atraso.
+                max_catch_up (int, optional): Passos executados em sequência, no máximo, por chamada de `due`.
+        """
+        self.dt = 1.0 / tick_rate
+        self.name = name
+        self.max_catch_up = max_catch_up
+
+        self.next_tick = None
+
+        self.ticks = 0
+        self.catch_up_ticks = 0
+        self.dropped_ticks = 0
+        self.overruns = 0
+        self.max_tick_duration = 0.0
+
+        self.__last_report = None
+        self.__reported = (0, 0)  # (overruns, dropped_ticks) já informados
+
+    def due(self, now: float) -> int:
+        """
+            Retorna quantos passos devem ser executados agora e avança o relógio da partida.
+
+            Args:
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                int: Quantidade de passos a executar (0 se ainda não for hora do próximo).
+        """
+        if self.next_tick is None:
+            self.next_tick = now
+
+        if now < self.next_tick:
+            return 0
+
+        steps = int((now - self.next_tick) / self.dt) + 1
+
+        if steps > self.max_catch_up:
+            dropped = steps - self.max_catch_up
+            self.dropped_ticks += dropped
+            self.next_tick += dropped * self.dt
+            steps = self.max_catch_up
+
+        self.catch_up_ticks += steps - 1
+        self.ticks += steps
+        self.next_tick += steps * self.dt
+
+        return steps
+
+    def record(self, duration: float, now: float):
+        """
+            Registra a duração de um passo executado, informando atrasos quando necessário.
+
+            Args:
+                duration (float): Duração do passo, em segundos.
+                now (float): Instante atual (time.monotonic()).
+        """
+        if duration > self.max_tick_duration:
+            self.max_tick_duration = duration
+
+        if duration > self.dt:
+            self.overruns += 1
+
+        if self.__reported != (self.overruns, self.dropped_ticks):
+            if self.__last_report is None or now - self.__last_report >= self.REPORT_INTERVAL:
+                self.__report(now)
+
+    def __report(self, now: float):
+        overruns = self.overruns - self.__reported[0]
+        dropped = self.dropped_ticks - self.__reported[1]
+
+        print(
+            f"{self.name}: {overruns} passos acima de {self.dt * 1000:.0f} ms, {dropped} passos descartados "
+            f"(maior passo: {self.max_tick_duration * 1000:.1f} ms)"
+        )
+
+        self.__reported = (self.overruns, self.dropped_ticks)
+        self.__last_report = now
+
+    def delay(self, now: float) -> float:
+        """
+            Args:
+                now (float): Instante atual (time.monotonic()).
+
+            Returns:
+                float: Tempo, em segundos, até o próximo passo (0 se já estiver atrasado).
+        """
+        if self.next_tick is None:
+            return 0.0
+
+        return max(0.0, self.next_tick - now)
@@ -0,0 +1,311 @@
+"""
+    Simulação determinística de uma partida, sem rede e sem esperas.
+
+    A sala avança com o relógio simulado (`server.clock.SimulatedClock`), um passo por vez; os fantasmas
+    são controlados por jogadores simulados, que pedem direções sorteadas (RANDOM) ou perseguem o
+    Pac-Man pelo primeiro passo do menor caminho (tabela de distâncias do labirinto, ver
+    `common.distances`) e fogem dele no modo frightened (CHASE), com um gerador com semente;
+    a IA do Pac-Man não faz escolhas aleatórias. Com a mesma semente e os mesmos parâmetros, duas execuções
+    produzem exatamente o mesmo estado em cada tick, o que é conferido pelo resumo do estado de cada
+    passo (`Room.state_hash`).
+
+    Execute a partir da raiz do projeto:
+        python3 -m server.simulation --seed 42 --ticks 5000 --verify
+        python3 -m server.simulation --seed 42 --ticks 5000 --hashes resumos.txt
+        python3 -m server.simulation --seed 42 --ticks 5000 --compare resumos.txt
+"""
+
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+from common.enums import EntityType, GameStatus, PlayerAction
+
+from .room import Room
+from .clock import SimulatedClock
+from .movement import MOVEMENT_MAP
+
+RANDOM = 'aleatorio'        # Jogadores pedem direções sorteadas
+CHASE = 'perseguicao'       # Jogadores perseguem o Pac-Man (ou fogem dele no modo frightened)
+POLICIES = (RANDOM, CHASE)
+
+# Partes do passo medidas com `profile` (o restante do passo é o movimento dos fantasmas)
+COMPONENTS = ('ia', 'estado', 'captura', 'jogadores')
+
+# Deslocamento de um passo -> ação que o produz
+STEP_ACTIONS = {offset: action for action, offset in MOVEMENT_MAP.items()}
+
+
+class Simulation:
+    """
+        Partida simulada com jogadores controlados pelo próprio simulador.
+
+        Attributes:
+            seed (int): A semente das entradas dos jogadores.
+            policy (str): Como os jogadores escolhem as direções (RANDOM ou CHASE).
+            clock (SimulatedClock): O relógio da sala.
+            room (Room): A sala simulada.
+            ghosts (list[EntityType]): Os fantasmas controlados pelos jogadores simulados.
+            hashes (list[str] | None): O resumo do estado após cada passo (ver `Room.state_hash`), ou
+                None se os resumos não forem calculados.
+            timings (dict[str, float] | None): Tempo total, em segundos, de cada parte do passo (COMPONENTS
+                e 'passo', o passo inteiro), ou None sem `profile`.
+    """
+    INPUT_RATE = 3.0    # Direções pedidas por segundo, em média, por jogador (RANDOM)
+    CHASE_ERROR = 0.1   # Chance de um jogador CHASE pedir uma direção sorteada em vez da melhor
+
+    def __init__(self, seed: int = 0, players: int = 4, input_rate: float = INPUT_RATE, policy: str = RANDOM,
+                 hashes: bool = True, profile: bool = False):
+        """
+            Args:
+                seed (int, optional): A semente das entradas dos jogadores. Padrão é 0.
+                players (int, optional): Quantidade de fantasmas controlados (1 a 4). Padrão é 4.
+                input_rate (float, optional): Direções pedidas por segundo, em média, por jogador (RANDOM).
+                policy (str, optional): Como os jogadores escolhem as direções (RANDOM ou CHASE). Padrão é RANDOM.
+                hashes (bool, optional): Se o resumo do estado de cada passo é calculado. Padrão é True.
+                profile (bool, optional): Se o tempo de cada parte do passo é medido. Padrão é False.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Política de jogadores desconhecida: {policy}")
+
+        self.seed = seed
+        self.policy = policy
+        self.clock = SimulatedClock()
+        self.room = Room(1, compress=False, clock=self.clock)
+        self.hashes = [] if hashes else None
+        self.timings = None
+
+        self.__rng = random.Random(seed)
+        self.__input_chance = input_rate * self.room.scheduler.dt
+        self.__actions = list(PlayerAction)
+        self.__seq = 0
+
+        self.ghosts = [self.room.assign_ghost(f"jogador-{i}") for i in range(max(1, min(players, 4)))]
+
+        if profile:
+            self.__profile()
+
+    def __profile(self):
+        """
+            Passa a medir as partes do passo, substituindo os métodos da IA, do estado e da captura
+            desta sala por versões cronometradas.
+        """
+        self.timings = dict.fromkeys(COMPONENTS + ('passo',), 0.0)
+        room = self.room
+
+        def timed(func, component):
+            def wrapper(*args):
+                start = time.perf_counter()
+                result = func(*args)
+                self.timings[component] += time.perf_counter() - start
+                return result
+            return wrapper
+
+        room.pacman_ai.update = timed(room.pacman_ai.update, 'ia')
+        room.game_state.update = timed(room.game_state.update, 'estado')
+        room.broadcaster.capture = timed(room.broadcaster.capture, 'captura')
+        self.__queue_inputs = timed(self.__queue_inputs, 'jogadores')
+
+    @property
+    def tick(self) -> int:
+        """
+            Returns:
+                int: O último tick executado.
+        """
+        return self.room.broadcaster.tick
+
+    @property
+    def finished(self) -> bool:
+        """
+            Returns:
+                bool: True se a partida atual já tem um vencedor.
+        """
+        return self.room.game_state.status in (GameStatus.PACMAN_VICTORY, GameStatus.GHOSTS_VICTORY)
+
+    def __queue_inputs(self):
+        """
+            Enfileira as direções pedidas pelos jogadores neste passo.
+        """
+        room = self.room
+
+        if self.policy == RANDOM:
+            for ghost in self.ghosts:
+                if self.__rng.random() < self.__input_chance:
+                    self.__queue(ghost, self.__rng.choice(self.__actions))
+            return
+
+        matrix = room.game_state.matrix
+        pacman = matrix.get_entity_position(EntityType.PACMAN)
+
+        if pacman is None:
+            return
+
+        flee = room.game_state.is_frightened_mode()
+
+        for ghost in self.ghosts:
+            position = matrix.get_entity_position(ghost)
+
+            # Um pedido por vez: o próximo só depois que o anterior foi aplicado
+            if position is None or room.inputs[ghost]:
+                continue
+
+            x, y = position
+
+            if self.__rng.random() < self.CHASE_ERROR:
+                action = self.__rng.choice(self.__actions)
+            elif flee:
+                # Foge pela vizinha mais distante do Pac-Man
+                options = [(distance, action) for action, (dx, dy) in MOVEMENT_MAP.items()
+                           if (distance := matrix.distance((x + dx, y + dy), pacman)) is not None]
+
+                if not options:
+                    continue
+
+                action = max(options, key=lambda option: option[0])[1]
+            else:
+                # Persegue pelo primeiro passo do menor caminho (tabela de distâncias)
+                step = matrix.next_step(position, pacman)
+
+                if step is None or step == position:
+                    continue
+
+                action = STEP_ACTIONS[(step[0] - x, step[1] - y)]
+
+            if action != room.controls[ghost]['current_action']:
+                self.__queue(ghost, action)
+
+    def __queue(self, ghost: EntityType, action: PlayerAction):
+        self.__seq += 1
+        self.room.queue_input(ghost, action, self.__seq, self.tick)
+
+    def step(self) -> str | None:
+        """
+            Executa um passo: enfileira as entradas dos jogadores, avança a sala e o relógio.
+
+            Returns:
+                str | None: O resumo do estado após o passo (None se os resumos não forem calculados).
+        """
+        room = self.room
+        start = time.perf_counter() if self.timings is not None else 0.0
+
+        self.__queue_inputs()
+
+        snapshot, = room.advance()
+        self.clock.advance(room.scheduler.dt)
+
+        if self.timings is not None:
+            self.timings['passo'] += time.perf_counter() - start
+
+        if self.hashes is None:
+            return None
+
+        state = room.state_hash(snapshot)
+        self.hashes.append(state)
+        return state
+
+    def run_match(self, max_ticks: int) -> dict:
+        """
+            Executa a partida até haver um vencedor (ou até o limite de passos), sem a saída de texto do jogo.
+
+            Args:
+                max_ticks (int): Limite de passos.
+
+            Returns:
+                dict: 'ticks' (passos executados), 'status' (nome do GameStatus), 'winner' (nome da
+                entidade vencedora ou None), 'lives' (vidas restantes do Pac-Man) e 'scores' (fantasma -> pontos).
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            while not self.finished and self.tick < max_ticks:
+                self.step()
+
+        game_state = self.room.game_state
+        return {
+            'ticks': self.tick,
+            'status': game_state.status.name,
+            'winner': game_state.winner.name if game_state.winner else None,
+            'lives': game_state.pacman_lives,
+            'scores': {ghost.name: score for ghost, score in game_state.scores.items()},
+        }
+
+    def run(self, ticks: int) -> list[str]:
+        """
+            Executa os passos pedidos, sem a saída de texto do jogo (colisões, modo frightened).
+
+            Args:
+                ticks (int): Quantidade de passos.
+
+            Returns:
+                list[str]: Os resumos de todos os passos executados até agora.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(ticks):
+                self.step()
+
+        return self.hashes
+
+
+def first_divergence(hashes: list[str], expected: list[str]) -> int | None:
+    """
+        Args:
+            hashes (list[str]): Os resumos de uma execução (o do tick t na posição t - 1).
+            expected (list[str]): Os resumos de referência.
+
+        Returns:
+            int | None: O primeiro tick em que os resumos diferem, ou None se coincidem em todos os ticks comuns.
+    """
+    for tick, (state, reference) in enumerate(zip(hashes, expected), start=1):
+        if state != reference:
+            return tick
+
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação determinística de uma partida do Pac-Man Hunt.")
+    parser.add_argument("--seed", type=int, default=0, help="semente da partida")
+    parser.add_argument("--ticks", type=int, default=5000, help="passos simulados")
+    parser.add_argument("--players", type=int, default=4, help="fantasmas controlados (1 a 4)")
+    parser.add_argument("--policy", choices=POLICIES, default=RANDOM, help="como os jogadores escolhem as direções")
+    parser.add_argument("--verify", action="store_true", help="executa duas vezes e compara os resumos de cada tick")
+    parser.add_argument("--hashes", help="grava o resumo de cada tick neste arquivo")
+    parser.add_argument("--compare", help="compara com os resumos gravados neste arquivo")
+    options = parser.parse_args()
+
+    start = time.perf_counter()
+    hashes = Simulation(options.seed, options.players, policy=options.policy).run(options.ticks)
+    elapsed = time.perf_counter() - start
+
+    print(f"{options.ticks} ticks em {elapsed:.2f}s ({options.ticks / elapsed:.0f} ticks/s), "
+          f"resumo final {hashes[-1] if hashes else '-'}")
+
+    expected = None
+    if options.verify:
+        expected = Simulation(options.seed, options.players, policy=options.policy).run(options.ticks)
+    elif options.compare:
+        with open(options.compare) as f:
+            expected = f.read().split()
+
+    if options.hashes:
+        with open(options.hashes, 'w') as f:
+            f.write("\n".join(hashes) + "\n")
+
+    if expected is None:
+        return
+
+    tick = first_divergence(hashes, expected)
+    if tick is not None:
+        print(f"Divergência no tick {tick}: {hashes[tick - 1]} != {expected[tick - 1]}")
+        sys.exit(1)
+
+    if len(hashes) != len(expected):
+        print(f"Resumos idênticos nos {min(len(hashes), len(expected))} ticks comuns "
+              f"({len(hashes)} executados, {len(expected)} de referência)")
+    else:
+        print(f"Resumos idênticos em todos os {len(hashes)} ticks")
+
+
+if __name__ == "__main__":
+    main()